@@ -3,6 +3,10 @@ ASGI config for blackcobra_ project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve through an ASGI server (e.g. ``uvicorn blackcobra_.asgi:application``)
+to enable the judge dashboard's live match stream at /matches/stream/;
+under WSGI that endpoint answers 204 and the dashboard falls back to polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
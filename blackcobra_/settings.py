@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,6 +81,19 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by every worker process: the belt ladder, leaderboard, chart and
+# dashboard caches invalidate through version keys stored here. The table
+# is created by migration core.0014 (or `manage.py createcachetable`).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "core_cache",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -176,3 +190,14 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 
+# Share of requests measured by core.instrumentation (0 = off, 1 = all);
+# sampled requests get a Server-Timing header and a core log line
+REQUEST_TIMING_SAMPLE_RATE = 0
+
+
+# Promotion eligibility rules (see core/promotions.py for defaults)
+PROMOTION_RULES = {
+    'min_days_in_grade': 180,
+    'min_matches': 5,
+    'min_win_rate': 40,
+}
@@ -1,5 +1,14 @@
-from django.contrib import admin
-from .models import Belt, Trainee, Event, Match, Payment, Promotion, Notification, DashboardStat
+import io
+
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from . import dues, trainee_import
+from .forms import DuesRunForm, TraineeImportForm
+from .models import Belt, Trainee, Event, Match, Payment, Promotion, Notification, DashboardStat, ScoreEvent
 
 @admin.register(Belt)
 class BeltAdmin(admin.ModelAdmin):
@@ -8,26 +17,109 @@ class BeltAdmin(admin.ModelAdmin):
 
 @admin.register(Trainee)
 class TraineeAdmin(admin.ModelAdmin):
-    list_display = ('user', 'belt', 'join_date', 'is_active')
+    list_display = ('user', 'belt', 'join_date', 'is_active', 'win_rate_display', 'outstanding_balance_display')
     list_filter = ('belt', 'join_date', 'is_active')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'emergency_contact')
+    list_select_related = ('user', 'belt')
+    actions = ['generate_dues']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_stats()
+
+    @admin.display(description='Win rate', ordering='stats_win_rate')
+    def win_rate_display(self, obj):
+        return f'{obj.win_rate:.1f}%'
+
+    @admin.display(description='Outstanding balance', ordering='stats_outstanding_balance')
+    def outstanding_balance_display(self, obj):
+        return obj.outstanding_balance
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='core_trainee_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a trainee CSV and show per-row errors."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = TraineeImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            result = trainee_import.import_trainees(
+                upload, workers=trainee_import.ADMIN_WORKERS, dry_run=form.cleaned_data['dry_run']
+            )
+            if result.created and not result.dry_run:
+                self.message_user(request, f'Imported {result.created} trainees.', messages.SUCCESS)
+        return TemplateResponse(request, 'admin/core/trainee/import.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import trainees',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+            'required_columns': trainee_import.REQUIRED_COLUMNS,
+            'optional_columns': trainee_import.OPTIONAL_COLUMNS,
+        })
+
+    @admin.action(description='Generate dues for selected trainees')
+    def generate_dues(self, request, queryset):
+        """Ask for the period and amount, then run dues for the selection."""
+        if 'apply' in request.POST:
+            form = DuesRunForm(request.POST)
+            if form.is_valid():
+                run = dues.run_dues(
+                    form.cleaned_data['period'],
+                    form.cleaned_data['amount'],
+                    due_date=form.cleaned_data['due_date'],
+                    description=form.cleaned_data['description'],
+                    trainees=queryset,
+                )
+                self.message_user(
+                    request,
+                    f'Created {run.created} dues payments for {run.period}; '
+                    f'skipped {run.skipped} trainees who already had them.',
+                    messages.SUCCESS
+                )
+                return None
+        else:
+            form = DuesRunForm(initial={'period': dues.current_period(timezone.now().date())})
+        return TemplateResponse(request, 'admin/core/trainee/dues_run.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Generate dues',
+            'opts': self.model._meta,
+            'form': form,
+            'selected_ids': list(queryset.values_list('pk', flat=True)),
+            'eligible_count': dues.eligible_trainees(queryset).count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('name', 'event_type', 'start_date', 'end_date', 'location', 'is_published')
+    list_display = ('name', 'event_type', 'start_date', 'end_date', 'location', 'is_published', 'registered_count')
     list_filter = ('event_type', 'is_published', 'start_date')
     search_fields = ('name', 'location')
 
+class ScoreEventInline(admin.TabularInline):
+    model = ScoreEvent
+    fields = ('created_at', 'kind', 'delta1', 'delta2', 'judge')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    max_num = 0
+    ordering = ('pk',)
+
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
     list_display = ('event', 'trainee1', 'trainee2', 'winner', 'match_time')
     list_filter = ('event', 'match_time')
     search_fields = ('trainee1__user__username', 'trainee2__user__username', 'event__name')
+    inlines = [ScoreEventInline]
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ('trainee', 'amount', 'date', 'paid')
-    list_filter = ('paid', 'date')
+    list_display = ('trainee', 'amount', 'date', 'period', 'paid')
+    list_filter = ('paid', 'date', 'period')
     search_fields = ('trainee__user__username',)
 
 @admin.register(Promotion)
@@ -45,5 +137,5 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.register(DashboardStat)
 class DashboardStatAdmin(admin.ModelAdmin):
-    list_display = ('stat_type', 'updated_at')
+    list_display = ('stat_type', 'stale', 'updated_at')
     readonly_fields = ('updated_at',)
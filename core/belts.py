@@ -0,0 +1,70 @@
+"""
+Process-wide Belt ladder cache.
+
+The belt table is tiny and almost never changes, so it is loaded once per
+process and indexed by id and by order. Belt saves/deletes bump a version
+key in the shared cache (see core/signals.py and core/cache_versions.py).
+"""
+from django.db import transaction
+
+from .cache_versions import CacheToken, LocalCopy
+from .models import Belt
+
+
+BELT_LADDER_VERSION_KEY = 'core:belts:version'
+
+
+class BeltLadder:
+    """Belts in progression order with O(1) lookups."""
+
+    def __init__(self, belts):
+        self.belts = sorted(belts, key=lambda belt: belt.order)
+        self.by_id = {belt.pk: belt for belt in self.belts}
+        self.by_order = {belt.order: belt for belt in self.belts}
+        self._next_by_id = {
+            belt.pk: self.belts[index + 1] if index + 1 < len(self.belts) else None
+            for index, belt in enumerate(self.belts)
+        }
+
+    def __iter__(self):
+        return iter(self.belts)
+
+    def __len__(self):
+        return len(self.belts)
+
+    def first(self):
+        return self.belts[0] if self.belts else None
+
+    def get(self, belt_id):
+        return self.by_id.get(belt_id)
+
+    def get_by_order(self, order):
+        return self.by_order.get(order)
+
+    def next_belt(self, belt_id):
+        """Return the belt after ``belt_id``, or the first belt when None."""
+        if belt_id is None:
+            return self.first()
+        return self._next_by_id.get(belt_id)
+
+
+ladder_copy = LocalCopy(CacheToken(BELT_LADDER_VERSION_KEY), lambda: BeltLadder(Belt.objects.all()))
+
+
+def get_ladder():
+    """Return the cached ladder, reloading it if the shared version moved."""
+    return ladder_copy.get()
+
+
+def invalidate_ladder():
+    """Drop this process's copy and bump the shared version for other workers."""
+    ladder_copy.invalidate()
+
+
+def schedule_invalidation():
+    """
+    Invalidate now and again once the surrounding transaction commits, so a
+    worker that reloaded mid-transaction does not keep the old ladder.
+    """
+    invalidate_ladder()
+    transaction.on_commit(invalidate_ladder)
@@ -0,0 +1,426 @@
+"""
+Per-view query and latency benchmarks.
+
+Every named URL in core.urls has a Target saying who requests it and how.
+The suite generates a synthetic dataset (see core.synthetic) in a
+throwaway database, picks representative rows for the URL arguments and
+drives each view with the test client, recording its status, query count,
+SQL time, wall-clock latency and response size. Each request runs with an
+empty cache inside a transaction that is rolled back afterwards, so write
+views leave the data as they found it and every view sees the same rows.
+
+Every view also has an absolute budget of queries and response bytes
+(DEFAULT_BUDGET unless BUDGETS says otherwise), so a baseline can't make
+an N+1 or an oversized page acceptable. Views known to break theirs are
+listed in KNOWN_FAILURES with the reason; they are reported as known, and
+fail once they come within budget so the entry gets removed.
+
+Results are compared with a committed baseline: a view fails when its
+status changes, when it runs more queries than the baseline, or when its
+latency, SQL time or response size grow past the threshold. Timings
+depend on the machine, so each run also times a fixed calibration
+workload and baseline timings are scaled by the ratio of the two before
+comparing.
+"""
+import json
+import statistics
+import time
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.template import Context, Template
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from . import synthetic, urls
+from .instrumentation import QueryTimer
+from .models import Event, EventRegistration, Match, Notification, Payment, Trainee
+
+
+DEFAULT_SIZE = 'large'
+DEFAULT_REPEAT = 3
+# Timings vary by tens of percent between runs on a shared machine; query
+# counts, statuses and sizes do not, and their budgets are exact
+DEFAULT_THRESHOLD = 1.0
+# Latency changes smaller than this are noise, whatever the ratio
+DEFAULT_MIN_MS = 20.0
+CALIBRATION_ROUNDS = 20
+
+
+class Target(namedtuple('Target', 'role method kwargs data htmx')):
+    """
+    How to request one URL: as which role, with which method, URL kwargs
+    naming sample rows, form data formatted with the sample ids and
+    whether to send it as an HTMX request.
+    """
+
+    def __new__(cls, role, method='get', kwargs=None, data=None, htmx=False):
+        return super().__new__(cls, role, method, kwargs or {}, data or {}, htmx)
+
+
+TARGETS = {
+    'home': Target('anonymous'),
+    'custom_login': Target('anonymous'),
+    'register': Target('anonymous'),
+    'admin_dashboard': Target('admin'),
+    'judge_dashboard': Target('judge'),
+    'trainee_dashboard': Target('trainee'),
+    'upcoming_matches': Target('judge'),
+    'recent_matches': Target('judge'),
+    'match_stream': Target('judge'),
+    'trainee_profile': Target('trainee'),
+    'trainee_matches': Target('trainee'),
+    'trainee_payments': Target('trainee'),
+    'notifications': Target('trainee'),
+    'notification_badge': Target('trainee'),
+    'mark_notification_read': Target('trainee', 'post', {'notification_id': 'notification'}),
+    'mark_all_notifications_read': Target('trainee', 'post'),
+    'dashboard_statistics': Target('admin'),
+    'trainee_list': Target('admin'),
+    'trainee_create': Target('admin'),
+    'trainee_update': Target('admin', kwargs={'trainee_id': 'trainee'}),
+    'trainee_delete': Target('admin', 'delete', {'trainee_id': 'trainee'}),
+    'trainee_delete_confirm': Target('admin', kwargs={'trainee_id': 'trainee'}),
+    'pending_trainees': Target('admin'),
+    'approve_trainee': Target('admin', 'post', {'trainee_id': 'pending_trainee'}),
+    'event_list': Target('admin'),
+    'event_calendar_data': Target('admin'),
+    'event_create': Target('admin'),
+    'event_update': Target('admin', kwargs={'event_id': 'event'}),
+    'event_delete': Target('admin', 'delete', {'event_id': 'event'}),
+    'event_delete_confirm': Target('admin', kwargs={'event_id': 'event'}),
+    # Only ever loaded into the event list's modal
+    'event_detail': Target('admin', kwargs={'event_id': 'event'}, htmx=True),
+    'event_announce': Target('admin', kwargs={'event_id': 'event'}),
+    'match_scoring': Target('judge', kwargs={'match_id': 'match'}),
+    'match_update_score': Target(
+        'judge', 'post', {'match_id': 'match'}, {'action': 'increment', 'trainee': 'trainee1'}
+    ),
+    'match_complete': Target('judge', 'post', {'match_id': 'match'}, {'winner_id': '{match_winner}'}),
+    'match_complete_form': Target('judge', kwargs={'match_id': 'match'}),
+    'promotion_list': Target('admin'),
+    'promotion_create': Target('admin', kwargs={'trainee_id': 'trainee'}),
+    'promotion_history': Target('admin'),
+    'payment_list': Target('admin'),
+    'payment_create': Target('admin'),
+    'payment_mark_paid': Target('admin', 'post', {'payment_id': 'payment'}),
+    'payment_reports': Target('admin'),
+    'reports_dashboard': Target('admin'),
+    'api_chart_data': Target('admin', data={'type': 'trainee_growth'}),
+    'export_data': Target('admin', kwargs={'dataset': 'export'}),
+    'trainee_events_list': Target('trainee'),
+    'trainee_event_detail': Target('trainee', kwargs={'event_id': 'published_event'}),
+    'event_register': Target('trainee', 'post', {'event_id': 'open_event'}),
+    'event_unregister': Target('trainee', 'post', {'event_id': 'registered_event'}),
+    'leaderboard': Target('trainee'),
+    'award_points': Target('admin', kwargs={'trainee_id': 'trainee'}),
+    'bulk_award_points': Target('admin'),
+    'bulk_award_trainee_search': Target('admin', data={'q': 'a'}),
+    'points_history': Target('admin', kwargs={'trainee_id': 'trainee'}),
+    'my_points': Target('trainee'),
+}
+
+
+Budget = namedtuple('Budget', 'queries bytes')
+
+# None leaves that measure unbounded
+DEFAULT_BUDGET = Budget(queries=25, bytes=500_000)
+BUDGETS = {
+    # Deleting the busiest event cascades to its matches, score events and registrations
+    'event_delete': Budget(queries=200, bytes=DEFAULT_BUDGET.bytes),
+    # Streams the whole table by design
+    'export_data': Budget(queries=DEFAULT_BUDGET.queries, bytes=None),
+}
+
+# Over budget on the large dataset; each entry names the cause to fix
+KNOWN_FAILURES = {
+    'event_detail': "renders every match and registration, fetching each match trainee's user separately",
+    'payment_create': "the trainee select lists every trainee and fetches each one's user separately",
+    'pending_trainees': 'lists every pending trainee on one page',
+    'promotion_list': 'renders the whole active roster on one page',
+    'recent_matches': "fetches each match trainee's user separately",
+    'upcoming_matches': "lists every upcoming match and fetches each trainee's user separately",
+}
+
+
+def url_names():
+    """Names of every URL pattern in core.urls, in declaration order."""
+    return [pattern.name for pattern in urls.urlpatterns if isinstance(pattern, URLPattern) and pattern.name]
+
+
+def pick_samples():
+    """
+    Users and row ids for the targets. Each is the heaviest or most
+    typical of its kind in the synthetic data, and the same for the same
+    seed.
+    """
+    now = timezone.now()
+    synthetic_trainees = Trainee.objects.filter(
+        user__username__startswith=synthetic.USERNAME_PREFIX, is_active=True, is_approved=True
+    )
+    trainee = synthetic_trainees.annotate(
+        match_count=Count('matches_as_trainee1', distinct=True) + Count('matches_as_trainee2', distinct=True)
+    ).order_by('-match_count', 'pk').select_related('user').first()
+    # The judge with the most matches still to score, and their latest match
+    judge = User.objects.filter(username__startswith=synthetic.USERNAME_PREFIX, groups__name='Judge').annotate(
+        undecided=Count('match', filter=Q(match__winner__isnull=True)), judged=Count('match')
+    ).order_by('-undecided', '-judged', 'pk').first()
+    match = Match.objects.filter(judge=judge).order_by('-match_time', '-pk').first()
+
+    # Small datasets may have no open or upcoming events; the latest then stands in
+    registered = EventRegistration.objects.filter(trainee=trainee).values('event_id')
+    published = Event.objects.filter(is_published=True).order_by('-start_date', '-pk')
+    open_event = next((
+        event for event in published.filter(registration_deadline__gt=now).exclude(pk__in=registered)
+        if not event.max_participants or event.participant_count < event.max_participants
+    ), published.exclude(pk__in=registered).first())
+    pending = Trainee.objects.filter(is_approved=False).order_by('pk').first()
+
+    samples = {
+        'admin': User.objects.get(username='admin'),
+        'judge': judge,
+        'trainee': trainee,
+        'pending_trainee': pending,
+        'event': Event.objects.order_by('-registered_count', 'pk').first(),
+        'published_event': Event.objects.filter(is_published=True).order_by('-registered_count', 'pk').first(),
+        'open_event': open_event,
+        'registered_event': published.filter(pk__in=registered).first(),
+        'match': match,
+        'match_winner': match and match.trainee1_id,
+        'payment': Payment.objects.filter(paid=False).order_by('date', 'pk').first(),
+        'notification': Notification.objects.filter(user=trainee and trainee.user).order_by('is_read', 'pk').first(),
+        'export': 'payments',
+    }
+    missing = [name for name, value in samples.items() if value is None]
+    if missing:
+        raise ValueError(f'The dataset has no rows for: {", ".join(missing)}')
+    return samples
+
+
+def _sample_id(value):
+    return getattr(value, 'pk', value)
+
+
+def _clients(samples):
+    # Errors come back as 500s for the report rather than raising
+    clients = {'anonymous': Client(raise_request_exception=False)}
+    for role, user in (('admin', samples['admin']), ('judge', samples['judge']), ('trainee', samples['trainee'].user)):
+        clients[role] = Client(raise_request_exception=False)
+        clients[role].force_login(user)
+    return clients
+
+
+def _content_length(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, method, path, data, headers=None, repeat=DEFAULT_REPEAT):
+    """
+    Request ``path`` ``repeat`` times, each from a cold cache and rolled
+    back, after one unmeasured request to compile its templates. Latency
+    and SQL time are medians; the query count is the worst.
+    """
+    runs = []
+    for _ in range(repeat + 1):
+        cache.clear()
+        timer = QueryTimer()
+        with transaction.atomic():
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, headers=headers)
+                size = _content_length(response)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        runs.append((response.status_code, timer.count, timer.seconds * 1000, elapsed * 1000, size))
+    runs = runs[1:]
+    return {
+        'status': runs[-1][0],
+        'queries': max(run[1] for run in runs),
+        'sql_ms': round(statistics.median(run[2] for run in runs), 2),
+        'ms': round(statistics.median(run[3] for run in runs), 2),
+        'bytes': runs[-1][4],
+    }
+
+
+def run_views(repeat=DEFAULT_REPEAT, names=None, log=None):
+    """
+    Benchmark the views named ``names`` (all of them by default) against
+    the data already in the database. Returns results keyed by URL name.
+    """
+    log = log or (lambda message: None)
+    missing = [name for name in url_names() if name not in TARGETS]
+    if missing:
+        raise ValueError(f'No benchmark target for: {", ".join(missing)}')
+
+    samples = pick_samples()
+    clients = _clients(samples)
+    results = {}
+    for name in names or url_names():
+        target = TARGETS[name]
+        path = reverse(name, kwargs={key: _sample_id(samples[sample]) for key, sample in target.kwargs.items()})
+        ids = {key: _sample_id(value) for key, value in samples.items()}
+        data = {key: value.format(**ids) for key, value in target.data.items()}
+        headers = {'HX-Request': 'true'} if target.htmx else None
+        results[name] = measure(clients[target.role], target.method, path, data, headers, repeat)
+        log(f'{name}: {results[name]["queries"]} queries, {results[name]["ms"]:.1f} ms')
+    return results
+
+
+CALIBRATION_TEMPLATE = Template(
+    '{% for trainee in trainees %}<tr><td>{{ trainee.user.get_full_name }}</td>'
+    '<td>{{ trainee.belt.name|default:"-" }}</td><td>{{ trainee.join_date|date:"M d, Y" }}</td></tr>{% endfor %}'
+)
+
+
+def calibrate(rounds=CALIBRATION_ROUNDS):
+    """
+    Fastest of ``rounds`` timings, in milliseconds, of querying and
+    rendering 500 trainees: a fixed mix of SQLite, ORM and template work
+    whose ratio between two runs says how much faster one machine is than
+    the other. The fastest run is the one least disturbed by other load.
+    """
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        trainees = list(Trainee.objects.select_related('user', 'belt').order_by('pk')[:500])
+        CALIBRATION_TEMPLATE.render(Context({'trainees': trainees}))
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(min(timings), 2)
+
+
+def run(size=DEFAULT_SIZE, seed=synthetic.DEFAULT_SEED, repeat=DEFAULT_REPEAT, names=None, log=None):
+    """
+    Generate a dataset and benchmark the views against it. The database
+    must be a disposable one; returns a report ready for save_baseline.
+    """
+    log = log or (lambda message: None)
+    started = time.monotonic()
+    synthetic.generate_dataset(size, seed)
+    log(f'Generated {size} dataset in {time.monotonic() - started:.1f}s')
+    # Calibrated on both sides of the views, which take minutes on the large dataset
+    calibration_ms = calibrate()
+    views = run_views(repeat, names, log)
+    calibration_ms = min(calibration_ms, calibrate())
+    log(f'Calibration: {calibration_ms:.1f} ms')
+    return {'size': size, 'seed': seed, 'calibration_ms': calibration_ms, 'views': views}
+
+
+def speed_ratio(report, baseline):
+    """How much slower this run's machine is than the baseline's (2.0 = twice as slow)."""
+    if not baseline or not baseline.get('calibration_ms'):
+        return 1.0
+    return report['calibration_ms'] / baseline['calibration_ms']
+
+
+def rescale(views, ratio):
+    """``views`` with their timings divided by ``ratio``."""
+    return {
+        name: {**result, 'ms': round(result['ms'] / ratio, 2), 'sql_ms': round(result['sql_ms'] / ratio, 2)}
+        for name, result in views.items()
+    }
+
+
+def load_baseline(path):
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def save_baseline(report, path):
+    with open(path, 'w') as baseline:
+        json.dump(report, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+Comparison = namedtuple('Comparison', 'name current baseline failures known')
+
+
+def _grew(current, baseline, threshold, floor=0):
+    return current > baseline * (1 + threshold) and current - baseline > floor
+
+
+def _number(value):
+    return f'{value:,}' if isinstance(value, int) else f'{value:,.2f}'
+
+
+def over_budget(name, current):
+    """Descriptions of the ways ``current`` exceeds the view's absolute budget."""
+    budget = BUDGETS.get(name, DEFAULT_BUDGET)
+    over = []
+    for metric in ('queries', 'bytes'):
+        limit = getattr(budget, metric)
+        if limit is not None and current[metric] > limit:
+            over.append(f'{metric} {_number(current[metric])} over budget {_number(limit)}')
+    return over
+
+
+def compare(views, baseline_views, threshold=DEFAULT_THRESHOLD, min_ms=DEFAULT_MIN_MS, ratio=1.0):
+    """
+    A Comparison per benchmarked view. ``failures`` lists what broke the
+    budget; views missing from the baseline have ``baseline`` None.
+    Baseline timings are multiplied by ``ratio`` (see speed_ratio) first.
+    """
+    comparisons = []
+    scaled = rescale(baseline_views, 1 / ratio)
+    for name, current in views.items():
+        baseline = scaled.get(name)
+        known = KNOWN_FAILURES.get(name)
+        over = over_budget(name, current)
+        failures = []
+        if known is None:
+            failures.extend(over)
+        elif not over:
+            failures.append('within budget; remove it from KNOWN_FAILURES')
+        if baseline is not None:
+            if current['status'] != baseline['status']:
+                failures.append(f'status {baseline["status"]} -> {current["status"]}')
+            if current['queries'] > baseline['queries']:
+                failures.append(f'queries {baseline["queries"]} -> {current["queries"]}')
+            for metric, floor in (('ms', min_ms), ('sql_ms', min_ms), ('bytes', 0)):
+                if _grew(current[metric], baseline[metric], threshold, floor):
+                    failures.append(f'{metric} {_number(baseline[metric])} -> {_number(current[metric])}')
+        comparisons.append(Comparison(name, current, baseline, failures, known))
+    return comparisons
+
+
+def _change(current, baseline, metric):
+    if baseline is None:
+        return _number(current[metric])
+    if not baseline[metric]:
+        return f'{_number(current[metric])} (was 0)'
+    return f'{_number(current[metric])} ({(current[metric] - baseline[metric]) / baseline[metric]:+.0%})'
+
+
+def format_report(comparisons):
+    """A plain-text table of the comparisons, failures last."""
+    headers = ('view', 'status', 'queries', 'sql ms', 'ms', 'bytes', 'result')
+    rows = []
+    for comparison in sorted(comparisons, key=lambda comparison: (bool(comparison.failures), comparison.name)):
+        current, baseline = comparison.current, comparison.baseline
+        if comparison.failures:
+            result = 'FAIL: ' + '; '.join(comparison.failures)
+        elif comparison.known:
+            result = f'known: {comparison.known}'
+        elif baseline is None:
+            result = 'new'
+        else:
+            result = 'ok'
+        rows.append((
+            comparison.name,
+            str(current['status']),
+            f'{current["queries"]} (was {baseline["queries"]})' if baseline else str(current['queries']),
+            _change(current, baseline, 'sql_ms'),
+            _change(current, baseline, 'ms'),
+            _change(current, baseline, 'bytes'),
+            result,
+        ))
+    widths = [max(len(row[index]) for row in rows + [headers]) for index in range(len(headers) - 1)]
+    lines = []
+    for row in [headers] + rows:
+        lines.append('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) + '  ' + row[-1])
+    return '\n'.join(lines)
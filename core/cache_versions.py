@@ -0,0 +1,111 @@
+"""
+Version keys for caches that every worker must drop together.
+
+Versions are shared by every worker, so a bump made by one is seen by all
+of them. CacheToken is a random token in the shared cache (see
+settings.CACHES), used as part of shared cache keys or compared for
+equality. DatabaseCounter is a VersionCounter row, bumped atomically, so a
+worker can tell whether its own bump was the only change since its copy
+was loaded; the cache backend's incr is a read followed by a write.
+
+LocalCopy keeps a value built once per process, such as the belt ladder,
+and rebuilds it when its version moved. It reads the version at most once
+every ``check_seconds``, so another worker's change can take that long
+to show up here.
+"""
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from .models import VersionCounter
+
+
+VERSION_CHECK_SECONDS = 1.0
+
+
+class CacheToken:
+    """A random version token under ``key``."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def current(self):
+        version = cache.get(self.key)
+        if version is None:
+            cache.add(self.key, uuid.uuid4().hex, timeout=None)
+            version = cache.get(self.key)
+        return version
+
+    def bump(self):
+        version = uuid.uuid4().hex
+        cache.set(self.key, version, timeout=None)
+        return version
+
+
+class DatabaseCounter:
+    """A ``(generation, number)`` version kept in a VersionCounter row."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def current(self):
+        return VersionCounter.read(self.key)
+
+    def bump(self):
+        return VersionCounter.bump(self.key)
+
+    @staticmethod
+    def follows(version, previous):
+        """Whether ``version`` is the bump right after ``previous``."""
+        return previous is not None and version[0] == previous[0] and version[1] == previous[1] + 1
+
+
+class LocalCopy:
+    """The value ``load()`` returns, kept per process until ``version`` moves."""
+
+    def __init__(self, version, load, check_seconds=VERSION_CHECK_SECONDS):
+        self.version = version
+        self.load = load
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_version = None
+        self._checked_at = None
+
+    def get(self):
+        """The local value, reloaded first if the shared version moved."""
+        value = self._value
+        now = time.monotonic()
+        if value is not None and self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return value
+        version = self.version.current()
+        with self._lock:
+            if self._value is None or self._loaded_version != version:
+                self._value = self.load()
+                self._loaded_version = version
+            self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        """Drop the local value and bump the version for every other worker."""
+        with self._lock:
+            self._value = None
+            self.version.bump()
+
+    def update(self, change):
+        """
+        Bump the version and apply ``change(value)`` to the local value in
+        place. The change is only kept when this bump moved the version
+        exactly one step from the loaded one, i.e. nobody else changed it
+        meanwhile; otherwise the value is dropped and reloaded on next get.
+        Needs a version store with ``follows``, such as DatabaseCounter.
+        """
+        with self._lock:
+            version = self.version.bump()
+            if self._value is not None and self.version.follows(version, self._loaded_version):
+                change(self._value)
+                self._loaded_version = version
+            else:
+                self._value = None
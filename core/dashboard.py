@@ -0,0 +1,75 @@
+"""
+Read-through cache for the admin dashboard statistics.
+
+The polled dashboard reads the stored DashboardStat row while it is fresh
+(one indexed read). Once its updated_at is older than the TTL, or a
+Trainee/Event/Payment/Promotion signal flags it stale, the aggregates are
+recomputed; the stored value is only rewritten if it changed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import DashboardStat, Event, Payment, Promotion, Trainee
+
+
+ADMIN_DASHBOARD_STAT = 'admin_dashboard'
+DEFAULT_STAT_TTL = 5 * 60
+
+
+def compute_admin_stats():
+    """Run the dashboard aggregates against the live tables."""
+    # Upcoming events (events that haven't ended yet)
+    upcoming_events = Event.objects.filter(
+        end_date__gte=timezone.now(),
+        is_published=True
+    ).count()
+
+    # Pending payments (unpaid payments)
+    pending_payments_data = Payment.objects.filter(paid=False).aggregate(
+        count=Count('id'),
+        total=Sum('amount')
+    )
+
+    # Recent promotions (last 30 days)
+    thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
+
+    return {
+        'total_trainees': Trainee.objects.filter(is_active=True).count(),
+        'upcoming_events': upcoming_events,
+        'pending_payments': pending_payments_data['count'] or 0,
+        'pending_payments_amount': float(pending_payments_data['total'] or 0),
+        'recent_promotions': Promotion.objects.filter(date__gte=thirty_days_ago).count(),
+    }
+
+
+def get_admin_stats():
+    """Return dashboard statistics, recomputing only when stale."""
+    stat = DashboardStat.objects.filter(stat_type=ADMIN_DASHBOARD_STAT).first()
+    ttl = getattr(settings, 'DASHBOARD_STAT_TTL', DEFAULT_STAT_TTL)
+    now = timezone.now()
+    if stat is not None and not stat.stale and now - stat.updated_at < timedelta(seconds=ttl):
+        return stat.value
+
+    if stat is None:
+        stats = compute_admin_stats()
+        DashboardStat.objects.update_or_create(stat_type=ADMIN_DASHBOARD_STAT, defaults={'value': stats})
+        return stats
+
+    if stat.stale:
+        # Clear the flag first so a signal firing mid-compute sets it again
+        DashboardStat.objects.filter(pk=stat.pk).update(stale=False)
+    stats = compute_admin_stats()
+    fields = {'updated_at': now}
+    if stat.value != stats:
+        fields['value'] = stats
+    # Not written if invalidated meanwhile, so the next poll recomputes
+    DashboardStat.objects.filter(pk=stat.pk, stale=False).update(**fields)
+    return stats
+
+
+def invalidate_admin_stats():
+    """Force the next dashboard poll to recompute."""
+    DashboardStat.objects.filter(stat_type=ADMIN_DASHBOARD_STAT).update(stale=True)
@@ -0,0 +1,131 @@
+"""
+Recurring dues runs.
+
+A run writes one unpaid Payment per active, approved trainee for a period
+(``YYYY-MM``) with bulk_create, then sends the "New Payment Due"
+notifications in bulk, all in one transaction. Trainees who already have
+that period's dues are skipped through the (trainee, period) unique index,
+so a run can safely be repeated. Each batch is inserted under a savepoint;
+when a concurrent run bills some of its trainees first, the insert fails on
+that index, those trainees are counted as skipped and the rest retried.
+"""
+import datetime
+import re
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import dashboard, reports
+from .models import Payment, Trainee, TraineeBalance
+from .notifications import notify_users
+
+
+BULK_BATCH_SIZE = 500
+PERIOD_FORMAT = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+DuesRun = namedtuple('DuesRun', 'period created skipped')
+
+
+def current_period(today=None):
+    return (today or timezone.now().date()).strftime('%Y-%m')
+
+
+def parse_period(period):
+    """First day of a ``YYYY-MM`` period, raising ValidationError otherwise."""
+    if not PERIOD_FORMAT.match(period or ''):
+        raise ValidationError('Enter the period as YYYY-MM.')
+    year, month = map(int, period.split('-'))
+    return datetime.date(year, month, 1)
+
+
+def eligible_trainees(trainees=None):
+    """Active, approved trainees, optionally limited to a queryset of them."""
+    eligible = Trainee.objects.filter(is_active=True, is_approved=True)
+    if trainees is not None:
+        eligible = eligible.filter(pk__in=trainees.values('pk'))
+    return eligible
+
+
+def unbilled_trainees(eligible, period):
+    """(trainee id, user id) pairs of ``eligible`` trainees without ``period``'s dues."""
+    return list(eligible.exclude(payments__period=period).order_by('pk').values_list('pk', 'user_id'))
+
+
+def _create_batch(batch, build, period):
+    """
+    Insert payments for ``batch``. Returns the pairs billed here and the
+    trainee ids a concurrent run billed first.
+    """
+    billed_elsewhere = set()
+    while batch:
+        try:
+            with transaction.atomic():
+                Payment.objects.bulk_create([build(trainee_id) for trainee_id, _ in batch])
+            break
+        except IntegrityError:
+            conflicts = set(Payment.objects.filter(
+                period=period, trainee_id__in=[trainee_id for trainee_id, _ in batch]
+            ).values_list('trainee_id', flat=True))
+            if not conflicts:
+                raise
+            billed_elsewhere |= conflicts
+            batch = [pair for pair in batch if pair[0] not in conflicts]
+    return batch, billed_elsewhere
+
+
+def run_dues(period, amount, due_date=None, description=None, trainees=None, notify=True, dry_run=False):
+    """
+    Create ``period``'s dues for every eligible trainee without them.
+    Returns a DuesRun with the payments created and trainees skipped.
+    """
+    first_day = parse_period(period)
+    due_date = due_date or first_day
+    amount = Decimal(amount).quantize(Decimal('0.01'))
+    description = description or f'Monthly dues {period}'
+    eligible = eligible_trainees(trainees)
+
+    def build(trainee_id):
+        return Payment(
+            trainee_id=trainee_id,
+            amount=amount,
+            date=due_date,
+            description=description,
+            period=period,
+            paid=False,
+        )
+
+    with transaction.atomic():
+        targets = unbilled_trainees(eligible, period)
+        skipped = eligible.count() - len(targets)
+        if dry_run or not targets:
+            return DuesRun(period, len(targets), skipped)
+
+        created = []
+        for start in range(0, len(targets), BULK_BATCH_SIZE):
+            billed, billed_elsewhere = _create_batch(targets[start:start + BULK_BATCH_SIZE], build, period)
+            created.extend(billed)
+            skipped += len(billed_elsewhere)
+        if not created:
+            return DuesRun(period, 0, skipped)
+
+        # bulk_create skips Payment.save and its signals
+        trainee_ids = [trainee_id for trainee_id, _ in created]
+        for start in range(0, len(trainee_ids), BULK_BATCH_SIZE):
+            TraineeBalance.refresh(trainee_ids[start:start + BULK_BATCH_SIZE])
+        transaction.on_commit(dashboard.invalidate_admin_stats)
+        transaction.on_commit(reports.invalidate_chart_cache)
+
+        if notify:
+            notify_users(
+                [user_id for _, user_id in created],
+                'New Payment Due',
+                'A new payment of ${amount} for {description} is due on {date}.',
+                'payment',
+                link='/trainee/payments/',
+                context={'amount': amount, 'description': description, 'date': due_date},
+                batch_size=BULK_BATCH_SIZE
+            )
+    return DuesRun(period, len(created), skipped)
@@ -0,0 +1,182 @@
+"""
+Streaming data exports.
+
+Each export is one joined values_list query read with
+``iterator(chunk_size=...)`` and written out a row at a time as CSV or
+JSON Lines, so memory stays flat however large the table grows. Filters
+take the same query parameters as the matching list views and are checked
+before the first row is sent. CSV text cells that a spreadsheet would read
+as a formula are prefixed with a quote.
+"""
+import csv
+import json
+from collections import namedtuple
+
+from django.core.exceptions import BadRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .models import Match, Payment, PointsTransaction, Trainee
+
+
+CHUNK_SIZE = 2000
+# Leading characters that make spreadsheet apps evaluate a cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+Export = namedtuple('Export', 'queryset columns')
+
+
+def _id_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f'Invalid {name}')
+
+
+def trainee_rows(params):
+    """Active trainees, narrowed by ``search`` as on trainee_list."""
+    trainees = Trainee.objects.filter(is_active=True)
+    query = (params.get('search') or '').strip()
+    if query:
+        trainees = search.filter_trainees(trainees, query)
+    return trainees
+
+
+def payment_rows(params):
+    """Payments, narrowed by payment_list's ``status``."""
+    today = timezone.now().date()
+    return Payment.objects.with_overdue(today).with_status(params.get('status') or 'all', today)
+
+
+def match_rows(params):
+    """Matches, optionally for one ``event`` or one ``trainee``."""
+    matches = Match.objects.all()
+    event_id = _id_param(params, 'event')
+    if event_id is not None:
+        matches = matches.filter(event_id=event_id)
+    trainee_id = _id_param(params, 'trainee')
+    if trainee_id is not None:
+        matches = matches.filter(Q(trainee1_id=trainee_id) | Q(trainee2_id=trainee_id))
+    return matches
+
+
+def points_rows(params):
+    """Points transactions, optionally for one ``trainee`` or one ``type``."""
+    transactions = PointsTransaction.objects.all()
+    trainee_id = _id_param(params, 'trainee')
+    if trainee_id is not None:
+        transactions = transactions.filter(trainee_id=trainee_id)
+    if params.get('type'):
+        transactions = transactions.filter(transaction_type=params.get('type'))
+    return transactions
+
+
+EXPORTS = {
+    'trainees': Export(trainee_rows, (
+        ('id', 'pk'),
+        ('username', 'user__username'),
+        ('first_name', 'user__first_name'),
+        ('last_name', 'user__last_name'),
+        ('email', 'user__email'),
+        ('belt', 'belt__name'),
+        ('contact_number', 'contact_number'),
+        ('date_of_birth', 'date_of_birth'),
+        ('join_date', 'join_date'),
+        ('is_approved', 'is_approved'),
+        ('total_points', 'total_points'),
+        # Blank for trainees whose balance row was never written: nothing unpaid
+        ('outstanding_balance', 'balance__outstanding'),
+    )),
+    'payments': Export(payment_rows, (
+        ('id', 'pk'),
+        ('trainee_id', 'trainee_id'),
+        ('username', 'trainee__user__username'),
+        ('amount', 'amount'),
+        ('date', 'date'),
+        ('description', 'description'),
+        ('period', 'period'),
+        ('paid', 'paid'),
+        ('overdue', 'is_overdue'),
+    )),
+    'matches': Export(match_rows, (
+        ('id', 'pk'),
+        ('event_id', 'event_id'),
+        ('event', 'event__name'),
+        ('match_time', 'match_time'),
+        ('trainee1_id', 'trainee1_id'),
+        ('trainee1', 'trainee1__user__username'),
+        ('trainee2_id', 'trainee2_id'),
+        ('trainee2', 'trainee2__user__username'),
+        ('score1', 'score1'),
+        ('score2', 'score2'),
+        ('winner_id', 'winner_id'),
+        ('judge', 'judge__username'),
+    )),
+    'points': Export(points_rows, (
+        ('id', 'pk'),
+        ('trainee_id', 'trainee_id'),
+        ('username', 'trainee__user__username'),
+        ('points', 'points'),
+        ('transaction_type', 'transaction_type'),
+        ('description', 'description'),
+        ('event', 'event__name'),
+        ('awarded_by', 'awarded_by__username'),
+        ('created_at', 'created_at'),
+    )),
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    """Quote text that would run as a formula; numbers pass through."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _jsonl_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def filename(name, export_format):
+    return f'{name}-{timezone.now():%Y%m%d}.{export_format}'
+
+
+def stream(name, params, export_format='csv', chunk_size=CHUNK_SIZE):
+    """
+    Lines of the ``name`` export filtered by ``params``. Bad formats or
+    filters raise BadRequest here, before any output.
+    """
+    if export_format not in FORMATS:
+        raise BadRequest(f'Unknown format {export_format!r}')
+    export = EXPORTS[name]
+    headers = [header for header, _ in export.columns]
+    # Joins come from the column paths; values_list skips building model instances
+    rows = export.queryset(params).order_by('pk').values_list(
+        *[column for _, column in export.columns]
+    ).iterator(chunk_size=chunk_size)
+    lines = _csv_lines if export_format == 'csv' else _jsonl_lines
+    return lines(headers, rows)
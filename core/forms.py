@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.models import User
-from .models import Trainee, Belt, Event, Payment
+from .models import Trainee, Belt, Event, EventRegistration, Payment, PointsTransaction
 from django.utils import timezone
+from .dues import parse_period
 
 
 class TraineeForm(forms.ModelForm):
@@ -329,3 +330,146 @@ class PointsAwardForm(forms.Form):
         if points == 0:
             raise forms.ValidationError("Points cannot be zero.")
         return points
+
+
+class BulkPointsAwardForm(PointsAwardForm):
+    """Form for awarding points to an event's participants, a belt or a group of trainees"""
+    transaction_type = forms.ChoiceField(
+        choices=PointsTransaction.TRANSACTION_TYPE_CHOICES,
+        initial='admin_award',
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'
+        })
+    )
+    event = forms.ModelChoiceField(
+        queryset=Event.objects.all().order_by('-start_date'),
+        required=False,
+        help_text="All approved registrants of this event",
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'
+        })
+    )
+    belt = forms.ModelChoiceField(
+        queryset=Belt.objects.all(),
+        required=False,
+        help_text="All active trainees holding this belt",
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'
+        })
+    )
+    # Posted ids are checked against active trainees; the form only renders
+    # the ticked ones and the rest come from bulk_award_trainee_search
+    trainees = forms.ModelMultipleChoiceField(
+        queryset=Trainee.objects.filter(is_active=True).select_related('user'),
+        required=False,
+        help_text="Search by name and tick the trainees to award",
+        widget=forms.MultipleHiddenInput
+    )
+    
+    def selected_trainees(self):
+        """The trainees ticked in the submitted form, for re-rendering it."""
+        if not self.is_bound:
+            return []
+        ids = [pk for pk in self.data.getlist(self.add_prefix('trainees')) if pk.isdigit()]
+        return list(self.fields['trainees'].queryset.filter(pk__in=ids).order_by('user__first_name', 'pk'))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        targets = [
+            name for name in ('event', 'belt', 'trainees')
+            if cleaned_data.get(name)
+        ]
+        if len(targets) != 1:
+            raise forms.ValidationError('Choose exactly one of an event, a belt or a list of trainees.')
+        return cleaned_data
+
+
+class EventAnnouncementForm(forms.Form):
+    """Form for announcing an update to an event's registrants"""
+    title = forms.CharField(
+        max_length=200,
+        widget=forms.TextInput(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm',
+            'placeholder': 'Announcement title'
+        })
+    )
+    message = forms.CharField(
+        widget=forms.Textarea(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm',
+            'rows': 4
+        })
+    )
+    status = forms.ChoiceField(
+        choices=EventRegistration.STATUS_CHOICES,
+        initial='approved',
+        help_text="Only registrants with this status are notified",
+        widget=forms.Select(attrs={
+            'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'
+        })
+    )
+
+
+class DuesRunForm(forms.Form):
+    """Form for generating a period's dues for many trainees at once"""
+    period = forms.CharField(
+        max_length=7,
+        help_text="YYYY-MM; trainees who already have this period's dues are skipped"
+    )
+    amount = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0)
+    due_date = forms.DateField(required=False, help_text="Defaults to the first day of the period")
+    description = forms.CharField(max_length=255, required=False, help_text="Defaults to \"Monthly dues YYYY-MM\"")
+    
+    def clean_period(self):
+        period = self.cleaned_data['period'].strip()
+        parse_period(period)
+        return period
+
+
+def _is_phone_number(value):
+    return value.replace('+', '').replace('-', '').replace(' ', '').isdigit()
+
+
+class TraineeImportRowForm(forms.Form):
+    """Validates one CSV row of a trainee import; uniqueness is checked per batch"""
+    username = forms.CharField(max_length=150, validators=[User.username_validator])
+    email = forms.EmailField(max_length=254)
+    first_name = forms.CharField(max_length=150)
+    last_name = forms.CharField(max_length=150)
+    password = forms.CharField(required=False, strip=False)
+    date_of_birth = forms.DateField()
+    belt = forms.CharField(required=False, help_text="Belt name; defaults to the first belt")
+    contact_number = forms.CharField(max_length=20)
+    address = forms.CharField()
+    emergency_contact = forms.CharField(max_length=100, required=False)
+    emergency_phone = forms.CharField(max_length=20, required=False)
+    
+    def __init__(self, *args, belts=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.belts = belts or {}
+    
+    def clean_belt(self):
+        name = self.cleaned_data['belt'].strip()
+        if not name:
+            return None
+        belt = self.belts.get(name.lower())
+        if belt is None:
+            raise forms.ValidationError(f'Unknown belt "{name}".')
+        return belt
+    
+    def clean_contact_number(self):
+        contact_number = self.cleaned_data['contact_number']
+        if not _is_phone_number(contact_number):
+            raise forms.ValidationError('Please enter a valid phone number.')
+        return contact_number
+    
+    def clean_emergency_phone(self):
+        emergency_phone = self.cleaned_data['emergency_phone']
+        if emergency_phone and not _is_phone_number(emergency_phone):
+            raise forms.ValidationError('Please enter a valid phone number.')
+        return emergency_phone
+
+
+class TraineeImportForm(forms.Form):
+    """Admin upload form for a trainee CSV"""
+    csv_file = forms.FileField(label='CSV file')
+    dry_run = forms.BooleanField(required=False, help_text="Validate every row without creating accounts")
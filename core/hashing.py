@@ -0,0 +1,52 @@
+"""
+Password hashing spread over worker processes.
+
+The configured hasher (PBKDF2 by default) is deliberately CPU-bound, so
+bulk account creation hashes in a process pool instead of one row at a
+time. Workers are spawned rather than forked so pools are also safe to
+start from threaded servers; each sets Django up once on start. This module
+must not import models, since spawned workers import it before setup.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+# Below this many passwords a pool costs more to start than it saves
+MIN_POOL_PASSWORDS = 16
+
+
+def _init_worker(settings_module):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def hashing_pool(workers=None):
+    """A process pool for hash_passwords, or None when ``workers`` is 0."""
+    if workers == 0:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'blackcobra_.settings'),),
+    )
+
+
+def hash_passwords(passwords, pool=None):
+    """
+    Hashes for ``passwords`` in order. Empty passwords get an unusable
+    hash without the hasher's cost.
+    """
+    hashed = [make_password(None) if not password else None for password in passwords]
+    pending = [(index, password) for index, password in enumerate(passwords) if password]
+    if pool is None or len(pending) < MIN_POOL_PASSWORDS:
+        results = map(make_password, [password for _, password in pending])
+    else:
+        results = pool.map(make_password, [password for _, password in pending], chunksize=4)
+    for (index, _), encoded in zip(pending, results):
+        hashed[index] = encoded
+    return hashed
@@ -0,0 +1,228 @@
+"""
+Per-request instrumentation.
+
+RequestTimingMiddleware measures a sampled share of requests: SQL query
+count and time, repeated statements (the N+1 shape: one SQL string run
+again and again with different parameters), template render time and
+total time. Results go out in a ``Server-Timing`` header, which browser
+dev tools show next to the request, and in one ``core.instrumentation``
+log line per request, with the numbers also attached to the record as
+``timing`` for structured handlers. A statement repeated
+REQUEST_TIMING_DUPLICATE_THRESHOLD times or more is logged as a warning.
+
+REQUEST_TIMING_SAMPLE_RATE is the share of requests measured, from 0 (off,
+the default) to 1. Unsampled requests cost one settings lookup and a
+random number; no database wrapper is installed for them. Template.render
+is routed through the timer only while at least one sampled request is in
+flight; unsampled requests rendering meanwhile pass through it after one
+context variable check.
+
+The middleware runs natively under both WSGI and ASGI. Under ASGI a
+sampled request's database wrapper is installed from the request's sync
+thread, where Django runs its ORM work.
+
+Bodies of streaming responses are sent after the header, so their time
+is not included.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.template.base import Template
+
+
+DEFAULT_SAMPLE_RATE = 0
+DEFAULT_DUPLICATE_THRESHOLD = 10
+# Longest statement quoted in duplicate-query warnings
+MAX_LOGGED_SQL = 300
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timing', default=None)
+_original_render = Template.render
+_template_timer_lock = threading.Lock()
+_template_timer_users = 0
+
+
+class QueryTimer:
+    """Database execute wrapper that counts queries and adds up their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier statement's SQL."""
+        return self.count - len(self.statements)
+
+
+class RequestTiming:
+    """Measurements for one request."""
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.template_seconds = 0.0
+        self.rendering = False
+        self.started = time.perf_counter()
+        self.total_seconds = None
+
+    def stop(self):
+        self.total_seconds = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'queries': self.queries.count,
+            'duplicates': self.queries.duplicates,
+            'sql_ms': round(self.queries.seconds * 1000, 2),
+            'template_ms': round(self.template_seconds * 1000, 2),
+            'total_ms': round(self.total_seconds * 1000, 2),
+        }
+
+    def server_timing(self):
+        return (
+            f'sql;dur={self.queries.seconds * 1000:.2f};'
+            f'desc="{self.queries.count} queries, {self.queries.duplicates} duplicates", '
+            f'template;dur={self.template_seconds * 1000:.2f}, '
+            f'total;dur={self.total_seconds * 1000:.2f}'
+        )
+
+
+def _timed_render(self, context):
+    timing = _current.get()
+    # Includes and extends render inside the outer template; count it once
+    if timing is None or timing.rendering:
+        return _original_render(self, context)
+    timing.rendering = True
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        timing.template_seconds += time.perf_counter() - started
+        timing.rendering = False
+
+
+def start_template_timer():
+    """Route Template.render through the request timer; pair with stop_template_timer."""
+    global _template_timer_users
+    with _template_timer_lock:
+        if not _template_timer_users:
+            Template.render = _timed_render
+        _template_timer_users += 1
+
+
+def stop_template_timer():
+    """Restore Template.render once no sampled request needs the timer."""
+    global _template_timer_users
+    with _template_timer_lock:
+        _template_timer_users -= 1
+        if not _template_timer_users:
+            Template.render = _original_render
+
+
+def _add_query_timer(timer):
+    connection.execute_wrappers.append(timer)
+
+
+def _remove_query_timer(timer):
+    connection.execute_wrappers.remove(timer)
+
+
+def sample_rate():
+    return getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+
+
+def sampled():
+    rate = sample_rate()
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class RequestTimingMiddleware:
+    """Samples requests and reports their SQL, template and total time."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not sampled():
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        start_template_timer()
+        try:
+            with connection.execute_wrapper(timing.queries):
+                response = self.get_response(request)
+        finally:
+            stop_template_timer()
+            _current.reset(token)
+            timing.stop()
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not sampled():
+            return await self.get_response(request)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        start_template_timer()
+        try:
+            await sync_to_async(_add_query_timer)(timing.queries)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(_remove_query_timer)(timing.queries)
+        finally:
+            stop_template_timer()
+            _current.reset(token)
+            timing.stop()
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{existing}, {timing.server_timing()}' if existing else timing.server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def log(self, request, response, timing):
+        values = timing.as_dict()
+        logger.info(
+            'request method=%s path=%s status=%s queries=%d duplicates=%d sql_ms=%.2f template_ms=%.2f total_ms=%.2f',
+            request.method, request.path, response.status_code, values['queries'], values['duplicates'],
+            values['sql_ms'], values['template_ms'], values['total_ms'],
+            extra={'timing': {'method': request.method, 'path': request.path, 'status': response.status_code, **values}}
+        )
+
+        threshold = getattr(settings, 'REQUEST_TIMING_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+        if not timing.queries.statements:
+            return
+        sql, count = timing.queries.statements.most_common(1)[0]
+        if count >= threshold:
+            logger.warning(
+                'repeated query method=%s path=%s count=%d sql=%s',
+                request.method, request.path, count, sql[:MAX_LOGGED_SQL],
+                extra={'timing': {'method': request.method, 'path': request.path, 'count': count, 'sql': sql}}
+            )
@@ -0,0 +1,133 @@
+"""
+Materialized points leaderboard.
+
+Approved, active trainees are held in a per-process sorted structure so rank
+lookups and windows ("top 50", "10 around me") are bisects over memory
+instead of COUNT queries over the trainee table. Points awards update the
+structure in place; other workers see the version counter move (see
+core/cache_versions.py) and reload with a single query.
+"""
+from bisect import bisect_left, insort
+from collections import Counter, namedtuple
+
+from .cache_versions import DatabaseCounter, LocalCopy
+from .models import Trainee
+
+
+LEADERBOARD_VERSION_KEY = 'core:leaderboard:version'
+DEFAULT_PAGE_SIZE = 50
+
+RANKING_COMPETITION = 'competition'  # 1, 2, 2, 4
+RANKING_DENSE = 'dense'              # 1, 2, 2, 3
+
+LeaderboardEntry = namedtuple('LeaderboardEntry', ['trainee_id', 'points', 'position', 'rank'])
+
+class Leaderboard:
+    """
+    Trainees sorted by points (desc), then first name, then id.
+    Sort keys are ``(-points, name, trainee_id)`` tuples so ties in points
+    stay adjacent and ``(-points,)`` bisects to the first trainee on a score.
+    """
+
+    def __init__(self, rows):
+        self._keys_by_id = {
+            trainee_id: (-points, name or '', trainee_id) for trainee_id, points, name in rows
+        }
+        self._keys = sorted(self._keys_by_id.values())
+        self._score_counts = Counter(key[0] for key in self._keys)
+        self._scores = sorted(self._score_counts)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, trainee_id):
+        return trainee_id in self._keys_by_id
+
+    def points(self, trainee_id):
+        return -self._keys_by_id[trainee_id][0]
+
+    def position(self, trainee_id):
+        """1-based row position, unique per trainee."""
+        return bisect_left(self._keys, self._keys_by_id[trainee_id]) + 1
+
+    def rank_for_points(self, points, method=RANKING_COMPETITION):
+        """Rank a score would have, whether or not anyone holds it."""
+        if method == RANKING_DENSE:
+            return bisect_left(self._scores, -points) + 1
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def rank(self, trainee_id, method=RANKING_COMPETITION):
+        return self.rank_for_points(self.points(trainee_id), method)
+
+    def update(self, trainee_id, points):
+        """Move one trainee to a new score without rebuilding the board."""
+        old_key = self._keys_by_id.get(trainee_id)
+        if old_key is None or old_key[0] == -points:
+            return
+        del self._keys[bisect_left(self._keys, old_key)]
+        self._score_counts[old_key[0]] -= 1
+        if not self._score_counts[old_key[0]]:
+            del self._score_counts[old_key[0]]
+            del self._scores[bisect_left(self._scores, old_key[0])]
+
+        new_key = (-points, old_key[1], trainee_id)
+        insort(self._keys, new_key)
+        self._keys_by_id[trainee_id] = new_key
+        if not self._score_counts[new_key[0]]:
+            insort(self._scores, new_key[0])
+        self._score_counts[new_key[0]] += 1
+
+    def window(self, start, stop, method=RANKING_COMPETITION):
+        """Entries for 0-based positions ``start`` (inclusive) to ``stop``."""
+        start = max(0, start)
+        return [
+            LeaderboardEntry(
+                trainee_id=key[2],
+                points=-key[0],
+                position=start + offset + 1,
+                rank=self.rank_for_points(-key[0], method),
+            )
+            for offset, key in enumerate(self._keys[start:stop])
+        ]
+
+    def top(self, limit=DEFAULT_PAGE_SIZE, method=RANKING_COMPETITION):
+        return self.window(0, limit, method)
+
+    def page(self, number, per_page=DEFAULT_PAGE_SIZE, method=RANKING_COMPETITION):
+        start = (max(1, number) - 1) * per_page
+        return self.window(start, start + per_page, method)
+
+    def around(self, trainee_id, radius=5, method=RANKING_COMPETITION):
+        """The trainee plus up to ``radius`` neighbours on each side."""
+        index = self.position(trainee_id) - 1
+        return self.window(index - radius, index + radius + 1, method)
+
+
+def _load():
+    rows = Trainee.objects.filter(
+        is_active=True,
+        is_approved=True
+    ).values_list('pk', 'total_points', 'user__first_name')
+    return Leaderboard(rows)
+
+
+board_copy = LocalCopy(DatabaseCounter(LEADERBOARD_VERSION_KEY), _load)
+
+
+def get_leaderboard():
+    """Return the local board, reloading it if the shared version moved."""
+    return board_copy.get()
+
+
+def invalidate_leaderboard():
+    """Drop the local board and force every worker to reload."""
+    board_copy.invalidate()
+
+
+def record_points_change(trainee_id):
+    """Apply a trainee's committed total to the local board in place."""
+    total_points = Trainee.objects.filter(pk=trainee_id).values_list('total_points', flat=True).first()
+    if total_points is None:
+        invalidate_leaderboard()
+        return
+    board_copy.update(lambda board: board.update(trainee_id, total_points))
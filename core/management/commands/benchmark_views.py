@@ -0,0 +1,106 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core import benchmarks
+
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every core view against a generated dataset in a throwaway test database '
+        'and check query counts and response sizes against their budgets and, with SQL time '
+        'and latency, against the baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+        parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--size', choices=list(benchmarks.synthetic.PRESETS), help="Dataset preset; defaults to the baseline's")
+        parser.add_argument('--seed', type=int, help="Dataset seed; defaults to the baseline's")
+        parser.add_argument('--repeat', type=int, default=benchmarks.DEFAULT_REPEAT, help='Requests per view')
+        parser.add_argument('--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+                            help='Allowed relative growth in latency, SQL time and size (1.0 = double); '
+                                 'timings are first scaled for machine speed')
+        parser.add_argument('--min-ms', type=float, default=benchmarks.DEFAULT_MIN_MS,
+                            help='Timing changes below this many milliseconds never fail')
+        parser.add_argument('--view', action='append', dest='views', help='Only benchmark this URL name (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        unknown = sorted(set(options['views'] or ()) - set(benchmarks.url_names()))
+        if unknown:
+            raise CommandError(f'Unknown view: {", ".join(unknown)}')
+
+        baseline = None
+        if os.path.exists(options['baseline']):
+            baseline = benchmarks.load_baseline(options['baseline'])
+        elif not options['update_baseline']:
+            raise CommandError(f'No baseline at {options["baseline"]}; run with --update-baseline to create one')
+
+        size = options['size'] or (baseline or {}).get('size', benchmarks.DEFAULT_SIZE)
+        seed = options['seed'] if options['seed'] is not None else (baseline or {}).get('seed', benchmarks.synthetic.DEFAULT_SEED)
+        if baseline and (size, seed) != (baseline['size'], baseline['seed']) and not options['update_baseline']:
+            raise CommandError(
+                f'The baseline was recorded on the {baseline["size"]} dataset with seed {baseline["seed"]}'
+            )
+
+        report = self.benchmark(size, seed, options['repeat'], options['views'])
+
+        baseline_views = baseline['views'] if baseline else {}
+        ratio = benchmarks.speed_ratio(report, baseline)
+        if baseline:
+            self.stdout.write(f'Calibration {report["calibration_ms"]:.1f} ms; timings scaled x{ratio:.2f} from the baseline')
+        comparisons = benchmarks.compare(
+            report['views'], baseline_views, options['threshold'], options['min_ms'], ratio
+        )
+        self.stdout.write(benchmarks.format_report(comparisons))
+
+        if options['update_baseline']:
+            if options['views'] and baseline and (size, seed) == (baseline['size'], baseline['seed']):
+                # Keep the baseline's calibration; bring the new timings onto its machine
+                report['views'] = {**baseline_views, **benchmarks.rescale(report['views'], ratio)}
+                report['calibration_ms'] = baseline.get('calibration_ms', report['calibration_ms'])
+            os.makedirs(os.path.dirname(options['baseline']) or '.', exist_ok=True)
+            benchmarks.save_baseline(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}'))
+            return
+
+        failed = [comparison for comparison in comparisons if comparison.failures]
+        new = [comparison for comparison in comparisons if comparison.baseline is None]
+        if new:
+            self.stdout.write(self.style.WARNING(
+                f'{len(new)} views have no baseline; run with --update-baseline to record them.'
+            ))
+        known = [comparison for comparison in comparisons if comparison.known and not comparison.failures]
+        if known:
+            self.stdout.write(self.style.WARNING(
+                f'{len(known)} views are known to be over budget; see KNOWN_FAILURES in core/benchmarks.py.'
+            ))
+        if failed:
+            raise CommandError(f'{len(failed)} of {len(comparisons)} views are over budget.')
+        self.stdout.write(self.style.SUCCESS(f'{len(comparisons) - len(known)} views are within budget.'))
+
+    def benchmark(self, size, seed, repeat, views):
+        """Run the suite in a fresh test database so the real one is never touched."""
+        # Expected 4xx responses show up in the report; keep them out of the logs
+        logging.disable(logging.WARNING)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            return benchmarks.run(
+                size, seed, repeat, views,
+                log=lambda message: self.stderr.write(f'  {message}')
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            logging.disable(logging.NOTSET)
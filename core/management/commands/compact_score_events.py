@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from core.models import Match
+from core.scoring import compact_match, compactable_matches
+
+
+class Command(BaseCommand):
+    help = 'Collapse the score event logs of finished matches into final-score snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='Matches compacted per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without compacting')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        last_pk = 0
+        compacted = 0
+        removed = 0
+
+        while True:
+            matches = list(
+                Match.objects.filter(pk__in=compactable_matches().filter(pk__gt=last_pk).values('pk'))
+                .order_by('pk')[:chunk_size]
+            )
+            if not matches:
+                break
+
+            for match in matches:
+                if dry_run:
+                    compacted += 1
+                    continue
+                # Each match is compacted in its own transaction
+                rows, replayed = compact_match(match)
+                if replayed != (match.score1, match.score2):
+                    self.stdout.write(self.style.WARNING(
+                        f'Match {match.pk}: log replays to {replayed[0]}-{replayed[1]}, '
+                        f'snapshot uses stored {match.score1}-{match.score2}'
+                    ))
+                compacted += 1
+                removed += rows
+            last_pk = matches[-1].pk
+
+        verb = 'Would compact' if dry_run else 'Compacted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {compacted} matches. Removed {removed} score events.'))
@@ -0,0 +1,47 @@
+from django.core.exceptions import BadRequest
+from django.core.management.base import BaseCommand, CommandError
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream trainees, payments, matches or points as CSV or JSON Lines, filtered like the list views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', default='csv', choices=sorted(exports.FORMATS))
+        parser.add_argument('--output', help='File to write; defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help='Rows fetched per round trip')
+        parser.add_argument('--search', help='Trainees: search terms, as on the trainee list')
+        parser.add_argument('--status', help='Payments: all, pending, paid or overdue')
+        parser.add_argument('--event', help='Matches: event id')
+        parser.add_argument('--trainee', help='Matches and points: trainee id')
+        parser.add_argument('--type', help='Points: transaction type')
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name]
+            for name in ('search', 'status', 'event', 'trainee', 'type')
+            if options[name] is not None
+        }
+        try:
+            lines = exports.stream(options['dataset'], params, options['format'], options['chunk_size'])
+        except BadRequest as error:
+            raise CommandError(str(error))
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else None
+        try:
+            written = 0
+            for line in lines:
+                if output:
+                    output.write(line)
+                else:
+                    self.stdout.write(line, ending='')
+                written += 1
+        finally:
+            if output:
+                output.close()
+
+        if options['format'] == 'csv':
+            written -= 1
+        # Keep stdout clean for the export itself
+        self.stderr.write(f'Exported {written} {options["dataset"]}.', style_func=self.style.SUCCESS)
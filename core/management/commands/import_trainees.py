@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from core import trainee_import
+
+
+class Command(BaseCommand):
+    help = 'Import trainees from a CSV file in batches, reporting invalid rows without stopping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--batch-size', type=int, default=trainee_import.BATCH_SIZE, help='Rows written per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes; 0 hashes in-process')
+        parser.add_argument('--pending', action='store_true', help='Create trainees awaiting approval instead of active ones')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing')
+
+    def handle(self, *args, **options):
+        try:
+            csv_file = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as error:
+            raise CommandError(str(error))
+
+        with csv_file:
+            result = trainee_import.import_trainees(
+                csv_file,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                approve=not options['pending'],
+            )
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f'Line {error.line}: {error.message}'))
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} of {result.rows} rows. {len(result.errors)} rows had errors.'
+        ))
@@ -1,15 +1,31 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User, Group
+from django.utils.dateparse import parse_date
 from core.models import Trainee, Belt
+from core.synthetic import explicit_timestamps
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 import random
 
 
 class Command(BaseCommand):
     help = 'Populate database with sample accounts for Admin, Judge, and Trainees'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible join and birth dates')
+        parser.add_argument('--today', default=None, help='YYYY-MM-DD anchor for account and join dates; defaults to today')
+
     def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs.get('seed'))
+        today = timezone.localdate()
+        if kwargs.get('today'):
+            try:
+                today = parse_date(kwargs['today'])
+            except ValueError:
+                today = None
+            if today is None:
+                raise CommandError('--today must be YYYY-MM-DD')
+        joined = datetime.combine(today, time(12), tzinfo=dt_timezone.utc)
         self.stdout.write(self.style.SUCCESS('Starting account population...'))
 
         # Create Groups if they don't exist
@@ -48,6 +64,7 @@ class Command(BaseCommand):
                 'last_name': 'User',
                 'is_staff': True,
                 'is_superuser': True,
+                'date_joined': joined,
             }
         )
         if created:
@@ -75,6 +92,7 @@ class Command(BaseCommand):
                     'email': judge_data['email'],
                     'first_name': judge_data['first_name'],
                     'last_name': judge_data['last_name'],
+                    'date_joined': joined,
                 }
             )
             if created:
@@ -108,26 +126,28 @@ class Command(BaseCommand):
             )
             
             if created:
+                # Create Trainee profile
+                days_ago = rng.randint(30, 365)
+                join_date = today - timedelta(days=days_ago)
+                birth_year = rng.randint(1990, 2010)
+
                 trainee_user.set_password('trainee123')
+                trainee_user.date_joined = datetime.combine(join_date, time(12), tzinfo=dt_timezone.utc)
                 trainee_user.save()
                 trainee_user.groups.add(trainee_group)
-
-                # Create Trainee profile
-                days_ago = random.randint(30, 365)
-                join_date = timezone.now().date() - timedelta(days=days_ago)
-                birth_year = random.randint(1990, 2010)
                 
-                Trainee.objects.create(
-                    user=trainee_user,
-                    date_of_birth=f'{birth_year}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
-                    belt=belts[trainee_data['belt']],
-                    contact_number=trainee_data['contact'],
-                    address=trainee_data['address'],
-                    join_date=join_date,
-                    emergency_contact=f'{trainee_data["first_name"]} Parent',
-                    emergency_phone=f'555-{random.randint(1000, 9999)}',
-                    is_active=True,
-                )
+                with explicit_timestamps(Trainee._meta.get_field('join_date')):
+                    Trainee.objects.create(
+                        user=trainee_user,
+                        date_of_birth=f'{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                        belt=belts[trainee_data['belt']],
+                        contact_number=trainee_data['contact'],
+                        address=trainee_data['address'],
+                        join_date=join_date,
+                        emergency_contact=f'{trainee_data["first_name"]} Parent',
+                        emergency_phone=f'555-{rng.randint(1000, 9999)}',
+                        is_active=True,
+                    )
                 
                 self.stdout.write(self.style.SUCCESS(f'Created trainee: {trainee_user.username} ({trainee_data["belt"]}) (password: trainee123)'))
             else:
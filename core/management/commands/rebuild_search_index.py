@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trainee full-text search index from the live tables'
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stdout.write(self.style.WARNING('Full-text search is not available on this database; LIKE search needs no index.'))
+            return
+
+        with transaction.atomic():
+            count = search.rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} trainees.'))
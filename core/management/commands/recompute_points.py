@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from core.leaderboard import invalidate_leaderboard
+from core.models import PointsTransaction, Trainee
+
+
+class Command(BaseCommand):
+    help = 'Verify Trainee.total_points against the points ledger and repair drift in resumable chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Trainees checked per transaction')
+        parser.add_argument('--start-after', type=int, default=0, help='Resume after this trainee id')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def ledger_totals(self, trainees):
+        ledger = PointsTransaction.objects.filter(trainee=OuterRef('pk')).order_by().values('trainee').annotate(
+            total=Sum('points')
+        ).values('total')
+        return trainees.annotate(ledger_total=Coalesce(Subquery(ledger), 0))
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        last_pk = options['start_after']
+        checked = 0
+        fixed = 0
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    self.ledger_totals(Trainee.objects.filter(pk__gt=last_pk))
+                    .order_by('pk')
+                    .values_list('pk', 'total_points', 'ledger_total')[:chunk_size]
+                )
+                if not rows:
+                    break
+
+                drifted = {pk: ledger - stored for pk, stored, ledger in rows if ledger != stored}
+                if drifted and not dry_run:
+                    # Corrections are deltas, so awards committed meanwhile are preserved
+                    for pk, delta in drifted.items():
+                        Trainee.objects.filter(pk=pk).update(total_points=F('total_points') + delta)
+
+                    still_drifted = self.ledger_totals(Trainee.objects.filter(pk__in=drifted)).exclude(
+                        total_points=F('ledger_total')
+                    ).values_list('pk', flat=True)
+                    for pk in still_drifted:
+                        self.stdout.write(self.style.ERROR(f'Trainee {pk}: total still differs from ledger'))
+
+            for pk, delta in drifted.items():
+                self.stdout.write(self.style.WARNING(f'Trainee {pk}: total off by {-delta}'))
+            last_pk = rows[-1][0]
+            checked += len(rows)
+            fixed += len(drifted)
+            # Checkpoint so an interrupted run can continue with --start-after
+            self.stdout.write(f'Checkpoint: --start-after {last_pk}')
+
+        if fixed and not dry_run:
+            invalidate_leaderboard()
+
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} trainees. {verb} {fixed} with drift.'))
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import Trainee, TraineeBalance
+
+
+class Command(BaseCommand):
+    help = 'Verify TraineeBalance rows against unpaid payments and repair drift in resumable chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Trainees checked per transaction')
+        parser.add_argument('--start-after', type=int, default=0, help='Resume after this trainee id')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        last_pk = options['start_after']
+        checked = 0
+        fixed = 0
+        zero = (Decimal('0.00'), 0)
+
+        while True:
+            with transaction.atomic():
+                trainee_ids = list(
+                    Trainee.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+                )
+                if not trainee_ids:
+                    break
+
+                ledger = TraineeBalance.ledger(trainee_ids)
+                stored = {
+                    pk: (outstanding, count)
+                    for pk, outstanding, count in TraineeBalance.objects.filter(
+                        trainee_id__in=trainee_ids
+                    ).values_list('trainee_id', 'outstanding', 'unpaid_count')
+                }
+                # Trainees with no row and nothing unpaid already read as zero
+                drifted = [pk for pk in trainee_ids if ledger.get(pk, zero) != stored.get(pk, zero)]
+                if drifted and not dry_run:
+                    TraineeBalance.refresh(drifted)
+
+            for pk in drifted:
+                outstanding, count = stored.get(pk, zero)
+                actual, actual_count = ledger.get(pk, zero)
+                self.stdout.write(self.style.WARNING(
+                    f'Trainee {pk}: stored {outstanding} over {count} payments, '
+                    f'actual {actual} over {actual_count}'
+                ))
+            last_pk = trainee_ids[-1]
+            checked += len(trainee_ids)
+            fixed += len(drifted)
+            # Checkpoint so an interrupted run can continue with --start-after
+            self.stdout.write(f'Checkpoint: --start-after {last_pk}')
+
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} trainees. {verb} {fixed} with drift.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef
+from core.models import Event, EventRegistration, subquery_count
+
+
+class Command(BaseCommand):
+    help = 'Recompute Event.registered_count from approved registrations, fixing drift in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Events checked per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        approved = EventRegistration.objects.filter(event=OuterRef('pk'), status='approved')
+
+        last_pk = 0
+        checked = 0
+        fixed = 0
+        while True:
+            # Each chunk is locked and corrected in its own short transaction
+            with transaction.atomic():
+                events = list(
+                    Event.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .only('pk', 'registered_count')
+                    .annotate(actual_count=subquery_count(approved))
+                    .select_for_update()[:chunk_size]
+                )
+                if not events:
+                    break
+
+                drifted = [event for event in events if event.registered_count != event.actual_count]
+                for event in drifted:
+                    self.stdout.write(self.style.WARNING(
+                        f'Event {event.pk}: stored {event.registered_count}, actual {event.actual_count}'
+                    ))
+                    event.registered_count = event.actual_count
+                if drifted and not dry_run:
+                    Event.objects.bulk_update(drifted, ['registered_count'])
+
+            last_pk = events[-1].pk
+            checked += len(events)
+            fixed += len(drifted)
+
+        verb = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} events. {verb} {fixed} with drift.'))
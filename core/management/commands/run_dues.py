@@ -0,0 +1,46 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from core import dues
+
+
+class Command(BaseCommand):
+    help = "Create a period's dues payments for every active, approved trainee and notify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default=None, help='YYYY-MM; defaults to the current month')
+        parser.add_argument('--amount', required=True, help='Dues amount per trainee')
+        parser.add_argument('--due-date', default=None, help='YYYY-MM-DD; defaults to the first day of the period')
+        parser.add_argument('--description', default=None, help='Payment description; defaults to "Monthly dues YYYY-MM"')
+        parser.add_argument('--no-notify', action='store_true', help='Skip the "New Payment Due" notifications')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without writing')
+
+    def handle(self, *args, **options):
+        period = options['period'] or dues.current_period()
+        due_date = None
+        if options['due_date']:
+            try:
+                due_date = parse_date(options['due_date'])
+            except ValueError:
+                pass
+            if due_date is None:
+                raise CommandError('--due-date must be YYYY-MM-DD')
+        try:
+            run = dues.run_dues(
+                period,
+                options['amount'],
+                due_date=due_date,
+                description=options['description'],
+                notify=not options['no_notify'],
+                dry_run=options['dry_run'],
+            )
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+        except ArithmeticError:
+            raise CommandError('--amount must be a number')
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {run.created} dues payments for {run.period}. '
+            f'Skipped {run.skipped} trainees who already had them.'
+        ))
@@ -0,0 +1,168 @@
+"""
+Live match updates for judge dashboards.
+
+Match saves publish a small event (created, rescheduled, scored, completed)
+once the transaction commits. The configured broker hands each event to
+every worker's in-process hub, which fans it out to the Server-Sent Events
+streams of the judges involved.
+
+LocalBroker is the single-process stand-in. A deployment with several
+workers sets MATCH_EVENTS_BROKER to a broker that relays messages through
+a shared channel and calls ``hub.dispatch`` on each worker.
+"""
+import asyncio
+import json
+import threading
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+MATCH_CREATED = 'created'
+MATCH_RESCHEDULED = 'rescheduled'
+MATCH_SCORED = 'scored'
+MATCH_COMPLETED = 'completed'
+
+HEARTBEAT_INTERVAL = 15
+RECONNECT_DELAY_MS = 5000
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One open stream. Messages may be delivered from any thread."""
+
+    def __init__(self, hub, judge_id):
+        self.hub = hub
+        self.judge_id = judge_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A stalled client misses events; its fallback poll catches up
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class BroadcastHub:
+    """In-process registry of open streams, keyed by judge."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, judge_id):
+        """Register a stream; must be called from the stream's event loop."""
+        subscription = Subscription(self, judge_id)
+        with self._lock:
+            self._subscriptions.setdefault(judge_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.judge_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.judge_id]
+
+    def subscriber_count(self, judge_id=None):
+        with self._lock:
+            if judge_id is not None:
+                return len(self._subscriptions.get(judge_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def dispatch(self, message):
+        """Deliver a published message to the streams of its judges."""
+        with self._lock:
+            targets = [
+                subscription
+                for judge_id in message['judge_ids']
+                for subscription in self._subscriptions.get(judge_id, ())
+            ]
+        for subscription in targets:
+            subscription.deliver(message)
+        return len(targets)
+
+
+hub = BroadcastHub()
+
+
+class LocalBroker:
+    """Delivers straight to this process's hub."""
+
+    def publish(self, message):
+        hub.dispatch(message)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    path = getattr(settings, 'MATCH_EVENTS_BROKER', 'core.match_events.LocalBroker')
+    return import_string(path)()
+
+
+def change_kind(match, created, stored_state):
+    """Which kind of event a save represents, or None for no visible change."""
+    if created:
+        return MATCH_CREATED
+    if stored_state is None:
+        return None
+    if match.winner_id is not None and stored_state['winner_id'] is None:
+        return MATCH_COMPLETED
+    if (match.score1, match.score2) != (stored_state['score1'], stored_state['score2']):
+        return MATCH_SCORED
+    if match.match_time != stored_state['match_time'] or match.judge_id != stored_state['judge_id']:
+        return MATCH_RESCHEDULED
+    return None
+
+
+def build_message(kind, match_id, event_id, judge_ids):
+    return {
+        'type': kind,
+        'match_id': match_id,
+        'event_id': event_id,
+        'judge_ids': sorted(set(judge_ids) - {None}),
+    }
+
+
+def publish(message):
+    """Hand a message to the broker; a no-op when nobody judges the match."""
+    if message['judge_ids']:
+        get_broker().publish(message)
+
+
+def publish_on_commit(message):
+    transaction.on_commit(partial(publish, message))
+
+
+def format_event(message):
+    data = {key: value for key, value in message.items() if key != 'judge_ids'}
+    return f'event: match\ndata: {json.dumps(data)}\n\n'
+
+
+async def stream(judge_id, heartbeat=HEARTBEAT_INTERVAL):
+    """SSE body for one judge: match events plus keep-alive comments."""
+    subscription = hub.subscribe(judge_id)
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        while True:
+            try:
+                message = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(message)
+    finally:
+        subscription.close()
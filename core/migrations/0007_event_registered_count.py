@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:03
+
+from django.db import migrations, models
+
+
+def populate_registered_count(apps, schema_editor):
+    Event = apps.get_model("core", "Event")
+    EventRegistration = apps.get_model("core", "EventRegistration")
+    counts = (
+        EventRegistration.objects.filter(status="approved")
+        .values("event_id")
+        .annotate(total=models.Count("id"))
+    )
+    for row in counts:
+        Event.objects.filter(pk=row["event_id"]).update(registered_count=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_alter_belt_options_belt_points_required_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="registered_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Approved registrations, maintained by EventRegistration writes",
+            ),
+        ),
+        migrations.RunPython(populate_registered_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_notification_stamps(apps, schema_editor):
+    Notification = apps.get_model("core", "Notification")
+    NotificationStamp = apps.get_model("core", "NotificationStamp")
+    counts = (
+        Notification.objects.values("user_id")
+        .annotate(unread=models.Count("id", filter=models.Q(is_read=False)))
+        .order_by()
+    )
+    NotificationStamp.objects.bulk_create(
+        [NotificationStamp(user_id=row["user_id"], unread_count=row["unread"]) for row in counts],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0007_event_registered_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationStamp",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="notification_stamp",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(default=0)),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(populate_notification_stamps, migrations.RunPython.noop),
+    ]
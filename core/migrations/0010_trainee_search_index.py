@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SEARCH_TABLE = "core_trainee_search"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "trainee_id UNINDEXED, first_name, last_name, username, email, belt, contact_number, "
+            "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5; trainee search falls back to LIKE
+        return
+    schema_editor.execute(
+        f"INSERT INTO {SEARCH_TABLE} "
+        "(trainee_id, first_name, last_name, username, email, belt, contact_number) "
+        "SELECT t.id, u.first_name, u.last_name, u.username, u.email, COALESCE(b.name, ''), t.contact_number "
+        "FROM core_trainee t JOIN auth_user u ON u.id = t.user_id "
+        "LEFT JOIN core_belt b ON b.id = t.belt_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_scoreevent"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_trainee_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["-date", "-id"], name="core_payment_date_id"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["paid", "date"], name="core_payment_paid_date"),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def populate_trainee_balances(apps, schema_editor):
+    Payment = apps.get_model("core", "Payment")
+    TraineeBalance = apps.get_model("core", "TraineeBalance")
+    totals = (
+        Payment.objects.filter(paid=False)
+        .values("trainee_id")
+        .annotate(total=models.Sum("amount"), count=models.Count("id"))
+        .order_by()
+    )
+    TraineeBalance.objects.bulk_create(
+        [
+            TraineeBalance(
+                trainee_id=row["trainee_id"],
+                outstanding=row["total"],
+                unpaid_count=row["count"],
+            )
+            for row in totals
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_payment_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TraineeBalance",
+            fields=[
+                (
+                    "trainee",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="balance",
+                        serialize=False,
+                        to="core.trainee",
+                    ),
+                ),
+                (
+                    "outstanding",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=10
+                    ),
+                ),
+                ("unpaid_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(populate_trainee_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_traineebalance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="period",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Dues period (YYYY-MM) for payments made by a dues run",
+                max_length=7,
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("period__isnull", False)),
+                fields=("trainee", "period"),
+                name="core_payment_trainee_period",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_cache_table"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionCounter",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                (
+                    "generation",
+                    models.CharField(
+                        default=core.models._new_generation, max_length=32
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_version_counter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboardstat",
+            name="stale",
+            field=models.BooleanField(
+                default=False,
+                help_text="Set when a source table changed since the last compute",
+            ),
+        ),
+    ]
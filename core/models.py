@@ -1,4 +1,10 @@
-from django.db import models
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, FloatField, Func, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -14,6 +20,42 @@ class Belt(models.Model):
     def __str__(self):
         return self.name
 
+def subquery_count(queryset):
+    """Wrap a correlated queryset as a scalar COUNT(*) subquery."""
+    return Coalesce(
+        Subquery(queryset.order_by().values(count=Func(F('pk'), function='COUNT'))),
+        0,
+    )
+
+
+class TraineeQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Annotate match totals, wins, win rate and unpaid balance in a single
+        statement so list views don't run per-row COUNT/SUM queries.
+        """
+        total_matches = subquery_count(
+            Match.objects.filter(Q(trainee1=OuterRef('pk')) | Q(trainee2=OuterRef('pk')))
+        )
+        wins = subquery_count(Match.objects.filter(winner=OuterRef('pk')))
+        return self.annotate(
+            stats_total_matches=total_matches,
+            stats_wins=wins,
+            # Joined on the balance row's primary key instead of summing payments
+            stats_outstanding_balance=Coalesce(
+                F('balance__outstanding'),
+                Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        ).annotate(
+            stats_win_rate=Case(
+                When(stats_total_matches=0, then=Value(0.0)),
+                default=F('stats_wins') * 100.0 / F('stats_total_matches'),
+                output_field=FloatField(),
+            ),
+        )
+
+
 class Trainee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     date_of_birth = models.DateField()
@@ -28,12 +70,16 @@ class Trainee(models.Model):
     is_approved = models.BooleanField(default=False)  # Requires admin approval
     total_points = models.PositiveIntegerField(default=0, help_text="Total points earned from training and events")
 
+    objects = TraineeQuerySet.as_manager()
+
     def __str__(self):
         return self.user.get_full_name() or self.user.username
     
     @property
     def win_rate(self):
         """Calculate win percentage"""
+        if hasattr(self, 'stats_win_rate'):
+            return self.stats_win_rate
         total_matches = self.matches_as_trainee1.count() + self.matches_as_trainee2.count()
         if total_matches == 0:
             return 0
@@ -42,17 +88,19 @@ class Trainee(models.Model):
     
     @property
     def outstanding_balance(self):
-        """Calculate total unpaid amount"""
-        return self.payments.filter(paid=False).aggregate(
-            total=models.Sum('amount')
-        )['total'] or 0
+        """Total unpaid amount, read from the trainee's balance row"""
+        if hasattr(self, 'stats_outstanding_balance'):
+            return self.stats_outstanding_balance
+        try:
+            return self.balance.outstanding
+        except TraineeBalance.DoesNotExist:
+            return TraineeBalance.for_trainee(self).outstanding
     
     @property
     def next_belt(self):
         """Get the next belt in progression"""
-        if self.belt:
-            return Belt.objects.filter(order__gt=self.belt.order).first()
-        return Belt.objects.first()
+        from .belts import get_ladder
+        return get_ladder().next_belt(self.belt_id)
     
     @property
     def points_to_next_belt(self):
@@ -64,13 +112,17 @@ class Trainee(models.Model):
     
     @property
     def rank(self):
-        """Get trainee's rank based on total points (1 = highest)"""
-        from django.db.models import Count
-        higher_ranked = Trainee.objects.filter(
-            is_active=True,
-            total_points__gt=self.total_points
-        ).count()
-        return higher_ranked + 1
+        """
+        Get trainee's rank based on total points (1 = highest). Ranked among
+        the trainees on the leaderboard page (active and approved), so it
+        matches the position shown there; unapproved trainees get the rank
+        their points would have.
+        """
+        from .leaderboard import get_leaderboard
+        board = get_leaderboard()
+        if self.pk in board:
+            return board.rank(self.pk)
+        return board.rank_for_points(self.total_points)
 
 class Event(models.Model):
     EVENT_TYPE_CHOICES = [
@@ -89,10 +141,22 @@ class Event(models.Model):
     max_participants = models.PositiveIntegerField(null=True, blank=True)
     registration_deadline = models.DateTimeField(null=True, blank=True)
     is_published = models.BooleanField(default=False)
+    registered_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Approved registrations, maintained by EventRegistration writes"
+    )
 
     def __str__(self):
         return self.name
     
+    @classmethod
+    def adjust_registered_count(cls, event_id, delta):
+        """Atomically apply a delta to registered_count, never going below zero"""
+        events = cls.objects.filter(pk=event_id)
+        if delta < 0:
+            events = events.filter(registered_count__gte=-delta)
+        events.update(registered_count=F('registered_count') + delta)
+    
     @property
     def is_upcoming(self):
         """Check if event is in the future"""
@@ -101,7 +165,7 @@ class Event(models.Model):
     @property
     def participant_count(self):
         """Count registered participants"""
-        return self.registrations.filter(status='approved').count()
+        return self.registered_count
     
     @property
     def is_registration_open(self):
@@ -139,6 +203,34 @@ class EventRegistration(models.Model):
     
     def __str__(self):
         return f"{self.trainee} - {self.event.name} ({self.status})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_status = instance.__dict__.get('status')
+        instance._stored_event_id = instance.__dict__.get('event_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Keep Event.registered_count in step with approved registrations"""
+        stored_status = getattr(self, '_stored_status', None) if self.pk else None
+        stored_event_id = getattr(self, '_stored_event_id', None) if self.pk else None
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            was_approved = stored_status == 'approved'
+            is_approved = self.status == 'approved'
+            if stored_event_id in (None, self.event_id):
+                delta = int(is_approved) - int(was_approved)
+                if delta:
+                    Event.adjust_registered_count(self.event_id, delta)
+            else:
+                # Moved to another event: take it off the old one, add it to the new
+                if was_approved:
+                    Event.adjust_registered_count(stored_event_id, -1)
+                if is_approved:
+                    Event.adjust_registered_count(self.event_id, 1)
+        self._stored_status = self.status
+        self._stored_event_id = self.event_id
 
 class Match(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='matches')
@@ -150,18 +242,226 @@ class Match(models.Model):
     judge = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, limit_choices_to={'groups__name': "Judge"})
     match_time = models.DateTimeField()
 
+    TRACKED_FIELDS = ('match_time', 'score1', 'score2', 'winner_id', 'judge_id')
+
     def __str__(self):
         return f"{self.trainee1} vs {self.trainee2} at {self.event}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_state = {name: instance.__dict__.get(name) for name in cls.TRACKED_FIELDS}
+        return instance
+
+class ScoreEvent(models.Model):
+    """
+    Append-only log of score changes for a match.
+    Point rows hold the requested step per corner (applied with a floor at
+    zero); snapshot rows hold absolute scores written by compaction.
+    """
+    KIND_POINT = 'point'
+    KIND_SNAPSHOT = 'snapshot'
+    KIND_CHOICES = [
+        (KIND_POINT, 'Point'),
+        (KIND_SNAPSHOT, 'Snapshot'),
+    ]
+
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='score_events')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_POINT)
+    delta1 = models.SmallIntegerField(default=0)
+    delta2 = models.SmallIntegerField(default=0)
+    judge = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['match', 'id'], name='core_scoreevent_match_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.delta1:+d}/{self.delta2:+d} for match {self.match_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Score events are append-only')
+        super().save(*args, **kwargs)
+
+class PaymentQuerySet(models.QuerySet):
+    def with_overdue(self, today=None):
+        """Annotate ``is_overdue``: unpaid and due before ``today``."""
+        today = today or timezone.now().date()
+        return self.annotate(
+            is_overdue=Case(
+                When(paid=False, date__lt=today, then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+
+    def with_status(self, status, today=None):
+        """Filter by payment_list's ``status`` choice: all, pending, paid or overdue."""
+        today = today or timezone.now().date()
+        if status == 'pending':
+            return self.filter(paid=False)
+        if status == 'paid':
+            return self.filter(paid=True)
+        if status == 'overdue':
+            return self.filter(paid=False, date__lt=today)
+        return self
+
+    def totals(self, today=None):
+        """Collected, pending and overdue amounts from one conditional aggregate."""
+        today = today or timezone.now().date()
+        zero = Value(Decimal('0.00'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        return self.aggregate(
+            total_collected=Coalesce(Sum('amount', filter=Q(paid=True)), zero),
+            total_pending=Coalesce(Sum('amount', filter=Q(paid=False)), zero),
+            total_overdue=Coalesce(Sum('amount', filter=Q(paid=False, date__lt=today)), zero),
+        )
+
+
 class Payment(models.Model):
     trainee = models.ForeignKey(Trainee, on_delete=models.CASCADE, related_name='payments')
     amount = models.DecimalField(max_digits=8, decimal_places=2)
     date = models.DateField()
     description = models.CharField(max_length=255)
     paid = models.BooleanField(default=False)
+    period = models.CharField(
+        max_length=7, null=True, blank=True, editable=False,
+        help_text="Dues period (YYYY-MM) for payments made by a dues run"
+    )
+
+    objects = PaymentQuerySet.as_manager()
+
+    BALANCE_FIELDS = ('trainee_id', 'amount', 'paid')
+
+    class Meta:
+        indexes = [
+            # Keyset pages of payment_list and its paid/overdue filters
+            models.Index(fields=['-date', '-id'], name='core_payment_date_id'),
+            models.Index(fields=['paid', 'date'], name='core_payment_paid_date'),
+        ]
+        constraints = [
+            # One dues payment per trainee and period; also the index dues runs skip by
+            models.UniqueConstraint(
+                fields=['trainee', 'period'], condition=Q(period__isnull=False),
+                name='core_payment_trainee_period'
+            ),
+        ]
 
     def __str__(self):
         return f"Payment of {self.amount} for {self.trainee} on {self.date}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.BALANCE_FIELDS) <= set(field_names):
+            instance._stored_balance = instance.balance_state()
+        return instance
+    
+    def balance_state(self):
+        """``(trainee_id, unpaid_amount, unpaid_count)`` this row adds to a balance"""
+        if self.paid:
+            return self.trainee_id, Decimal('0.00'), 0
+        return self.trainee_id, self._meta.get_field('amount').to_python(self.amount), 1
+    
+    def save(self, *args, **kwargs):
+        """Move the unpaid amount between trainee balances in the same transaction"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) & {'trainee', *self.BALANCE_FIELDS}:
+            return super().save(*args, **kwargs)
+        adding = self._state.adding
+        stored = getattr(self, '_stored_balance', None)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            current = self.balance_state()
+            if stored is None and not adding:
+                # Saved without being loaded, so the previous contribution is unknown
+                TraineeBalance.refresh([self.trainee_id])
+            else:
+                TraineeBalance.apply_change(stored, current)
+        self._stored_balance = current
+
+
+class TraineeBalance(models.Model):
+    """
+    Unpaid total per trainee, kept in step by Payment writes so balance reads
+    are a primary-key lookup. Rows are created lazily from a SUM over the
+    trainee's payments; reconcile_balances repairs drift left by bulk writes.
+    """
+    trainee = models.OneToOneField(Trainee, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    outstanding = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    unpaid_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Balance of {self.outstanding} for {self.trainee_id}"
+    
+    @classmethod
+    def ledger(cls, trainee_ids):
+        """``{trainee_id: (outstanding, unpaid_count)}`` summed from unpaid payments"""
+        rows = Payment.objects.filter(trainee_id__in=trainee_ids, paid=False).order_by().values(
+            'trainee_id'
+        ).annotate(total=Sum('amount'), count=models.Count('id'))
+        return {row['trainee_id']: (row['total'], row['count']) for row in rows}
+    
+    @classmethod
+    def adjust(cls, trainee_id, amount, count):
+        """Shift one balance in a single UPDATE. Returns the rows updated (0 if it has none yet)."""
+        return cls.objects.filter(trainee_id=trainee_id).update(
+            outstanding=F('outstanding') + amount,
+            unpaid_count=Greatest(F('unpaid_count') + count, Value(0)),
+            updated_at=timezone.now()
+        )
+    
+    @classmethod
+    def apply_change(cls, stored, current):
+        """
+        Apply a payment's move from the ``stored`` to the ``current``
+        balance_state(); ``stored`` is None for a new payment.
+        """
+        changes = defaultdict(lambda: [Decimal('0.00'), 0])
+        for state, sign in ((stored, -1), (current, 1)):
+            if state is not None:
+                trainee_id, amount, count = state
+                changes[trainee_id][0] += sign * amount
+                changes[trainee_id][1] += sign * count
+        for trainee_id, (amount, count) in changes.items():
+            if (amount or count) and not cls.adjust(trainee_id, amount, count):
+                # The SUM already sees this write, so a new row needs no delta
+                cls.for_trainee(trainee_id)
+    
+    @classmethod
+    def refresh(cls, trainee_ids):
+        """Rewrite the balances of ``trainee_ids`` from the ledger with one upsert."""
+        trainee_ids = list(trainee_ids)
+        totals = cls.ledger(trainee_ids)
+        now = timezone.now()
+        balances = []
+        for pk in trainee_ids:
+            outstanding, count = totals.get(pk, (Decimal('0.00'), 0))
+            balances.append(cls(trainee_id=pk, outstanding=outstanding, unpaid_count=count, updated_at=now))
+        cls.objects.bulk_create(
+            balances,
+            update_conflicts=True,
+            unique_fields=['trainee'],
+            update_fields=['outstanding', 'unpaid_count', 'updated_at'],
+            batch_size=500
+        )
+    
+    @classmethod
+    def for_trainee(cls, trainee):
+        """The balance for ``trainee``, summing its unpaid payments the first time."""
+        trainee_id = getattr(trainee, 'pk', trainee)
+        balance = cls.objects.filter(trainee_id=trainee_id).first()
+        if balance is None:
+            outstanding, count = cls.ledger([trainee_id]).get(trainee_id, (Decimal('0.00'), 0))
+            balance, _ = cls.objects.get_or_create(
+                trainee_id=trainee_id,
+                defaults={'outstanding': outstanding, 'unpaid_count': count}
+            )
+        return balance
+
 
 class Promotion(models.Model):
     trainee = models.ForeignKey(Trainee, on_delete=models.CASCADE, related_name='promotions')
@@ -198,17 +498,36 @@ class PointsTransaction(models.Model):
     def __str__(self):
         return f"{self.trainee} - {self.points} points for {self.get_transaction_type_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_points = instance.__dict__.get('points')
+        instance._stored_trainee_id = instance.__dict__.get('trainee_id')
+        return instance
+    
     def save(self, *args, **kwargs):
-        """Update trainee's total points when transaction is created"""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        """Apply the points delta to the trainee's running total atomically"""
+        stored_points = 0 if self._state.adding else getattr(self, '_stored_points', self.points)
+        stored_trainee_id = getattr(self, '_stored_trainee_id', None) or self.trainee_id
+        moved = not self._state.adding and stored_trainee_id != self.trainee_id
+        # A row moved to another trainee credits all of its points to them
+        delta = self.points if moved else self.points - stored_points
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if moved and stored_points:
+                Trainee.objects.filter(pk=stored_trainee_id).update(
+                    total_points=F('total_points') - stored_points
+                )
+            if delta:
+                Trainee.objects.filter(pk=self.trainee_id).update(
+                    total_points=F('total_points') + delta
+                )
+        self._stored_points = self.points
+        self._stored_trainee_id = self.trainee_id
         
-        if is_new:
-            # Update trainee's total points
-            self.trainee.total_points = self.trainee.points_transactions.aggregate(
-                total=models.Sum('points')
-            )['total'] or 0
-            self.trainee.save(update_fields=['total_points'])
+        # Keep an already-loaded trainee roughly in step without a re-read
+        if delta and PointsTransaction.trainee.is_cached(self):
+            self.trainee.total_points += delta
 
 
 class Notification(models.Model):
@@ -232,11 +551,114 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.title} for {self.user.username}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_is_read = instance.__dict__.get('is_read')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Bump the recipient's NotificationStamp on insert or read-state change"""
+        adding = self._state.adding
+        stored_is_read = getattr(self, '_stored_is_read', None)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if adding:
+                NotificationStamp.bump([self.user_id], unread_delta=int(not self.is_read))
+            elif stored_is_read is not None and stored_is_read != self.is_read:
+                NotificationStamp.bump([self.user_id], unread_delta=1 if stored_is_read else -1)
+        self._stored_is_read = self.is_read
+
+
+class NotificationStamp(models.Model):
+    """
+    Per-user notification version and unread counter.
+    The version changes whenever a notification is added, read or removed,
+    so polled notification views can answer conditional GETs from this row.
+    Rows are created lazily on first read from a COUNT of unread notifications.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_stamp')
+    version = models.PositiveIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Notifications v{self.version} for {self.user_id}"
+    
+    @property
+    def etag(self):
+        return f'"{self.user_id}-{self.version}"'
+    
+    @classmethod
+    def bump(cls, user_ids, unread_delta=0, unread_count=None):
+        """
+        Advance the version for ``user_ids`` in one UPDATE. The unread counter
+        is shifted by ``unread_delta`` (floored at zero) or set to ``unread_count``.
+        """
+        if unread_count is not None:
+            unread = Value(unread_count)
+        else:
+            unread = Greatest(F('unread_count') + unread_delta, Value(0))
+        return cls.objects.filter(user_id__in=user_ids).update(
+            version=F('version') + 1,
+            unread_count=unread,
+            updated_at=timezone.now()
+        )
+    
+    @classmethod
+    def for_user(cls, user):
+        """The stamp for ``user``, counting unread notifications the first time."""
+        stamp = cls.objects.filter(user=user).first()
+        if stamp is None:
+            stamp, _ = cls.objects.get_or_create(
+                user=user,
+                defaults={'unread_count': Notification.objects.filter(user=user, is_read=False).count()}
+            )
+        return stamp
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
 
+class VersionCounter(models.Model):
+    """
+    Shared version number for a per-process cache (see core.cache_versions).
+    ``bump`` is a single UPDATE, so concurrent workers each get a distinct
+    number. ``generation`` is random per row: a counter recreated from zero
+    never matches a version loaded from the one it replaced.
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    generation = models.CharField(max_length=32, default=_new_generation)
+    value = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key} v{self.value}"
+    
+    @classmethod
+    def read(cls, key):
+        """``(generation, value)`` for ``key``, creating the counter the first time."""
+        version = cls.objects.filter(key=key).values_list('generation', 'value').first()
+        if version is None:
+            counter, _ = cls.objects.get_or_create(key=key)
+            version = (counter.generation, counter.value)
+        return version
+    
+    @classmethod
+    def bump(cls, key):
+        """Advance ``key`` by one and return the ``(generation, value)`` this call produced."""
+        with transaction.atomic():
+            if not cls.objects.filter(key=key).update(value=F('value') + 1):
+                cls.objects.get_or_create(key=key)
+                cls.objects.filter(key=key).update(value=F('value') + 1)
+            # The row stays locked until commit, so this reads our own increment
+            return cls.objects.filter(key=key).values_list('generation', 'value').get()
 
 class DashboardStat(models.Model):
     stat_type = models.CharField(max_length=50, unique=True)
     value = models.JSONField()
+    stale = models.BooleanField(default=False, help_text="Set when a source table changed since the last compute")
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
@@ -0,0 +1,121 @@
+"""
+Notification fan-out.
+
+Messages are rendered once per send and written with bulk_create in
+batches, so notifying hundreds of trainees costs a handful of INSERTs.
+Recipients may be User instances or user ids.
+
+Every write also bumps the recipients' NotificationStamp, whose version
+backs the ETag/Last-Modified headers on the polled notification views.
+"""
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import EventRegistration, Notification, NotificationStamp
+
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _batch_size(batch_size=None):
+    return batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def _bump_stamps(notifications):
+    """One stamp UPDATE per distinct number of unread rows a user received."""
+    added = Counter(n.user_id for n in notifications)
+    unread = Counter(n.user_id for n in notifications if not n.is_read)
+    groups = defaultdict(list)
+    for user_id in added:
+        groups[unread[user_id]].append(user_id)
+    for unread_delta, user_ids in groups.items():
+        NotificationStamp.bump(user_ids, unread_delta=unread_delta)
+
+
+def build_notification(user, title, message, notification_type, link=None):
+    """An unsaved Notification for a User instance or user id."""
+    recipient = {'user': user} if hasattr(user, 'pk') else {'user_id': user}
+    return Notification(
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        link=link,
+        **recipient
+    )
+
+
+def send_notifications(notifications, batch_size=None):
+    """
+    Insert an iterable of unsaved notifications in batches, bumping the
+    recipients' stamps. Generators are consumed one batch at a time.
+    Returns the number written.
+    """
+    batch_size = _batch_size(batch_size)
+    notifications = iter(notifications)
+    sent = 0
+    while True:
+        batch = list(islice(notifications, batch_size))
+        if not batch:
+            return sent
+        Notification.objects.bulk_create(batch)
+        _bump_stamps(batch)
+        sent += len(batch)
+
+
+def notify_users(users, title, message, notification_type, link=None, context=None, batch_size=None):
+    """
+    Send the same notification to every recipient in ``users``.
+
+    ``message`` is formatted with ``context`` once, not per recipient.
+    """
+    if context:
+        message = message.format(**context)
+    return send_notifications(
+        (build_notification(user, title, message, notification_type, link) for user in users),
+        batch_size=batch_size
+    )
+
+
+def event_recipients(event, status='approved'):
+    """User ids of the trainees registered for ``event`` with ``status``."""
+    return EventRegistration.objects.filter(
+        event=event,
+        status=status
+    ).values_list('trainee__user_id', flat=True).order_by('pk')
+
+
+def announce_to_event(event, title, message, notification_type='event', link=None,
+                      status='approved', context=None, batch_size=None):
+    """Notify every registrant of ``event`` with the given status."""
+    recipients = event_recipients(event, status).iterator(chunk_size=_batch_size(batch_size))
+    return notify_users(
+        recipients, title, message, notification_type,
+        link=link, context=context, batch_size=batch_size
+    )
+
+
+def mark_all_read(user):
+    """Mark every unread notification for ``user`` as read."""
+    with transaction.atomic():
+        updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        if updated:
+            NotificationStamp.bump([user.pk], unread_count=0)
+    return updated
+
+
+def request_stamp(request):
+    """The current user's stamp, looked up once per request."""
+    if not hasattr(request, '_notification_stamp'):
+        request._notification_stamp = NotificationStamp.for_user(request.user)
+    return request._notification_stamp
+
+
+def stamp_etag(request, *args, **kwargs):
+    return request_stamp(request).etag
+
+
+def stamp_last_modified(request, *args, **kwargs):
+    return request_stamp(request).updated_at
@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Pages are selected with a WHERE on the ordering columns plus ``id`` and a
+LIMIT, never an OFFSET, so every page costs the same however deep the
+client has scrolled. The cursor is an opaque token holding the ordering
+values of the last row shown. Templates render the next page with
+``partials/keyset_sentinel.html``, which HTMX fetches when revealed.
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PER_PAGE = 25
+CURSOR_PARAM = 'cursor'
+
+
+class KeysetPage:
+    """One page of results plus the URL of the page after it."""
+
+    def __init__(self, object_list, has_next, next_url=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.next_url = next_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _ordering(queryset, ordering):
+    """``[(field_name, descending), ...]`` with ``id`` appended as tie-breaker."""
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    if fields[-1][0] not in ('id', 'pk'):
+        fields.append(('id', fields[-1][1]))
+    return fields
+
+
+def _serialize(value):
+    # isoformat keeps microseconds, which DjangoJSONEncoder would truncate
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_serialize(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(queryset, fields, cursor):
+    """Cursor values converted back to Python with each field's to_python."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [
+            queryset.model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(fields, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        raise BadRequest('Invalid cursor')
+
+
+def _after(fields, values):
+    """Rows strictly after ``values`` in the given ordering."""
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        equal = {fields[i][0]: values[i] for i in range(index)}
+        lookup = f'{name}__lt' if descending else f'{name}__gt'
+        condition |= Q(**equal, **{lookup: values[index]})
+    return condition
+
+
+def paginate(queryset, ordering, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Return ``(rows, next_cursor)`` for the page after ``cursor``.
+    Ordering columns must be non-null.
+    """
+    fields = _ordering(queryset, ordering)
+    queryset = queryset.order_by(*[('-' if desc else '') + name for name, desc in fields])
+    if cursor:
+        queryset = queryset.filter(_after(fields, decode_cursor(queryset, fields, cursor)))
+
+    rows = list(queryset[:per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, name) for name, _ in fields])
+
+
+def paginate_request(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """Page for the request's ``?cursor=``; the next URL keeps other query params."""
+    rows, next_cursor = paginate(queryset, ordering, request.GET.get(CURSOR_PARAM), per_page)
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params[CURSOR_PARAM] = next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    return KeysetPage(rows, next_cursor is not None, next_url)
+
+
+def is_next_page(request):
+    """Whether the request is an infinite-scroll fetch for a later page."""
+    return CURSOR_PARAM in request.GET and bool(request.headers.get('HX-Request'))
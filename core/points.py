@@ -0,0 +1,89 @@
+"""
+Points ledger operations that cover many trainees at once.
+"""
+from django.db import transaction
+from collections import defaultdict
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .leaderboard import invalidate_leaderboard
+from .models import PointsTransaction, Trainee
+from .notifications import notify_users
+
+
+BULK_BATCH_SIZE = 500
+
+
+def resolve_award_targets(event=None, belt=None, trainees=None):
+    """
+    Return the trainee queryset for a bulk award: the approved registrants of
+    an event, everyone active on a belt, or an explicit list of trainees.
+    """
+    if event is not None:
+        return Trainee.objects.filter(
+            event_registrations__event=event,
+            event_registrations__status='approved'
+        )
+    if belt is not None:
+        return Trainee.objects.filter(belt=belt, is_active=True, is_approved=True)
+    if trainees is not None:
+        return Trainee.objects.filter(pk__in=[getattr(t, 'pk', t) for t in trainees])
+    return Trainee.objects.none()
+
+
+def bulk_award_points(trainees, points, description, transaction_type='admin_award',
+                      awarded_by=None, event=None, notify=True):
+    """
+    Award ``points`` to every trainee in the queryset in one transaction.
+
+    Ledger rows and notifications are written with bulk_create and the
+    running totals with one UPDATE per batch. A deduction stops at zero:
+    each ledger row records what that trainee actually lost, and trainees
+    already at zero are skipped. Returns the number of trainees changed.
+    """
+    with transaction.atomic():
+        # Totals can't go negative, so each trainee's change depends on the
+        # balance read here; lock the rows where the backend supports it
+        by_delta = defaultdict(list)
+        for trainee in trainees.select_for_update().order_by('pk'):
+            delta = max(points, -trainee.total_points)
+            if delta:
+                by_delta[delta].append(trainee)
+        recipients = [trainee for group in by_delta.values() for trainee in group]
+        if not recipients:
+            return 0
+
+        PointsTransaction.objects.bulk_create([
+            PointsTransaction(
+                trainee=trainee,
+                points=delta,
+                transaction_type=transaction_type,
+                description=description,
+                event=event,
+                awarded_by=awarded_by,
+            )
+            for delta, group in by_delta.items()
+            for trainee in group
+        ], batch_size=BULK_BATCH_SIZE)
+
+        # Exactly the trainees given ledger rows, not a second read of the queryset
+        recipient_ids = [trainee.pk for trainee in recipients]
+        for start in range(0, len(recipient_ids), BULK_BATCH_SIZE):
+            Trainee.objects.filter(pk__in=recipient_ids[start:start + BULK_BATCH_SIZE]).update(
+                total_points=Greatest(F('total_points') + points, Value(0))
+            )
+
+        if notify:
+            for delta, group in by_delta.items():
+                title = 'Points Awarded!' if delta > 0 else 'Points Deducted'
+                message = f'You have {"earned" if delta > 0 else "lost"} {abs(delta)} points. Reason: {description}'
+                notify_users(
+                    [trainee.user_id for trainee in group],
+                    title, message, 'promotion',
+                    link='/leaderboard/',
+                    batch_size=BULK_BATCH_SIZE
+                )
+
+        transaction.on_commit(invalidate_leaderboard)
+    return len(recipients)
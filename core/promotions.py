@@ -0,0 +1,86 @@
+"""
+Promotion eligibility engine.
+
+Works out time in grade, completed match count, win rate and next belt for a
+whole trainee queryset in a constant number of queries, instead of running
+several lookups per trainee.
+"""
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .belts import get_ladder
+from .models import Match, Promotion, subquery_count
+
+
+DEFAULT_PROMOTION_RULES = {
+    'min_days_in_grade': 180,
+    'min_matches': 5,
+    'min_win_rate': 40,
+    # When True a trainee must also meet the match/win rate criteria
+    'require_performance': False,
+}
+
+
+def get_promotion_rules(overrides=None):
+    """
+    Return the active eligibility rules.
+    Defaults can be overridden project-wide with settings.PROMOTION_RULES
+    and per call with ``overrides``.
+    """
+    rules = dict(DEFAULT_PROMOTION_RULES)
+    rules.update(getattr(settings, 'PROMOTION_RULES', {}))
+    if overrides:
+        rules.update(overrides)
+    return rules
+
+
+def with_promotion_stats(queryset):
+    """
+    Annotate last promotion date (falling back to join date), completed
+    match count and wins as correlated subqueries.
+    """
+    last_promotion = Promotion.objects.filter(
+        trainee=OuterRef('pk')
+    ).order_by('-date').values('date')[:1]
+    completed_matches = Match.objects.exclude(winner=None).filter(
+        Q(trainee1=OuterRef('pk')) | Q(trainee2=OuterRef('pk'))
+    )
+    return queryset.annotate(
+        last_promotion_date=Coalesce(Subquery(last_promotion), F('join_date')),
+        match_count=subquery_count(completed_matches),
+        completed_wins=subquery_count(Match.objects.filter(winner=OuterRef('pk'))),
+    )
+
+
+def evaluate_promotions(queryset, rules=None, today=None):
+    """
+    Evaluate promotion eligibility for every trainee in ``queryset``.
+
+    Returns a list of trainees with ``days_since_promotion``,
+    ``time_eligible``, ``match_count``, ``calculated_win_rate``,
+    ``performance_eligible``, ``is_eligible`` and ``promotion_next_belt`` set.
+    """
+    rules = get_promotion_rules(rules)
+    today = today or timezone.now().date()
+    ladder = get_ladder()
+
+    trainees = list(with_promotion_stats(queryset.select_related('belt', 'user')))
+    for trainee in trainees:
+        days_since = (today - trainee.last_promotion_date).days
+        trainee.days_since_promotion = days_since
+        trainee.time_eligible = days_since >= rules['min_days_in_grade']
+
+        win_rate = (trainee.completed_wins / trainee.match_count * 100) if trainee.match_count > 0 else 0
+        trainee.calculated_win_rate = round(win_rate, 1)
+        trainee.performance_eligible = (
+            trainee.match_count >= rules['min_matches'] and win_rate >= rules['min_win_rate']
+        )
+
+        trainee.is_eligible = trainee.time_eligible
+        if rules['require_performance']:
+            trainee.is_eligible = trainee.is_eligible and trainee.performance_eligible
+
+        trainee.promotion_next_belt = ladder.next_belt(trainee.belt_id)
+    return trainees
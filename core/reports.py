@@ -0,0 +1,151 @@
+"""
+Chart data for the reports dashboard.
+
+Each chart is one grouped query. Results are stored in the shared cache
+under a version token that is bumped whenever trainees, belts or payments
+change (see core/signals.py), so repeated dashboard loads cost no queries.
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Case, Count, DateField, Q, Value, When
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek
+
+from .belts import get_ladder
+from .cache_versions import CacheToken
+from .models import Payment, Trainee
+
+
+CHART_CACHE_VERSION_KEY = 'core:charts:version'
+chart_version = CacheToken(CHART_CACHE_VERSION_KEY)
+CHART_CACHE_TIMEOUT = 60 * 60
+MAX_BUCKETS = 520
+
+BUCKET_TRUNC = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+
+def bucket_start(day, bucket):
+    """Start date of the bucket containing ``day``, matching the SQL Trunc."""
+    if bucket == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if bucket == 'quarter':
+        return datetime.date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    return datetime.date(day.year, day.month, 1)
+
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + datetime.timedelta(days=7)
+    months = 3 if bucket == 'quarter' else 1
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def bucket_label(day, bucket):
+    if bucket == 'week':
+        return f"Week of {day.strftime('%b %d, %Y')}"
+    if bucket == 'quarter':
+        return f'Q{(day.month - 1) // 3 + 1} {day.year}'
+    return day.strftime('%B %Y')
+
+
+def trainee_growth(start, end, bucket='month'):
+    """
+    Running total of trainees at the end of each bucket between ``start``
+    and ``end``. Trainees who joined before ``start`` are folded into the
+    first bucket so a single grouped query gives the whole series.
+    """
+    first = bucket_start(start, bucket)
+    buckets = [first]
+    while next_bucket(buckets[-1], bucket) <= end:
+        buckets.append(next_bucket(buckets[-1], bucket))
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError('Date range has too many buckets')
+
+    joined = Trainee.objects.filter(join_date__lte=end).annotate(
+        bucket=Case(
+            When(join_date__lt=first, then=Value(first)),
+            default=BUCKET_TRUNC[bucket]('join_date'),
+            output_field=DateField(),
+        )
+    ).values('bucket').annotate(count=Count('id')).order_by()
+    counts = {row['bucket']: row['count'] for row in joined}
+
+    running = 0
+    data = []
+    for day in buckets:
+        running += counts.get(day, 0)
+        data.append(running)
+
+    return {
+        'labels': [bucket_label(day, bucket) for day in buckets],
+        'datasets': [{
+            'label': 'Total Trainees',
+            'data': data,
+            'borderColor': 'rgb(79, 70, 229)',
+            'tension': 0.1,
+            'fill': False
+        }]
+    }
+
+
+def belt_distribution():
+    """Trainees per belt from one grouped query; belt names come from the ladder."""
+    counts = dict(
+        Trainee.objects.filter(belt__isnull=False).values('belt').annotate(
+            count=Count('id')
+        ).values_list('belt', 'count').order_by()
+    )
+    belts = list(get_ladder())
+    return {
+        'labels': [belt.name for belt in belts],
+        'datasets': [{
+            'label': 'Trainees per Belt',
+            'data': [counts.get(belt.pk, 0) for belt in belts],
+            # Simple color generation
+            'backgroundColor': [f'hsl({belt.order * 45 % 360}, 70%, 50%)' for belt in belts]
+        }]
+    }
+
+
+def payment_status():
+    """Paid and pending payment counts from one conditional aggregate."""
+    totals = Payment.objects.aggregate(
+        paid_count=Count('id', filter=Q(paid=True)),
+        pending_count=Count('id', filter=Q(paid=False)),
+    )
+    return {
+        'labels': ['Paid', 'Pending'],
+        'datasets': [{
+            'data': [totals['paid_count'], totals['pending_count']],
+            'backgroundColor': ['rgb(34, 197, 94)', 'rgb(239, 68, 68)']
+        }]
+    }
+
+
+CHARTS = {
+    'trainee_growth': trainee_growth,
+    'belt_distribution': belt_distribution,
+    'payment_status': payment_status,
+}
+
+
+def get_chart_data(chart_type, **params):
+    """Return chart data, served from the versioned cache when possible."""
+    chart = CHARTS[chart_type]
+    key_parts = [f'{name}={params[name]}' for name in sorted(params)]
+    key = ':'.join(['core:charts', chart_version.current(), chart_type] + key_parts)
+    data = cache.get(key)
+    if data is None:
+        data = chart(**params)
+        cache.set(key, data, CHART_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_chart_cache():
+    """Bump the version so every cached chart is recomputed on next request."""
+    chart_version.bump()
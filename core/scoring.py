@@ -0,0 +1,97 @@
+"""
+Match score history.
+
+Every scoring click appends one small ScoreEvent row next to the atomic
+score UPDATE, so a bout can be audited and its score rebuilt as of any
+moment. Finished matches can be compacted: their point rows collapse into
+a single snapshot holding the final score.
+"""
+from django.db import transaction
+
+from .models import Match, ScoreEvent
+
+
+HISTORY_LIMIT = 200
+
+
+def record_point(match_id, field, step, judge=None):
+    """Append the step a scoring click applied to ``score1`` or ``score2``."""
+    return ScoreEvent.objects.create(
+        match_id=match_id,
+        delta1=step if field == 'score1' else 0,
+        delta2=step if field == 'score2' else 0,
+        judge=judge,
+    )
+
+
+def apply_event(scores, kind, delta1, delta2):
+    """Scores after one event, using the same zero floor as the live UPDATE."""
+    if kind == ScoreEvent.KIND_SNAPSHOT:
+        return delta1, delta2
+    return max(0, scores[0] + delta1), max(0, scores[1] + delta2)
+
+
+def _replay(events):
+    scores = (0, 0)
+    rows = events.order_by('pk').values_list('kind', 'delta1', 'delta2')
+    for kind, delta1, delta2 in rows.iterator():
+        scores = apply_event(scores, kind, delta1, delta2)
+    return scores
+
+
+def replay(match, at=None):
+    """
+    Rebuild ``(score1, score2)`` from the log, optionally as of ``at``.
+    Events are applied in insertion order, the order their UPDATEs committed.
+    A compacted match only has history from its snapshot onwards.
+    """
+    events = ScoreEvent.objects.filter(match=match)
+    if at is not None:
+        events = events.filter(created_at__lte=at)
+    return _replay(events)
+
+
+def history(match, limit=HISTORY_LIMIT):
+    """The latest ``limit`` events, each annotated with the score after it."""
+    events = list(
+        ScoreEvent.objects.filter(match=match).select_related('judge').order_by('-pk')[:limit]
+    )
+    events.reverse()
+    scores = (0, 0)
+    if len(events) == limit:
+        # Older rows only contribute the score the window starts from
+        scores = _replay(ScoreEvent.objects.filter(match=match, pk__lt=events[0].pk))
+    for event in events:
+        scores = apply_event(scores, event.kind, event.delta1, event.delta2)
+        event.score1, event.score2 = scores
+    return events
+
+
+def compact_match(match):
+    """
+    Replace a finished match's point rows with one snapshot of the stored
+    final score. Returns ``(rows_removed, replayed_scores)``.
+    """
+    with transaction.atomic():
+        replayed = replay(match)
+        events = ScoreEvent.objects.filter(match=match)
+        last = events.order_by('-pk').values_list('created_at', flat=True).first()
+        if last is None:
+            return 0, replayed
+        removed, _ = events.delete()
+        ScoreEvent.objects.create(
+            match=match,
+            kind=ScoreEvent.KIND_SNAPSHOT,
+            delta1=match.score1,
+            delta2=match.score2,
+            created_at=last,
+        )
+    return removed, replayed
+
+
+def compactable_matches():
+    """Finished matches whose log holds more than a single snapshot."""
+    return Match.objects.filter(
+        winner__isnull=False,
+        score_events__kind=ScoreEvent.KIND_POINT,
+    ).distinct()
@@ -0,0 +1,145 @@
+"""
+Trainee live search.
+
+On SQLite an FTS5 table (created by migration 0010) holds one row per
+trainee with the searchable user, belt and contact columns. Signals on
+User, Trainee and Belt keep it current and the rebuild_search_index
+command refills it in bulk. Queries match every term as a prefix and are
+ordered by FTS5 rank. Other backends, or SQLite builds without FTS5, fall
+back to LIKE filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, Q, When
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_TABLE = 'core_trainee_search'
+SEARCH_LIMIT = 50
+MAX_TERMS = 8
+# bm25 column weights: names count most, then username, then the rest
+RANK_WEIGHTS = (0, 4, 4, 2, 1, 1, 1)
+
+USER_FIELDS = {'first_name', 'last_name', 'username', 'email'}
+TRAINEE_FIELDS = {'user', 'user_id', 'belt', 'belt_id', 'contact_number'}
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+_INDEX_SELECT = f"""
+    INSERT INTO {SEARCH_TABLE}
+        (trainee_id, first_name, last_name, username, email, belt, contact_number)
+    SELECT t.id, u.first_name, u.last_name, u.username, u.email, COALESCE(b.name, ''), t.contact_number
+    FROM core_trainee t
+    JOIN auth_user u ON u.id = t.user_id
+    LEFT JOIN core_belt b ON b.id = t.belt_id
+"""
+
+
+def is_enabled():
+    """Whether the FTS table exists in the current database (checked once per database)."""
+    name = connection.settings_dict['NAME']
+    checked = getattr(connection, '_trainee_search_enabled', None)
+    if checked is None or checked[0] != name:
+        enabled = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        checked = connection._trainee_search_enabled = (name, enabled)
+    return checked[1]
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def remove_trainees(trainee_ids):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(trainee_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE trainee_id IN ({placeholders})', chunk)
+
+
+def index_trainees(trainee_ids):
+    """(Re)write the index rows for the given trainees from the live tables."""
+    if not is_enabled():
+        return
+    remove_trainees(trainee_ids)
+    with connection.cursor() as cursor:
+        for chunk in _chunks(trainee_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'{_INDEX_SELECT} WHERE t.id IN ({placeholders})', chunk)
+
+
+def rebuild_index():
+    """Refill the whole index with one INSERT ... SELECT. Returns the row count."""
+    if not is_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(_INDEX_SELECT)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_expression(query):
+    """FTS5 query requiring every term as a prefix, or '' if no terms."""
+    terms = _TERM.findall(query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _like_filter(queryset, query):
+    return queryset.filter(
+        Q(user__first_name__icontains=query) |
+        Q(user__last_name__icontains=query) |
+        Q(user__username__icontains=query) |
+        Q(user__email__icontains=query) |
+        Q(belt__name__icontains=query) |
+        Q(contact_number__icontains=query)
+    )
+
+
+def search_trainees(queryset, query, limit=SEARCH_LIMIT):
+    """
+    Restrict ``queryset`` to the best ``limit`` matches for ``query``,
+    ordered by rank.
+    """
+    if not is_enabled():
+        return _like_filter(queryset, query)[:limit]
+
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+
+    candidates, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT trainee_id FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND trainee_id IN ({candidates}) '
+            f'ORDER BY bm25({SEARCH_TABLE}, {", ".join(map(str, RANK_WEIGHTS))}) LIMIT %s',
+            [expression, *params, limit]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)])
+    )
+
+
+def filter_trainees(queryset, query):
+    """
+    Restrict ``queryset`` to every match for ``query``, unranked and
+    unlimited, for exports that stream all rows.
+    """
+    if not is_enabled():
+        return _like_filter(queryset, query)
+
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT trainee_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+    )
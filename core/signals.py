@@ -0,0 +1,154 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import belts, dashboard, leaderboard, match_events, reports, search
+from .models import (
+    Belt, Event, EventRegistration, Match, Notification, NotificationStamp, Payment, PointsTransaction, Promotion,
+    Trainee, TraineeBalance
+)
+
+
+@receiver([post_save, post_delete], sender=Belt)
+def invalidate_belt_ladder(sender, **kwargs):
+    """Belt changes invalidate the process-wide ladder cache."""
+    belts.schedule_invalidation()
+
+
+@receiver(post_save, sender=PointsTransaction)
+def update_leaderboard_for_transaction(sender, instance, **kwargs):
+    """Points changes move the trainee on the leaderboard once committed."""
+    transaction.on_commit(partial(leaderboard.record_points_change, instance.trainee_id))
+    # Still the previous owner here: save() updates it after post_save
+    stored_trainee_id = getattr(instance, '_stored_trainee_id', None)
+    if stored_trainee_id and stored_trainee_id != instance.trainee_id:
+        transaction.on_commit(partial(leaderboard.record_points_change, stored_trainee_id))
+
+
+@receiver(post_save, sender=Trainee)
+def invalidate_leaderboard_for_trainee(sender, instance, update_fields=None, **kwargs):
+    """Approval, activation or profile edits can change who is ranked."""
+    if update_fields is not None and set(update_fields) <= {'total_points'}:
+        # Points changes are applied incrementally by the transaction handler
+        return
+    transaction.on_commit(leaderboard.invalidate_leaderboard)
+
+
+@receiver(post_delete, sender=Trainee)
+def invalidate_leaderboard_for_deleted_trainee(sender, **kwargs):
+    transaction.on_commit(leaderboard.invalidate_leaderboard)
+
+
+@receiver(post_save, sender=User)
+def invalidate_leaderboard_for_renamed_user(sender, instance, created, update_fields=None, **kwargs):
+    """Ties on the board are ordered by first name."""
+    if created or (update_fields is not None and 'first_name' not in update_fields):
+        return
+    if Trainee.objects.filter(user=instance).exists():
+        transaction.on_commit(leaderboard.invalidate_leaderboard)
+
+
+@receiver(post_delete, sender=EventRegistration)
+def decrement_registered_count(sender, instance, **kwargs):
+    """Runs inside the delete transaction, including cascaded deletes."""
+    if getattr(instance, '_stored_status', instance.status) == 'approved':
+        Event.adjust_registered_count(getattr(instance, '_stored_event_id', None) or instance.event_id, -1)
+
+
+@receiver(post_delete, sender=PointsTransaction)
+def reverse_deleted_points(sender, instance, **kwargs):
+    """Deleting a ledger row takes its points back off the running total."""
+    points = getattr(instance, '_stored_points', instance.points)
+    trainee_id = getattr(instance, '_stored_trainee_id', None) or instance.trainee_id
+    if points:
+        Trainee.objects.filter(pk=trainee_id).update(total_points=F('total_points') - points)
+        transaction.on_commit(partial(leaderboard.record_points_change, trainee_id))
+
+
+@receiver(post_delete, sender=Payment)
+def reverse_deleted_payment(sender, instance, **kwargs):
+    """Deleting an unpaid payment takes it back off the trainee's balance."""
+    trainee_id, amount, count = getattr(instance, '_stored_balance', None) or instance.balance_state()
+    if count:
+        # No lazy row here: on a cascade the trainee itself may be going away
+        TraineeBalance.adjust(trainee_id, -amount, -count)
+
+
+@receiver([post_save, post_delete], sender=Trainee)
+@receiver([post_save, post_delete], sender=Belt)
+@receiver([post_save, post_delete], sender=Payment)
+def invalidate_charts(sender, **kwargs):
+    """Report charts are recomputed after trainee, belt or payment changes."""
+    reports.invalidate_chart_cache()
+
+
+@receiver([post_save, post_delete], sender=Trainee)
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_dashboard_stats(sender, **kwargs):
+    """The admin dashboard recomputes after any change to its source tables."""
+    dashboard.invalidate_admin_stats()
+
+
+@receiver(post_delete, sender=Notification)
+def bump_notification_stamp(sender, instance, **kwargs):
+    """Removing a notification changes the recipient's list and maybe the unread count."""
+    is_read = getattr(instance, '_stored_is_read', instance.is_read)
+    NotificationStamp.bump([instance.user_id], unread_delta=0 if is_read else -1)
+
+
+@receiver(post_save, sender=Match)
+def publish_match_change(sender, instance, created, **kwargs):
+    """Push created, rescheduled, scored and completed matches to judge streams."""
+    stored_state = getattr(instance, '_stored_state', None)
+    kind = match_events.change_kind(instance, created, stored_state)
+    instance._stored_state = {name: getattr(instance, name) for name in Match.TRACKED_FIELDS}
+    if kind:
+        previous_judge_id = stored_state['judge_id'] if stored_state else None
+        message = match_events.build_message(
+            kind, instance.pk, instance.event_id, [instance.judge_id, previous_judge_id]
+        )
+        match_events.publish_on_commit(message)
+
+
+@receiver(post_save, sender=Trainee)
+def index_trainee(sender, instance, update_fields=None, **kwargs):
+    """Keep the trainee's search row in step with its contact and belt."""
+    if update_fields is not None and not set(update_fields) & search.TRAINEE_FIELDS:
+        return
+    search.index_trainees([instance.pk])
+
+
+@receiver(post_delete, sender=Trainee)
+def unindex_trainee(sender, instance, **kwargs):
+    search.remove_trainees([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def index_user_trainee(sender, instance, created, update_fields=None, **kwargs):
+    """Name and email edits reindex the user's trainee; logins do not."""
+    if created or (update_fields is not None and not set(update_fields) & search.USER_FIELDS):
+        return
+    search.index_trainees(Trainee.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Belt)
+def index_belt_trainees(sender, instance, created, **kwargs):
+    if not created:
+        search.index_trainees(Trainee.objects.filter(belt=instance).values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Belt)
+def collect_belt_trainees(sender, instance, **kwargs):
+    instance._trainee_ids = list(Trainee.objects.filter(belt=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Belt)
+def index_beltless_trainees(sender, instance, **kwargs):
+    """Trainees lose the belt name once SET_NULL has cleared their belt."""
+    search.index_trainees(getattr(instance, '_trainee_ids', []))
@@ -0,0 +1,429 @@
+"""
+Seeded synthetic dataset for performance work.
+
+Builds on populate_accounts (groups, belts and the known admin, judge and
+trainee logins) and then bulk-inserts trainees, events, registrations,
+matches, promotions, dues payments, points transactions and notifications
+in the proportions of a real club: most trainees on low belts, points
+concentrated in a few keen members, most dues paid, and so on. The same
+seed, preset and anchor date always produce the same rows.
+
+Rows go in with bulk_create, so the running totals that signals and
+save() normally maintain (registered counts, total points, balances,
+notification stamps, the search index) are computed here and written
+directly.
+"""
+import datetime
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+from io import StringIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db import transaction
+
+from . import dashboard, leaderboard, reports, search
+from .belts import get_ladder, invalidate_ladder
+from .models import (
+    Event, EventRegistration, Match, Notification, NotificationStamp, Payment, PointsTransaction, Promotion,
+    Trainee, TraineeBalance
+)
+
+
+PRESETS = {
+    'tiny': {'trainees': 60, 'events': 12, 'matches': 300, 'points': 3_000, 'notifications': 600, 'months': 6},
+    'small': {'trainees': 1_000, 'events': 60, 'matches': 10_000, 'points': 100_000, 'notifications': 20_000, 'months': 12},
+    'medium': {'trainees': 5_000, 'events': 200, 'matches': 50_000, 'points': 500_000, 'notifications': 100_000, 'months': 18},
+    'large': {'trainees': 10_000, 'events': 400, 'matches': 100_000, 'points': 1_000_000, 'notifications': 200_000, 'months': 24},
+}
+DEFAULT_SEED = 1
+BATCH_SIZE = 2000
+USERNAME_PREFIX = 'synthetic'
+PASSWORD = 'trainee123'
+TRAINEES_PER_JUDGE = 250
+
+# Most trainees sit on the lower belts
+BELT_WEIGHTS = (30, 22, 16, 12, 8, 6, 4, 2)
+EVENT_TYPE_WEIGHTS = {'training': 50, 'tournament': 20, 'seminar': 15, 'grading': 15}
+REGISTRATION_STATUS_WEIGHTS = {'approved': 85, 'pending': 8, 'rejected': 4, 'cancelled': 3}
+POINTS_BY_TYPE = {
+    'training': (55, (5, 15)),
+    'tournament': (10, (20, 40)),
+    'win': (15, (10, 25)),
+    'seminar': (10, (15, 30)),
+    'admin_award': (8, (5, 50)),
+    'promotion': (2, (100, 100)),
+}
+NOTIFICATION_TYPES = {
+    'match': ('Match Scheduled', 'You have a new match scheduled.', '/trainee/dashboard/'),
+    'payment': ('New Payment Due', 'A new payment is due.', '/trainee/payments/'),
+    'promotion': ('Points Awarded!', 'You have earned points.', '/leaderboard/'),
+    'event': ('Event Update', 'An event you registered for has been updated.', '/trainee/events/'),
+}
+DUES_AMOUNT = Decimal('50.00')
+JUNIOR_DUES_AMOUNT = Decimal('40.00')
+# Share of dues paid by age in months: this month's are mostly still open
+PAID_RATE_BY_AGE = (0.2, 0.6, 0.85, 0.95)
+
+FIRST_NAMES = (
+    'Aiko', 'Ben', 'Carla', 'Dmitri', 'Elena', 'Farah', 'Gabriel', 'Hana', 'Ibrahim', 'Julia', 'Kenji', 'Lucia',
+    'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Samuel', 'Tara', 'Umar', 'Vera', 'Wei', 'Ximena',
+    'Yusuf', 'Zara', 'Andre', 'Bianca', 'Chen', 'Diego', 'Esther', 'Felix', 'Grace', 'Hugo', 'Ines', 'Jonas',
+)
+LAST_NAMES = (
+    'Abe', 'Baker', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ivanov', 'Jensen', 'Kato', 'Lopez',
+    'Moreau', 'Nakamura', 'Okafor', 'Park', 'Quispe', 'Rossi', 'Santos', 'Tanaka', 'Ueda', 'Varga', 'Wang',
+    'Xu', 'Yilmaz', 'Zhou', 'Alvarez', 'Becker', 'Cruz', 'Diaz', 'Eriksen', 'Ferreira', 'Gomez', 'Haas',
+)
+
+
+def _batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk inserts keep the values given for auto_now_add fields."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+class DatasetGenerator:
+    """Generates one preset's rows from a seed, relative to ``today``."""
+
+    def __init__(self, size='small', seed=DEFAULT_SEED, today=None, log=None):
+        self.size = size
+        self.counts = PRESETS[size]
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.today = today or datetime.date.today()
+        self.now = datetime.datetime.combine(self.today, datetime.time(12), tzinfo=datetime.timezone.utc)
+        self.log = log or (lambda message: None)
+        self.created = Counter()
+
+    def moment(self, start, end):
+        """A random datetime between two dates, during club hours."""
+        days = max(0, (end - start).days)
+        day = start + datetime.timedelta(days=self.rng.randint(0, days))
+        return datetime.datetime.combine(
+            day, datetime.time(self.rng.randint(8, 20), self.rng.choice((0, 15, 30, 45))), tzinfo=datetime.timezone.utc
+        )
+
+    def generate(self):
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise ValueError('Synthetic data already exists; flush the database first.')
+        call_command('populate_accounts', seed=self.seed, today=self.today.isoformat(), stdout=StringIO())
+        invalidate_ladder()
+        self.belts = list(get_ladder())
+        self.admin = User.objects.get(username='admin')
+        self.groups = {group.name: group for group in Group.objects.filter(name__in=['Judge', 'Trainee'])}
+
+        with transaction.atomic():
+            self.create_judges()
+            self.create_trainees()
+            self.create_events()
+            self.create_registrations()
+            self.create_matches()
+            self.create_promotions()
+            self.create_payments()
+            self.create_points()
+            self.create_notifications()
+            search.rebuild_index()
+
+        transaction.on_commit(leaderboard.invalidate_leaderboard)
+        transaction.on_commit(dashboard.invalidate_admin_stats)
+        transaction.on_commit(reports.invalidate_chart_cache)
+        return self.created
+
+    def bulk_create(self, model, objects, name=None):
+        total = 0
+        for batch in _batched(objects):
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        name = name or str(model._meta.verbose_name_plural)
+        self.created[name] += total
+        self.log(f'{name}: {total}')
+        return total
+
+    def create_users(self, count, kind, group):
+        password = make_password(PASSWORD)
+        usernames = [f'{USERNAME_PREFIX}_{kind}{index:06d}' for index in range(1, count + 1)]
+        users = []
+        for username in usernames:
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            users.append(User(
+                username=username,
+                first_name=first,
+                last_name=last,
+                email=f'{username}@example.com',
+                password=password,
+                date_joined=self.now,
+            ))
+        self.bulk_create(User, users, f'{kind} users')
+        ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+        user_ids = [ids[username] for username in usernames]
+        Membership = User.groups.through
+        self.bulk_create(
+            Membership, (Membership(user_id=pk, group_id=group.pk) for pk in user_ids), f'{kind} group memberships'
+        )
+        return user_ids, users
+
+    def create_judges(self):
+        count = max(2, self.counts['trainees'] // TRAINEES_PER_JUDGE)
+        self.synthetic_judge_ids, _ = self.create_users(count, 'judge', self.groups['Judge'])
+        self.judge_ids = list(User.objects.filter(groups__name='Judge').order_by('pk').values_list('pk', flat=True))
+
+    def create_trainees(self):
+        user_ids, users = self.create_users(self.counts['trainees'], 'trainee', self.groups['Trainee'])
+        belt_weights = BELT_WEIGHTS[:len(self.belts)]
+        trainees = []
+        for user_id, user in zip(user_ids, users):
+            # Recent joiners outnumber veterans
+            days = int(self.rng.triangular(0, 5 * 365, 0))
+            is_approved = self.rng.random() < 0.95
+            trainees.append(Trainee(
+                user_id=user_id,
+                date_of_birth=datetime.date(self.rng.randint(1965, 2016), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+                belt=self.rng.choices(self.belts, belt_weights)[0],
+                contact_number=f'555-{self.rng.randint(1000, 9999)}',
+                address=f'{self.rng.randint(1, 999)} {self.rng.choice(LAST_NAMES)} Street',
+                join_date=self.today - datetime.timedelta(days=days),
+                emergency_contact=f'{self.rng.choice(FIRST_NAMES)} {user.last_name}',
+                emergency_phone=f'555-{self.rng.randint(1000, 9999)}',
+                is_active=is_approved and self.rng.random() < 0.92,
+                is_approved=is_approved,
+            ))
+        with explicit_timestamps(Trainee._meta.get_field('join_date')):
+            self.bulk_create(Trainee, trainees)
+
+        rows = Trainee.objects.filter(user_id__in=user_ids).values_list(
+            'pk', 'join_date', 'belt__order', 'date_of_birth', 'is_active', 'is_approved', 'user_id'
+        )
+        self.trainees = {
+            pk: {'join_date': join_date, 'belt_order': order or 1, 'born': born, 'active': active and approved, 'user_id': user_id}
+            for pk, join_date, order, born, active, approved, user_id in rows
+        }
+        self.active_ids = sorted(pk for pk, trainee in self.trainees.items() if trainee['active'])
+
+    def create_events(self):
+        types = list(EVENT_TYPE_WEIGHTS)
+        events = []
+        for index in range(1, self.counts['events'] + 1):
+            # Two years of history and a quarter of upcoming events
+            start = self.moment(self.today - datetime.timedelta(days=730), self.today + datetime.timedelta(days=90))
+            event_type = self.rng.choices(types, EVENT_TYPE_WEIGHTS.values())[0]
+            events.append(Event(
+                name=f'{event_type.title()} {index:04d}',
+                description=f'Synthetic {event_type} event',
+                start_date=start,
+                end_date=start + datetime.timedelta(hours=self.rng.choice((2, 3, 6, 8))),
+                location=f'{self.rng.choice(LAST_NAMES)} Dojo',
+                event_type=event_type,
+                max_participants=self.rng.choice((None, 50, 100, 200)),
+                registration_deadline=start - datetime.timedelta(days=self.rng.randint(1, 14)),
+                is_published=self.rng.random() < 0.9,
+            ))
+        self.bulk_create(Event, events)
+        self.events = list(
+            Event.objects.filter(description__startswith='Synthetic').order_by('pk').values_list('pk', 'event_type', 'start_date')
+        )
+
+    def create_registrations(self):
+        statuses = list(REGISTRATION_STATUS_WEIGHTS)
+        self.registrants = {}
+        approved = Counter()
+
+        def registrations():
+            for event_id, event_type, start in self.events:
+                size = self.rng.randint(20, 120) if event_type == 'tournament' else self.rng.randint(5, 40)
+                chosen = self.rng.sample(self.active_ids, min(size, len(self.active_ids)))
+                self.registrants[event_id] = []
+                for trainee_id in chosen:
+                    status = self.rng.choices(statuses, REGISTRATION_STATUS_WEIGHTS.values())[0]
+                    if status == 'approved':
+                        approved[event_id] += 1
+                        self.registrants[event_id].append(trainee_id)
+                    yield EventRegistration(
+                        event_id=event_id,
+                        trainee_id=trainee_id,
+                        registered_at=start - datetime.timedelta(days=self.rng.randint(1, 30)),
+                        status=status,
+                    )
+
+        with explicit_timestamps(EventRegistration._meta.get_field('registered_at')):
+            self.bulk_create(EventRegistration, registrations())
+        Event.objects.bulk_update(
+            [Event(pk=event_id, registered_count=approved[event_id]) for event_id, _, _ in self.events],
+            ['registered_count'], batch_size=BATCH_SIZE
+        )
+
+    def create_matches(self):
+        # Matches are fought at tournaments and gradings, in proportion to entrants
+        venues = [
+            (event_id, start) for event_id, event_type, start in self.events
+            if event_type in ('tournament', 'grading') and len(self.registrants[event_id]) >= 2
+        ]
+        if not venues:
+            return
+        weights = list(accumulate(len(self.registrants[event_id]) for event_id, _ in venues))
+
+        def matches():
+            for event_id, start in self.rng.choices(venues, cum_weights=weights, k=self.counts['matches']):
+                trainee1, trainee2 = self.rng.sample(self.registrants[event_id], 2)
+                match_time = start + datetime.timedelta(minutes=self.rng.randint(0, 360))
+                match = Match(
+                    event_id=event_id,
+                    trainee1_id=trainee1,
+                    trainee2_id=trainee2,
+                    judge_id=self.rng.choice(self.judge_ids),
+                    match_time=match_time,
+                )
+                if match_time < self.now:
+                    match.score1, match.score2 = self.rng.randint(0, 10), self.rng.randint(0, 10)
+                    if match.score1 == match.score2:
+                        match.score1 += 1
+                    match.winner_id = trainee1 if match.score1 > match.score2 else trainee2
+                yield match
+
+        self.bulk_create(Match, matches(), 'matches')
+
+    def create_promotions(self):
+        belts = self.belts
+
+        def promotions():
+            for trainee_id, trainee in self.trainees.items():
+                steps = trainee['belt_order'] - 1
+                if steps <= 0:
+                    continue
+                span = max(1, (self.today - trainee['join_date']).days)
+                for step in range(1, steps + 1):
+                    yield Promotion(
+                        trainee_id=trainee_id,
+                        belt_from=belts[step - 1],
+                        belt_to=belts[step],
+                        date=trainee['join_date'] + datetime.timedelta(days=span * step // (steps + 1)),
+                    )
+
+        self.bulk_create(Promotion, promotions())
+
+    def create_payments(self):
+        self.balances = defaultdict(lambda: [Decimal('0.00'), 0])
+        months = self.counts['months']
+        periods = []
+        year, month = self.today.year, self.today.month
+        for _ in range(months):
+            periods.append(datetime.date(year, month, 1))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+        def payments():
+            for trainee_id, trainee in self.trainees.items():
+                junior = (self.today - trainee['born']).days < 18 * 365
+                amount = JUNIOR_DUES_AMOUNT if junior else DUES_AMOUNT
+                for age, due in enumerate(periods):
+                    if due < trainee['join_date'].replace(day=1):
+                        break
+                    paid = self.rng.random() < PAID_RATE_BY_AGE[min(age, len(PAID_RATE_BY_AGE) - 1)]
+                    if not paid:
+                        self.balances[trainee_id][0] += amount
+                        self.balances[trainee_id][1] += 1
+                    yield Payment(
+                        trainee_id=trainee_id,
+                        amount=amount,
+                        date=due,
+                        description=f'Monthly dues {due:%Y-%m}',
+                        period=f'{due:%Y-%m}',
+                        paid=paid,
+                    )
+
+        self.bulk_create(Payment, payments())
+        self.bulk_create(TraineeBalance, (
+            TraineeBalance(trainee_id=pk, outstanding=amount, unpaid_count=count, updated_at=self.now)
+            for pk, (amount, count) in self.balances.items()
+        ))
+
+    def create_points(self):
+        trainee_ids = sorted(self.trainees)
+        # A few keen members earn most of the points
+        weights = list(accumulate(
+            self.rng.paretovariate(1.5) * self.trainees[pk]['belt_order'] for pk in trainee_ids
+        ))
+        types = list(POINTS_BY_TYPE)
+        type_weights = [weight for weight, _ in POINTS_BY_TYPE.values()]
+        past_events = [event_id for event_id, _, start in self.events if start < self.now]
+        totals = Counter()
+
+        def transactions():
+            for trainee_id in self.rng.choices(trainee_ids, cum_weights=weights, k=self.counts['points']):
+                transaction_type = self.rng.choices(types, type_weights)[0]
+                low, high = POINTS_BY_TYPE[transaction_type][1]
+                points = self.rng.randint(low, high)
+                totals[trainee_id] += points
+                event_id = None
+                if transaction_type in ('tournament', 'win', 'seminar') and past_events:
+                    event_id = self.rng.choice(past_events)
+                yield PointsTransaction(
+                    trainee_id=trainee_id,
+                    points=points,
+                    transaction_type=transaction_type,
+                    description=f'{transaction_type.replace("_", " ").title()} points',
+                    event_id=event_id,
+                    awarded_by_id=self.admin.pk if transaction_type == 'admin_award' else None,
+                    created_at=self.moment(self.trainees[trainee_id]['join_date'], self.today),
+                )
+
+        with explicit_timestamps(PointsTransaction._meta.get_field('created_at')):
+            self.bulk_create(PointsTransaction, transactions())
+        Trainee.objects.bulk_update(
+            [Trainee(pk=pk, total_points=total) for pk, total in totals.items()],
+            ['total_points'], batch_size=BATCH_SIZE
+        )
+
+    def create_notifications(self):
+        # Only synthetic accounts, so existing users' stamps are left alone
+        user_ids = [trainee['user_id'] for trainee in self.trainees.values()] + self.synthetic_judge_ids
+        types = list(NOTIFICATION_TYPES)
+        received = Counter()
+        unread = Counter()
+
+        def notifications():
+            for user_id in self.rng.choices(user_ids, k=self.counts['notifications']):
+                notification_type = self.rng.choice(types)
+                title, message, link = NOTIFICATION_TYPES[notification_type]
+                created_at = self.moment(self.today - datetime.timedelta(days=180), self.today)
+                # Older notifications have usually been read
+                is_read = self.rng.random() < (0.3 if (self.now - created_at).days < 7 else 0.9)
+                received[user_id] += 1
+                unread[user_id] += not is_read
+                yield Notification(
+                    user_id=user_id,
+                    title=title,
+                    message=message,
+                    notification_type=notification_type,
+                    link=link,
+                    is_read=is_read,
+                    created_at=created_at,
+                )
+
+        with explicit_timestamps(Notification._meta.get_field('created_at')):
+            self.bulk_create(Notification, notifications())
+        self.bulk_create(NotificationStamp, (
+            NotificationStamp(user_id=user_id, version=count, unread_count=unread[user_id], updated_at=self.now)
+            for user_id, count in received.items()
+        ))
+
+
+def generate_dataset(size='small', seed=DEFAULT_SEED, today=None, log=None):
+    """Generate a preset dataset; returns row counts by model."""
+    return DatasetGenerator(size, seed, today, log).generate()
@@ -1,8 +1,10 @@
-from django.test import TestCase, Client
+from contextlib import closing, contextmanager
+from decimal import Decimal
+from django.test import TestCase, TransactionTestCase, Client
 from django.contrib.auth.models import User, Group
 from django.utils import timezone
-from datetime import timedelta
-from .models import Belt, Trainee, Event, Match, Payment, Promotion
+from datetime import date, timedelta
+from .models import Belt, Trainee, Event, Match, Payment, Promotion, Notification
 
 
 class DashboardStatisticsTestCase(TestCase):
@@ -104,3 +106,1731 @@ class DashboardStatisticsTestCase(TestCase):
         # Should contain statistics but not full page structure
         self.assertContains(response, 'Total Trainees')
         self.assertNotContains(response, '<!DOCTYPE html>')
+
+
+class TraineeStatsQuerySetTestCase(TestCase):
+    """Test cases for the annotated trainee statistics queryset"""
+    
+    def setUp(self):
+        self.belt = Belt.objects.create(name='White', order=1)
+        self.trainees = []
+        for i in range(3):
+            user = User.objects.create(username=f'stats{i}', first_name='Stats', last_name=str(i))
+            self.trainees.append(Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                belt=self.belt,
+                contact_number='1234567890',
+                address='Test Address',
+            ))
+        event = Event.objects.create(
+            name='Stats Cup',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        first, second, third = self.trainees
+        Match.objects.create(event=event, trainee1=first, trainee2=second, winner=first, match_time=timezone.now())
+        Match.objects.create(event=event, trainee1=third, trainee2=first, winner=third, match_time=timezone.now())
+        Match.objects.create(event=event, trainee1=first, trainee2=third, match_time=timezone.now())
+        Payment.objects.create(trainee=first, amount=40, date=timezone.now().date(), description='Fee')
+        Payment.objects.create(trainee=first, amount=10.5, date=timezone.now().date(), description='Fee')
+        Payment.objects.create(trainee=first, amount=99, date=timezone.now().date(), description='Paid', paid=True)
+    
+    def test_annotations_match_properties(self):
+        """Annotated values agree with the per-instance property fallback"""
+        annotated = {t.pk: t for t in Trainee.objects.with_stats()}
+        for trainee in Trainee.objects.all():
+            row = annotated[trainee.pk]
+            self.assertAlmostEqual(row.win_rate, trainee.win_rate)
+            self.assertEqual(row.outstanding_balance, trainee.outstanding_balance)
+        first = annotated[self.trainees[0].pk]
+        self.assertEqual(first.stats_total_matches, 3)
+        self.assertEqual(first.stats_wins, 1)
+        self.assertEqual(first.outstanding_balance, Decimal('50.50'))
+    
+    def test_stats_read_in_one_query(self):
+        """Reading win rate and balance for every row costs a single query"""
+        with self.assertNumQueries(1):
+            rows = [(t.win_rate, t.outstanding_balance) for t in Trainee.objects.with_stats()]
+        self.assertEqual(len(rows), 3)
+
+
+class PromotionEligibilityTestCase(TestCase):
+    """Test cases for the set-based promotion eligibility engine"""
+    
+    def setUp(self):
+        self.white = Belt.objects.create(name='White', order=1)
+        self.yellow = Belt.objects.create(name='Yellow', order=2)
+        event = Event.objects.create(
+            name='Grading Cup',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        self.trainees = []
+        for i in range(4):
+            user = User.objects.create(username=f'promo{i}')
+            self.trainees.append(Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                belt=self.white if i % 2 == 0 else self.yellow,
+                contact_number='1234567890',
+                address='Test Address',
+            ))
+        first, second = self.trainees[:2]
+        for i in range(5):
+            Match.objects.create(
+                event=event, trainee1=first, trainee2=second,
+                winner=first if i < 3 else second, match_time=timezone.now()
+            )
+        Match.objects.create(event=event, trainee1=first, trainee2=second, match_time=timezone.now())
+        Promotion.objects.create(
+            trainee=second, belt_from=self.white, belt_to=self.yellow,
+            date=timezone.now().date() - timedelta(days=10)
+        )
+    
+    def test_constant_query_count(self):
+        """Evaluation cost does not grow with the number of trainees"""
+        from .belts import get_ladder
+        from .promotions import evaluate_promotions
+        get_ladder()
+        with self.assertNumQueries(1):
+            trainees = evaluate_promotions(Trainee.objects.all())
+        self.assertEqual(len(trainees), 4)
+    
+    def test_eligibility_values(self):
+        """Match counts, win rates and next belts are computed per trainee"""
+        from .promotions import evaluate_promotions
+        today = timezone.now().date() + timedelta(days=200)
+        results = {t.pk: t for t in evaluate_promotions(Trainee.objects.all(), today=today)}
+        first = results[self.trainees[0].pk]
+        second = results[self.trainees[1].pk]
+        self.assertEqual(first.match_count, 5)
+        self.assertEqual(first.calculated_win_rate, 60.0)
+        self.assertTrue(first.performance_eligible)
+        self.assertTrue(first.time_eligible)
+        self.assertEqual(first.promotion_next_belt, self.yellow)
+        self.assertEqual(second.days_since_promotion, 210)
+        self.assertEqual(second.calculated_win_rate, 40.0)
+        self.assertTrue(second.performance_eligible)
+        self.assertIsNone(second.promotion_next_belt)
+    
+    def test_rules_are_configurable(self):
+        """Thresholds can be overridden per call"""
+        from .promotions import evaluate_promotions
+        results = {t.pk: t for t in evaluate_promotions(
+            Trainee.objects.all(), rules={'min_days_in_grade': 0, 'min_win_rate': 70, 'require_performance': True}
+        )}
+        self.assertTrue(results[self.trainees[0].pk].time_eligible)
+        self.assertFalse(results[self.trainees[0].pk].is_eligible)
+
+
+class BeltLadderCacheTestCase(TestCase):
+    """Test cases for the process-wide belt ladder cache"""
+    
+    def setUp(self):
+        self.white = Belt.objects.create(name='White', order=1, points_required=0)
+        self.yellow = Belt.objects.create(name='Yellow', order=2, points_required=100)
+        user = User.objects.create(username='ladder')
+        self.trainee = Trainee.objects.create(
+            user=user,
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            belt=self.white,
+            contact_number='1234567890',
+            address='Test Address',
+            total_points=30,
+        )
+    
+    def test_lookups_hit_no_queries_once_loaded(self):
+        """Next belt and points lookups are served from memory"""
+        from .belts import get_ladder
+        get_ladder()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.trainee.next_belt, self.yellow)
+            self.assertEqual(self.trainee.points_to_next_belt, 70)
+            self.assertEqual(get_ladder().get(self.white.pk), self.white)
+            self.assertEqual(get_ladder().get_by_order(2), self.yellow)
+    
+    def test_belt_changes_invalidate_ladder(self):
+        """Saving or deleting a belt reloads the ladder"""
+        from .belts import get_ladder
+        self.assertEqual(len(get_ladder()), 2)
+        orange = Belt.objects.create(name='Orange', order=3)
+        self.assertEqual(get_ladder().next_belt(self.yellow.pk), orange)
+        orange.delete()
+        self.assertIsNone(get_ladder().next_belt(self.yellow.pk))
+    
+    def test_version_bump_reaches_other_workers(self):
+        """The version key lives in the shared cache, not in this process"""
+        from unittest import mock
+        from django.core.cache import cache, caches
+        from . import belts
+        other_worker = caches.create_connection('default')
+        belts.invalidate_ladder()
+        self.assertEqual(other_worker.get(belts.BELT_LADDER_VERSION_KEY), cache.get(belts.BELT_LADDER_VERSION_KEY))
+        
+        # A rename made and announced by another worker reaches this one
+        self.assertEqual(belts.get_ladder().get(self.yellow.pk).name, 'Yellow')
+        Belt.objects.filter(pk=self.yellow.pk).update(name='Gold')
+        other_worker.set(belts.BELT_LADDER_VERSION_KEY, 'bumped-elsewhere', timeout=None)
+        with mock.patch.object(belts.ladder_copy, 'check_seconds', 0):
+            self.assertEqual(belts.get_ladder().get(self.yellow.pk).name, 'Gold')
+
+
+class LeaderboardTestCase(TestCase):
+    """Test cases for the materialized leaderboard"""
+    
+    def setUp(self):
+        from .leaderboard import invalidate_leaderboard
+        self.trainees = []
+        for i, points in enumerate([50, 80, 50, 10]):
+            user = User.objects.create(username=f'board{i}', first_name=f'Name{i}')
+            self.trainees.append(Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+                is_approved=True,
+                total_points=points,
+            ))
+        invalidate_leaderboard()
+    
+    def test_tie_aware_ranks(self):
+        """Ties share a rank under both competition and dense ranking"""
+        from .leaderboard import get_leaderboard, RANKING_DENSE
+        board = get_leaderboard()
+        a, b, c, d = self.trainees
+        self.assertEqual([board.rank(t.pk) for t in (b, a, c, d)], [1, 2, 2, 4])
+        self.assertEqual([board.rank(t.pk, RANKING_DENSE) for t in (b, a, c, d)], [1, 2, 2, 3])
+        self.assertEqual([entry.trainee_id for entry in board.top(2)], [b.pk, a.pk])
+        self.assertEqual([entry.position for entry in board.around(d.pk, radius=1)], [3, 4])
+    
+    def test_rank_lookup_is_query_free(self):
+        """Trainee.rank reads the loaded board instead of counting rows"""
+        from .leaderboard import get_leaderboard
+        get_leaderboard()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.trainees[3].rank, 4)
+    
+    def test_points_transaction_updates_board_incrementally(self):
+        """Awarding points moves the trainee once the transaction commits"""
+        from .leaderboard import get_leaderboard
+        from .models import PointsTransaction
+        board = get_leaderboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsTransaction.objects.create(
+                trainee=self.trainees[3], points=100, transaction_type='admin_award', description='Bonus'
+            )
+        self.assertIs(get_leaderboard(), board)
+        self.assertEqual(board.rank(self.trainees[3].pk), 1)
+        self.assertEqual(board.rank(self.trainees[1].pk), 2)
+    
+    def test_concurrent_bump_drops_the_board(self):
+        """A version bump from another worker is not mistaken for our own step"""
+        from .leaderboard import LEADERBOARD_VERSION_KEY, get_leaderboard
+        from .models import PointsTransaction, VersionCounter
+        board = get_leaderboard()
+        VersionCounter.bump(LEADERBOARD_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsTransaction.objects.create(
+                trainee=self.trainees[3], points=100, transaction_type='admin_award', description='Bonus'
+            )
+        reloaded = get_leaderboard()
+        self.assertIsNot(reloaded, board)
+        self.assertEqual(reloaded.rank(self.trainees[3].pk), 1)
+    
+    def test_renaming_a_trainee_reorders_ties(self):
+        """Name edits reload the board, whose ties are ordered by first name"""
+        from .leaderboard import get_leaderboard
+        a, b, c, d = self.trainees
+        self.assertEqual([entry.trainee_id for entry in get_leaderboard().top(3)], [b.pk, a.pk, c.pk])
+        c.user.first_name = 'Alice'
+        with self.captureOnCommitCallbacks(execute=True):
+            c.user.save()
+        self.assertEqual([entry.trainee_id for entry in get_leaderboard().top(3)], [b.pk, c.pk, a.pk])
+
+
+class EventRegisteredCountTestCase(TestCase):
+    """Test cases for the denormalized Event.registered_count"""
+    
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Open Seminar',
+            description='Test Description',
+            start_date=timezone.now() + timedelta(days=7),
+            end_date=timezone.now() + timedelta(days=8),
+            location='Dojo',
+            max_participants=10,
+        )
+        self.trainees = []
+        for i in range(3):
+            user = User.objects.create(username=f'count{i}')
+            self.trainees.append(Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            ))
+    
+    def test_counter_follows_registration_writes(self):
+        """Create, status change and delete keep the counter in step"""
+        from .models import EventRegistration
+        first = EventRegistration.objects.create(event=self.event, trainee=self.trainees[0])
+        EventRegistration.objects.create(event=self.event, trainee=self.trainees[1], status='pending')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participant_count, 1)
+        
+        pending = EventRegistration.objects.get(trainee=self.trainees[1])
+        pending.status = 'approved'
+        pending.save()
+        first.status = 'cancelled'
+        first.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 1)
+        
+        pending.delete()
+        self.trainees[0].delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 0)
+        self.assertEqual(self.event.spots_remaining, 10)
+    
+    def test_moving_a_registration_updates_both_events(self):
+        """An approved registration moved to another event leaves the old count"""
+        from .models import EventRegistration
+        other = Event.objects.create(
+            name='Other Seminar', description='Test Description', start_date=self.event.start_date,
+            end_date=self.event.end_date, location='Dojo'
+        )
+        registration = EventRegistration.objects.create(event=self.event, trainee=self.trainees[0])
+        registration = EventRegistration.objects.get(pk=registration.pk)
+        registration.event = other
+        registration.save()
+        self.event.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.event.registered_count, other.registered_count), (0, 1))
+        
+        registration.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.registered_count, 0)
+    
+    def test_reconcile_command_fixes_drift(self):
+        """The reconciliation command recomputes drifted counters"""
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import EventRegistration
+        for trainee in self.trainees:
+            EventRegistration.objects.create(event=self.event, trainee=trainee)
+        Event.objects.filter(pk=self.event.pk).update(registered_count=7)
+        call_command('reconcile_event_counts', chunk_size=1, stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 3)
+
+
+class TraineeEventsListTestCase(TestCase):
+    """Test cases for the trainee events page"""
+    
+    def setUp(self):
+        from .models import EventRegistration
+        trainee_group = Group.objects.create(name='Trainee')
+        self.user = User.objects.create(username='eventgoer')
+        self.user.groups.add(trainee_group)
+        self.trainee = Trainee.objects.create(
+            user=self.user,
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+            is_approved=True,
+        )
+        for offset in (-400, -20, 5, 10):
+            event = Event.objects.create(
+                name=f'Event {offset}',
+                description='Test Description',
+                start_date=timezone.now() + timedelta(days=offset),
+                end_date=timezone.now() + timedelta(days=offset + 1),
+                location='Dojo',
+                is_published=True,
+            )
+            EventRegistration.objects.create(event=event, trainee=self.trainee)
+        self.client.force_login(self.user)
+    
+    def test_registration_status_and_window(self):
+        """Registrations are attached and old past events fall outside the window"""
+        response = self.client.get('/trainee/events/')
+        self.assertEqual(len(response.context['upcoming_events']), 2)
+        self.assertEqual(len(response.context['past_events']), 1)
+        self.assertTrue(all(e.is_registered for e in response.context['upcoming_events']))
+        response = self.client.get('/trainee/events/?days=3650')
+        self.assertEqual(len(response.context['past_events']), 2)
+    
+    def test_query_count_does_not_grow_with_events(self):
+        """Adding registered events does not add queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import EventRegistration
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/trainee/events/')
+        for i in range(5):
+            event = Event.objects.create(
+                name=f'Extra {i}',
+                description='Test Description',
+                start_date=timezone.now() + timedelta(days=30 + i),
+                end_date=timezone.now() + timedelta(days=31 + i),
+                location='Dojo',
+                is_published=True,
+            )
+            EventRegistration.objects.create(event=event, trainee=self.trainee)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get('/trainee/events/')
+        self.assertEqual(len(before), len(after))
+
+
+class PointsLedgerTestCase(TestCase):
+    """Test cases for incremental points accounting"""
+    
+    def setUp(self):
+        user = User.objects.create(username='ledger')
+        self.trainee = Trainee.objects.create(
+            user=user,
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+        )
+    
+    def award(self, trainee, points):
+        from .models import PointsTransaction
+        return PointsTransaction.objects.create(
+            trainee=trainee, points=points, transaction_type='admin_award', description='Test'
+        )
+    
+    def test_interleaved_awards_are_not_lost(self):
+        """Awards made through stale trainee instances all land in the total"""
+        stale_a = Trainee.objects.get(pk=self.trainee.pk)
+        stale_b = Trainee.objects.get(pk=self.trainee.pk)
+        self.award(stale_a, 10)
+        self.award(stale_b, 25)
+        self.award(stale_a, -5)
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.total_points, 30)
+    
+    def test_edits_and_deletes_apply_deltas(self):
+        """Changing or deleting a ledger row adjusts the total by the difference"""
+        from .models import PointsTransaction
+        transaction_row = self.award(self.trainee, 10)
+        self.award(self.trainee, 5)
+        transaction_row = PointsTransaction.objects.get(pk=transaction_row.pk)
+        transaction_row.points = 20
+        transaction_row.save()
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.total_points, 25)
+        transaction_row.delete()
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.total_points, 5)
+    
+    def test_reassigning_a_row_moves_its_points(self):
+        """A ledger row moved to another trainee moves its credit with it"""
+        from .models import PointsTransaction
+        other = Trainee.objects.create(
+            user=User.objects.create(username='ledger2'),
+            date_of_birth=self.trainee.date_of_birth,
+            contact_number='1234567890',
+            address='Test Address',
+        )
+        transaction_row = PointsTransaction.objects.get(pk=self.award(self.trainee, 10).pk)
+        transaction_row.trainee = other
+        transaction_row.points = 12
+        transaction_row.save()
+        self.trainee.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.trainee.total_points, other.total_points), (0, 12))
+        
+        transaction_row.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.total_points, 0)
+    
+    def test_recompute_command_repairs_drift(self):
+        """The recompute command brings drifted totals back to the ledger sum"""
+        from django.core.management import call_command
+        from io import StringIO
+        self.award(self.trainee, 40)
+        Trainee.objects.filter(pk=self.trainee.pk).update(total_points=3)
+        out = StringIO()
+        call_command('recompute_points', chunk_size=1, stdout=out)
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.total_points, 40)
+        self.assertIn(f'Checkpoint: --start-after {self.trainee.pk}', out.getvalue())
+
+
+class BulkPointsAwardTestCase(TestCase):
+    """Test cases for awarding points to many trainees at once"""
+    
+    def setUp(self):
+        from .models import EventRegistration
+        self.belt = Belt.objects.create(name='White', order=1)
+        self.event = Event.objects.create(
+            name='Seminar',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        self.trainees = []
+        for i in range(4):
+            user = User.objects.create(username=f'bulk{i}')
+            trainee = Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                belt=self.belt,
+                contact_number='1234567890',
+                address='Test Address',
+                is_approved=True,
+                total_points=5,
+            )
+            self.trainees.append(trainee)
+            EventRegistration.objects.create(
+                event=self.event, trainee=trainee, status='approved' if i < 3 else 'pending'
+            )
+    
+    def test_event_award_uses_constant_queries(self):
+        """Ledger rows, totals and notifications are written in bulk"""
+        from .models import Notification, PointsTransaction
+        from .points import bulk_award_points, resolve_award_targets
+        # Savepoint, select, two bulk inserts, totals and stamp UPDATEs, release
+        with self.assertNumQueries(7):
+            awarded = bulk_award_points(
+                resolve_award_targets(event=self.event), 15, 'Seminar Attendance',
+                transaction_type='seminar', event=self.event
+            )
+        self.assertEqual(awarded, 3)
+        self.assertEqual(PointsTransaction.objects.filter(event=self.event).count(), 3)
+        self.assertEqual(Notification.objects.count(), 3)
+        totals = sorted(Trainee.objects.values_list('total_points', flat=True))
+        self.assertEqual(totals, [5, 20, 20, 20])
+    
+    def test_deduction_stops_at_zero(self):
+        """A deduction larger than some balances floors them at zero"""
+        from .models import Notification, PointsTransaction
+        Trainee.objects.filter(pk=self.trainees[0].pk).update(total_points=50)
+        Trainee.objects.filter(pk=self.trainees[1].pk).update(total_points=0)
+        admin = User.objects.create_user(username='admin', password='testpass123')
+        admin.groups.add(Group.objects.create(name='Admin'))
+        self.client.force_login(admin)
+        response = self.client.post('/points/bulk-award/', {
+            'points': -10, 'description': 'Penalty', 'transaction_type': 'admin_award',
+            'belt': self.belt.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        totals = dict(Trainee.objects.values_list('pk', 'total_points'))
+        self.assertEqual([totals[t.pk] for t in self.trainees], [40, 0, 0, 0])
+        ledger = dict(PointsTransaction.objects.values_list('trainee_id', 'points'))
+        self.assertEqual(ledger, {self.trainees[0].pk: -10, self.trainees[2].pk: -5, self.trainees[3].pk: -5})
+        self.assertEqual(Notification.objects.filter(message__startswith='You have lost 5 points').count(), 2)
+    
+    def test_form_requires_exactly_one_target(self):
+        """Choosing both an event and a belt is rejected"""
+        from .forms import BulkPointsAwardForm
+        form = BulkPointsAwardForm({
+            'points': 10, 'description': 'Test', 'transaction_type': 'training',
+            'event': self.event.pk, 'belt': self.belt.pk,
+        })
+        self.assertFalse(form.is_valid())
+    
+    def test_trainees_are_searched_not_listed(self):
+        """The form renders no roster; trainees come from search and post as ids"""
+        admin = User.objects.create_user(username='admin', password='testpass123')
+        admin.groups.add(Group.objects.create(name='Admin'))
+        self.client.force_login(admin)
+        User.objects.filter(pk=self.trainees[0].user_id).update(first_name='Zebedee')
+        User.objects.filter(pk=self.trainees[1].user_id).update(first_name='Yolanda')
+        
+        response = self.client.get('/points/bulk-award/')
+        self.assertNotContains(response, 'Zebedee')
+        
+        response = self.client.get('/points/bulk-award/trainees/', {'q': 'Zebedee', 'trainees': [self.trainees[1].pk]})
+        self.assertContains(response, 'Zebedee')
+        self.assertContains(response, f'value="{self.trainees[1].pk}" checked')
+        
+        response = self.client.post('/points/bulk-award/', {
+            'points': 10, 'description': 'Test', 'transaction_type': 'admin_award',
+            'trainees': [self.trainees[0].pk, self.trainees[1].pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Trainee.objects.get(pk=self.trainees[0].pk).total_points, 15)
+        
+        # A rejected form keeps the ticked trainees
+        response = self.client.post('/points/bulk-award/', {
+            'points': 10, 'description': 'Test', 'transaction_type': 'admin_award',
+            'trainees': [self.trainees[0].pk], 'belt': self.belt.pk,
+        })
+        self.assertContains(response, 'Zebedee', status_code=400)
+        self.assertNotContains(response, 'Yolanda', status_code=400)
+
+
+class ChartDataTestCase(TestCase):
+    """Test cases for the grouped, cached chart data"""
+    
+    def setUp(self):
+        from .reports import invalidate_chart_cache
+        self.white = Belt.objects.create(name='White', order=1)
+        self.yellow = Belt.objects.create(name='Yellow', order=2)
+        joins = [date(2025, 12, 20), date(2026, 1, 5), date(2026, 1, 28), date(2026, 3, 2)]
+        for i, joined in enumerate(joins):
+            user = User.objects.create(username=f'chart{i}')
+            trainee = Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                belt=self.white if i else self.yellow,
+                contact_number='1234567890',
+                address='Test Address',
+            )
+            Trainee.objects.filter(pk=trainee.pk).update(join_date=joined)
+        invalidate_chart_cache()
+    
+    def test_trainee_growth_buckets(self):
+        """Monthly and quarterly running totals come from one grouped query"""
+        from .reports import trainee_growth
+        with self.assertNumQueries(1):
+            monthly = trainee_growth(date(2026, 1, 1), date(2026, 3, 31), 'month')
+        self.assertEqual(monthly['labels'], ['January 2026', 'February 2026', 'March 2026'])
+        self.assertEqual(monthly['datasets'][0]['data'], [3, 3, 4])
+        quarterly = trainee_growth(date(2025, 10, 1), date(2026, 3, 31), 'quarter')
+        self.assertEqual(quarterly['datasets'][0]['data'], [1, 4])
+        weekly = trainee_growth(date(2026, 1, 1), date(2026, 1, 31), 'week')
+        self.assertEqual(weekly['datasets'][0]['data'][0], 1)
+        self.assertEqual(weekly['datasets'][0]['data'][-1], 3)
+    
+    def test_chart_cache_is_invalidated_by_changes(self):
+        """Cached results are reused until a payment, trainee or belt changes"""
+        from .reports import get_chart_data
+        self.assertEqual(get_chart_data('belt_distribution')['datasets'][0]['data'], [3, 1])
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            get_chart_data('belt_distribution')
+        # Only the shared cache table is read: the version key and the entry
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all('core_cache' in query['sql'] for query in queries))
+        Payment.objects.create(trainee=Trainee.objects.first(), amount=5, date=date(2026, 1, 1), description='Fee')
+        self.assertEqual(get_chart_data('payment_status')['datasets'][0]['data'], [0, 1])
+        Trainee.objects.filter(belt=self.yellow).first().delete()
+        self.assertEqual(get_chart_data('belt_distribution')['datasets'][0]['data'], [3, 0])
+
+
+class DashboardStatCacheTestCase(TestCase):
+    """Test cases for the read-through DashboardStat cache"""
+    
+    def setUp(self):
+        user = User.objects.create(username='dash')
+        self.trainee = Trainee.objects.create(
+            user=user,
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+        )
+    
+    def test_fresh_poll_is_a_single_read(self):
+        """While fresh, polling only reads the stored row"""
+        from .dashboard import get_admin_stats
+        stats = get_admin_stats()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_admin_stats(), stats)
+    
+    def test_expired_entry_is_refreshed(self):
+        """An expired entry is recomputed and stays fresh for another TTL"""
+        from .dashboard import ADMIN_DASHBOARD_STAT, DEFAULT_STAT_TTL, get_admin_stats
+        from .models import DashboardStat
+        stats = get_admin_stats()
+        expired = timezone.now() - timedelta(seconds=DEFAULT_STAT_TTL + 1)
+        DashboardStat.objects.filter(stat_type=ADMIN_DASHBOARD_STAT).update(updated_at=expired)
+        self.assertEqual(get_admin_stats(), stats)
+        self.assertGreater(DashboardStat.objects.get(stat_type=ADMIN_DASHBOARD_STAT).updated_at, expired)
+        with self.assertNumQueries(1):
+            get_admin_stats()
+    
+    def test_signals_invalidate_stats(self):
+        """Creating a payment makes the next poll recompute"""
+        from .dashboard import get_admin_stats
+        self.assertEqual(get_admin_stats()['pending_payments'], 0)
+        Payment.objects.create(trainee=self.trainee, amount=25, date=timezone.now().date(), description='Fee')
+        stats = get_admin_stats()
+        self.assertEqual(stats['pending_payments'], 1)
+        self.assertEqual(stats['pending_payments_amount'], 25.0)
+
+
+class NotificationFanOutTestCase(TestCase):
+    """Test cases for batched notification fan-out"""
+    
+    def setUp(self):
+        from .models import EventRegistration
+        self.event = Event.objects.create(
+            name='Open Tournament',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        self.users = []
+        for i in range(5):
+            user = User.objects.create(username=f'fan{i}')
+            trainee = Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            )
+            self.users.append(user)
+            EventRegistration.objects.create(
+                event=self.event, trainee=trainee, status='approved' if i < 4 else 'pending'
+            )
+    
+    def test_notify_users_renders_once_and_batches(self):
+        """Recipients are written in batch-sized INSERTs"""
+        from .notifications import notify_users
+        # An INSERT and a stamp UPDATE per batch of two
+        with self.assertNumQueries(6):
+            sent = notify_users(
+                [user.pk for user in self.users], 'Update', 'Mats open at {time}',
+                'event', context={'time': '9am'}, batch_size=2
+            )
+        self.assertEqual(sent, 5)
+        self.assertEqual(
+            set(Notification.objects.values_list('message', flat=True)), {'Mats open at 9am'}
+        )
+    
+    def test_announce_to_event_targets_approved_registrants(self):
+        """Event announcements reach approved registrants only"""
+        from .notifications import announce_to_event
+        # One SELECT for recipients, an INSERT and a stamp UPDATE per batch
+        with self.assertNumQueries(5):
+            sent = announce_to_event(self.event, 'Schedule', 'Brackets are posted.', batch_size=2)
+        self.assertEqual(sent, 4)
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)),
+            {user.pk for user in self.users[:4]}
+        )
+    
+    def test_event_announce_view(self):
+        """Admins can announce to an event from the event detail modal"""
+        admin = User.objects.create_user(username='announcer', password='testpass123')
+        admin.groups.add(Group.objects.create(name='Admin'))
+        self.client.login(username='announcer', password='testpass123')
+        response = self.client.post(
+            f'/events/{self.event.pk}/announce/',
+            {'title': 'Schedule', 'message': 'Weigh-ins at {8}.', 'status': 'pending'},
+            HTTP_HX_REQUEST='true'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['HX-Trigger'], 'announcementSent')
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.users[4])
+        self.assertEqual(notification.message, 'Weigh-ins at {8}.')
+
+
+class NotificationStampTestCase(TestCase):
+    """Test cases for conditional GETs on the notification views"""
+    
+    def setUp(self):
+        from .utils import create_notification
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.first = create_notification(self.user, 'One', 'First', 'event')
+        create_notification(self.user, 'Two', 'Second', 'event')
+        self.client.login(username='reader', password='testpass123')
+    
+    def test_unchanged_list_answers_304(self):
+        """A matching ETag costs only the session, user and stamp lookups"""
+        response = self.client.get('/notifications/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['unread_count'], 2)
+        with self.assertNumQueries(3):
+            response = self.client.get('/notifications/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_writes_change_the_etag(self):
+        """Inserts and read-state changes bump the stamp and unread counter"""
+        from .models import NotificationStamp
+        from .notifications import notify_users
+        etag = self.client.get('/notifications/badge/')['ETag']
+        
+        notify_users([self.user.pk], 'Three', 'Third', 'event')
+        response = self.client.get('/notifications/badge/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['unread_count'], 3)
+        
+        response = self.client.post(f'/notifications/{self.first.pk}/read/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.context['unread_count'], 2)
+        
+        self.client.post('/notifications/read-all/')
+        self.assertEqual(NotificationStamp.objects.get(user=self.user).unread_count, 0)
+        
+        Notification.objects.filter(pk=self.first.pk).delete()
+        Notification.objects.create(user=self.user, title='Four', message='Fourth', notification_type='event')
+        self.assertEqual(NotificationStamp.objects.get(user=self.user).unread_count, 1)
+
+
+class MatchEventStreamTestCase(TestCase):
+    """Test cases for pushing match changes to judge streams"""
+    
+    def setUp(self):
+        self.judge = User.objects.create_user(username='judge', password='testpass123')
+        self.judge.groups.add(Group.objects.create(name='Judge'))
+        event = Event.objects.create(
+            name='Open Tournament',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        trainees = []
+        for i in range(2):
+            user = User.objects.create(username=f'fighter{i}')
+            trainees.append(Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            ))
+        self.match_kwargs = {
+            'event': event, 'trainee1': trainees[0], 'trainee2': trainees[1],
+            'judge': self.judge, 'match_time': timezone.now() + timedelta(hours=1),
+        }
+    
+    def published(self, action):
+        from unittest import mock
+        from . import match_events
+        with mock.patch.object(match_events.LocalBroker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+        return [call.args[0]['type'] for call in publish.call_args_list]
+    
+    def test_saves_publish_change_kinds(self):
+        """Creating, scoring, rescheduling and completing a match each publish once"""
+        self.assertEqual(self.published(lambda: Match.objects.create(**self.match_kwargs)), ['created'])
+        match = Match.objects.get()
+        
+        def score():
+            match.score1 = 2
+            match.save()
+        self.assertEqual(self.published(score), ['scored'])
+        
+        def reschedule():
+            match.match_time += timedelta(minutes=30)
+            match.save()
+        self.assertEqual(self.published(reschedule), ['rescheduled'])
+        self.assertEqual(self.published(match.save), [])
+        
+        def complete():
+            match.winner = match.trainee1
+            match.save()
+        self.assertEqual(self.published(complete), ['completed'])
+    
+    def test_completing_writes_only_the_winner(self):
+        """Completion leaves scores alone, publishes once and refuses a second winner"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        match = Match.objects.create(**self.match_kwargs)
+        self.client.login(username='judge', password='testpass123')
+        url = f'/matches/{match.pk}/complete/'
+        
+        with CaptureQueriesContext(connection) as queries:
+            published = self.published(lambda: self.client.post(url, {'winner_id': match.trainee1.pk}))
+        self.assertEqual(published, ['completed'])
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "core_match"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('score1', updates[0])
+        
+        response = self.client.post(url, {'winner_id': match.trainee2.pk})
+        self.assertEqual(response.status_code, 400)
+        match.refresh_from_db()
+        self.assertEqual(match.winner, match.trainee1)
+    
+    def test_wsgi_requests_fall_back_to_polling(self):
+        self.client.login(username='judge', password='testpass123')
+        response = self.client.get('/matches/stream/')
+        self.assertEqual(response.status_code, 204)
+    
+    def test_wsgi_dashboard_does_not_open_a_stream(self):
+        """Under WSGI the dashboard skips the SSE extension and keeps its 30s poll"""
+        self.client.login(username='judge', password='testpass123')
+        response = self.client.get('/dashboard/judge/')
+        self.assertNotContains(response, 'sse-connect')
+        self.assertNotContains(response, 'ext/sse.js')
+        self.assertContains(response, 'every 30s')
+    
+    async def test_asgi_dashboard_opens_a_stream(self):
+        await self.async_client.aforce_login(self.judge)
+        response = await self.async_client.get('/dashboard/judge/')
+        self.assertContains(response, 'sse-connect')
+    
+    async def test_asgi_requests_get_an_event_stream(self):
+        await self.async_client.aforce_login(self.judge)
+        response = await self.async_client.get('/matches/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+    
+    async def test_stream_receives_hub_messages(self):
+        """An ASGI stream yields messages dispatched for its judge"""
+        from . import match_events
+        stream = match_events.stream(self.judge.pk, heartbeat=0.05)
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+        match_events.hub.dispatch({'type': 'scored', 'match_id': 7, 'event_id': 1, 'judge_ids': [self.judge.pk]})
+        self.assertEqual(
+            await anext(stream),
+            'event: match\ndata: {"type": "scored", "match_id": 7, "event_id": 1}\n\n'
+        )
+        await stream.aclose()
+        self.assertEqual(match_events.hub.subscriber_count(self.judge.pk), 0)
+
+
+class MatchScoreUpdateTestCase(TransactionTestCase):
+    """Test cases for atomic score updates"""
+    
+    def setUp(self):
+        self.judge = User.objects.create_user(username='scorer', password='testpass123')
+        self.judge.groups.add(Group.objects.create(name='Judge'))
+        event = Event.objects.create(
+            name='Open Tournament',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        trainees = [
+            Trainee.objects.create(
+                user=User.objects.create(username=f'scored{i}'),
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            )
+            for i in range(2)
+        ]
+        self.match = Match.objects.create(
+            event=event, trainee1=trainees[0], trainee2=trainees[1],
+            judge=self.judge, match_time=timezone.now() - timedelta(minutes=5),
+        )
+        self.url = f'/matches/{self.match.pk}/update-score/'
+    
+    def click(self, action='increment', trainee='trainee1'):
+        client = Client()
+        client.force_login(self.judge)
+        return client.post(self.url, {'action': action, 'trainee': trainee})
+    
+    def test_scores_floor_at_zero_and_lock_on_completion(self):
+        response = self.click('decrement')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['score1'], response.context['score2']), (0, 0))
+        self.assertEqual(self.click(trainee='trainee2').context['score2'], 1)
+        
+        Match.objects.filter(pk=self.match.pk).update(winner=self.match.trainee2)
+        self.assertEqual(self.click().status_code, 400)
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.score1, self.match.score2), (0, 1))
+    
+    @contextmanager
+    def file_database(self, timeout=20):
+        """
+        Run the block's new connections on a file copy of the test database.
+        The in-memory test database reports lock contention between threads
+        as an error instead of waiting; a file with a busy timeout waits like
+        a deployed database. The copy is written back afterwards.
+        """
+        import os
+        import sqlite3
+        import tempfile
+        from django.db import connection
+        connection.ensure_connection()
+        memory = connection.connection
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        with closing(sqlite3.connect(path)) as copy:
+            memory.backup(copy)
+        # Connections opened by other threads are built from this dict
+        saved = {'NAME': connection.settings_dict['NAME'], 'OPTIONS': connection.settings_dict['OPTIONS']}
+        connection.settings_dict.update(NAME=path, OPTIONS={**saved['OPTIONS'], 'timeout': timeout})
+        try:
+            yield
+        finally:
+            connection.settings_dict.update(saved)
+            with closing(sqlite3.connect(path)) as copy:
+                copy.backup(memory)
+            os.remove(path)
+    
+    def test_concurrent_clicks_are_not_lost(self):
+        """A click storm from several judges' browsers lands every point"""
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connections
+        
+        clients = []
+        for trainee in ['trainee1', 'trainee1', 'trainee2', 'trainee2']:
+            client = Client()
+            client.force_login(self.judge)
+            clients.append((client, trainee))
+        
+        def storm(args):
+            client, trainee = args
+            try:
+                return [
+                    client.post(self.url, {'action': 'increment', 'trainee': trainee}).status_code
+                    for _ in range(10)
+                ]
+            finally:
+                connections.close_all()
+        
+        with self.file_database(), ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(storm, clients))
+        
+        self.assertEqual({code for codes in results for code in codes}, {200})
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.score1, self.match.score2), (20, 20))
+
+
+class ScoreEventLogTestCase(TestCase):
+    """Test cases for the score event log, replay and compaction"""
+    
+    def setUp(self):
+        self.judge = User.objects.create_user(username='logger', password='testpass123')
+        self.judge.groups.add(Group.objects.create(name='Judge'))
+        event = Event.objects.create(
+            name='Open Tournament',
+            description='Test Description',
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+            location='Dojo',
+        )
+        trainees = [
+            Trainee.objects.create(
+                user=User.objects.create(username=f'logged{i}'),
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            )
+            for i in range(2)
+        ]
+        self.match = Match.objects.create(
+            event=event, trainee1=trainees[0], trainee2=trainees[1],
+            judge=self.judge, match_time=timezone.now() - timedelta(minutes=5),
+        )
+        self.client.login(username='logger', password='testpass123')
+    
+    def click(self, action, trainee):
+        return self.client.post(f'/matches/{self.match.pk}/update-score/', {'action': action, 'trainee': trainee})
+    
+    def test_scoring_appends_events_that_replay_to_the_score(self):
+        from .models import ScoreEvent
+        from .scoring import history, replay
+        for action, trainee in [('increment', 'trainee1'), ('decrement', 'trainee2'),
+                                ('increment', 'trainee2'), ('increment', 'trainee1')]:
+            self.click(action, trainee)
+        self.assertEqual(ScoreEvent.objects.filter(match=self.match).count(), 4)
+        self.match.refresh_from_db()
+        self.assertEqual(replay(self.match), (self.match.score1, self.match.score2))
+        self.assertEqual(replay(self.match), (2, 1))
+        
+        first = ScoreEvent.objects.filter(match=self.match).order_by('pk').first()
+        self.assertEqual(replay(self.match, at=first.created_at), (1, 0))
+        self.assertEqual(
+            [(event.score1, event.score2) for event in history(self.match, limit=2)],
+            [(1, 1), (2, 1)]
+        )
+    
+    def test_compaction_collapses_finished_matches(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import ScoreEvent
+        from .scoring import replay
+        for _ in range(3):
+            self.click('increment', 'trainee1')
+        self.match.refresh_from_db()
+        self.match.winner = self.match.trainee1
+        self.match.save()
+        
+        out = StringIO()
+        call_command('compact_score_events', stdout=out)
+        self.assertIn('Compacted 1 matches. Removed 3 score events.', out.getvalue())
+        snapshot = ScoreEvent.objects.get(match=self.match)
+        self.assertEqual(snapshot.kind, ScoreEvent.KIND_SNAPSHOT)
+        self.assertEqual(replay(self.match), (3, 0))
+        with self.assertRaises(ValueError):
+            snapshot.save()
+
+
+class TraineeSearchIndexTestCase(TestCase):
+    """Test cases for the trainee full-text search index"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(username='searcher', password='testpass123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.belt = Belt.objects.create(name='Yellow', order=1)
+        self.trainees = {}
+        for username, first, last in [('jdoe', 'John', 'Doe'), ('jsmith', 'Jane', 'Smith'), ('mjohn', 'Mary', 'Johnson')]:
+            user = User.objects.create(username=username, first_name=first, last_name=last)
+            self.trainees[username] = Trainee.objects.create(
+                user=user,
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                belt=self.belt,
+                contact_number='5550100',
+                address='Test Address',
+            )
+    
+    def search(self, query):
+        from .search import search_trainees
+        return [t.user.username for t in search_trainees(Trainee.objects.select_related('user'), query)]
+    
+    def test_prefix_terms_are_ranked(self):
+        from .search import is_enabled
+        self.assertTrue(is_enabled())
+        self.assertEqual(self.search('joh'), ['jdoe', 'mjohn'])
+        self.assertEqual(self.search('ja smi'), ['jsmith'])
+        self.assertEqual(self.search('"*'), [])
+    
+    def test_signals_keep_index_current(self):
+        user = self.trainees['jdoe'].user
+        user.last_name = 'Roe'
+        user.save()
+        self.assertEqual(self.search('roe'), ['jdoe'])
+        
+        self.belt.name = 'Orange'
+        self.belt.save()
+        self.assertEqual(len(self.search('orange')), 3)
+        self.belt.delete()
+        self.assertEqual(self.search('orange'), [])
+        
+        self.trainees['jsmith'].delete()
+        self.assertEqual(self.search('jane'), [])
+    
+    def test_rebuild_command_and_view(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_trainee_search')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 trainees.', out.getvalue())
+        
+        self.client.login(username='searcher', password='testpass123')
+        response = self.client.get('/trainees/', {'search': 'mary'}, HTTP_HX_REQUEST='true')
+        self.assertEqual([t.user.username for t in response.context['trainees']], ['mjohn'])
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Test cases for cursor pagination of list views"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(username='pager', password='testpass123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        trainee = Trainee.objects.create(
+            user=User.objects.create(username='payer'),
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+        )
+        today = timezone.now().date()
+        # Pairs of payments share a date so the id tie-breaker matters
+        for i in range(30):
+            Payment.objects.create(trainee=trainee, amount=10, date=today - timedelta(days=i // 2), description=f'Fee {i}')
+        self.client.login(username='pager', password='testpass123')
+    
+    def test_pages_cover_every_row_once_without_offset(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .pagination import paginate
+        seen = []
+        cursor = None
+        with CaptureQueriesContext(connection) as queries:
+            while True:
+                rows, cursor = paginate(Payment.objects.all(), ['-date'], cursor, per_page=7)
+                seen.extend(payment.pk for payment in rows)
+                if cursor is None:
+                    break
+        expected = list(Payment.objects.order_by('-date', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+    
+    def test_infinite_scroll_returns_rows_and_next_sentinel(self):
+        response = self.client.get('/payments/', {'status': 'pending'})
+        page = response.context['page']
+        self.assertEqual(len(page), 25)
+        self.assertTrue(page.has_next)
+        self.assertIn('status=pending', page.next_url)
+        
+        response = self.client.get(page.next_url, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'partials/payment_rows.html')
+        self.assertEqual(len(response.context['page']), 5)
+        self.assertNotContains(response, 'hx-trigger="revealed"')
+    
+    def test_invalid_cursor_is_a_bad_request(self):
+        response = self.client.get('/payments/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PaymentListTestCase(TestCase):
+    """Test cases for payment_list totals and overdue flags"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(username='treasurer', password='testpass123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        trainee = Trainee.objects.create(
+            user=User.objects.create(username='member'),
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+        )
+        today = timezone.now().date()
+        Payment.objects.create(trainee=trainee, amount=Decimal('40.00'), date=today - timedelta(days=3), description='Late', paid=False)
+        Payment.objects.create(trainee=trainee, amount=Decimal('25.00'), date=today + timedelta(days=3), description='Upcoming', paid=False)
+        Payment.objects.create(trainee=trainee, amount=Decimal('60.00'), date=today - timedelta(days=30), description='Settled', paid=True)
+        self.client.login(username='treasurer', password='testpass123')
+    
+    def test_totals_come_from_one_aggregate(self):
+        with self.assertNumQueries(1):
+            totals = Payment.objects.totals()
+        self.assertEqual(totals, {
+            'total_collected': Decimal('60.00'),
+            'total_pending': Decimal('65.00'),
+            'total_overdue': Decimal('40.00'),
+        })
+    
+    def test_overdue_flag_is_annotated(self):
+        response = self.client.get('/payments/')
+        flags = {payment.description: payment.is_overdue for payment in response.context['payments']}
+        self.assertEqual(flags, {'Late': True, 'Upcoming': False, 'Settled': False})
+        self.assertContains(response, '$40.00 overdue')
+        
+        response = self.client.get('/payments/', {'status': 'overdue'})
+        self.assertEqual([payment.description for payment in response.context['payments']], ['Late'])
+
+
+class TraineeBalanceTestCase(TestCase):
+    """Test cases for the incrementally maintained trainee balance"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(username='bursar', password='testpass123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.trainee, self.other = [
+            Trainee.objects.create(
+                user=User.objects.create(username=f'payer{i}'),
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+            )
+            for i in range(2)
+        ]
+        self.client.login(username='bursar', password='testpass123')
+    
+    def balance(self, trainee):
+        from .models import TraineeBalance
+        return TraineeBalance.objects.filter(trainee=trainee).values_list('outstanding', 'unpaid_count').first()
+    
+    def test_views_keep_balance_in_step(self):
+        """Creating a payment and marking it paid move the balance row"""
+        self.client.post('/payments/create/', {
+            'trainee': self.trainee.pk, 'amount': '45.00', 'date': timezone.now().date(), 'description': 'Dues',
+        })
+        self.assertEqual(self.balance(self.trainee), (Decimal('45.00'), 1))
+        payment = Payment.objects.get(trainee=self.trainee)
+        self.client.post(f'/payments/{payment.pk}/mark-paid/')
+        self.assertEqual(self.balance(self.trainee), (Decimal('0.00'), 0))
+    
+    def test_edits_and_deletes_apply_deltas(self):
+        """Amount changes, trainee changes and deletes adjust both balances"""
+        payment = Payment.objects.create(trainee=self.trainee, amount=Decimal('30.00'), date=timezone.now().date(), description='Fee')
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('5.00'), date=timezone.now().date(), description='Fee')
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.amount = Decimal('20.00')
+        payment.trainee = self.other
+        payment.save()
+        self.assertEqual(self.balance(self.trainee), (Decimal('5.00'), 1))
+        self.assertEqual(self.balance(self.other), (Decimal('20.00'), 1))
+        payment.delete()
+        self.assertEqual(self.balance(self.other), (Decimal('0.00'), 0))
+    
+    def test_balance_read_is_primary_key_lookup(self):
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('12.50'), date=timezone.now().date(), description='Fee')
+        trainee = Trainee.objects.get(pk=self.trainee.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(trainee.outstanding_balance, Decimal('12.50'))
+    
+    def test_reconcile_command_repairs_drift(self):
+        """Bulk writes bypass the balance; the reconcile command catches up"""
+        from django.core.management import call_command
+        from io import StringIO
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('10.00'), date=timezone.now().date(), description='Fee')
+        Payment.objects.bulk_create([
+            Payment(trainee=trainee, amount=Decimal('7.00'), date=timezone.now().date(), description='Bulk')
+            for trainee in (self.trainee, self.other)
+        ])
+        out = StringIO()
+        call_command('reconcile_balances', chunk_size=1, stdout=out)
+        self.assertEqual(self.balance(self.trainee), (Decimal('17.00'), 2))
+        self.assertEqual(self.balance(self.other), (Decimal('7.00'), 1))
+        self.assertIn('Repaired 2 with drift', out.getvalue())
+        self.assertIn(f'Checkpoint: --start-after {self.other.pk}', out.getvalue())
+
+
+class DataExportTestCase(TestCase):
+    """Test cases for the streaming CSV and JSON Lines exports"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(username='auditor', password='testpass123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.trainee = Trainee.objects.create(
+            user=User.objects.create(username='exported', first_name='Ex', last_name='Ported'),
+            date_of_birth=timezone.now().date() - timedelta(days=365*20),
+            contact_number='1234567890',
+            address='Test Address',
+        )
+        today = timezone.now().date()
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('40.00'), date=today - timedelta(days=3), description='Late')
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('60.00'), date=today, description='Settled', paid=True)
+        self.client.login(username='auditor', password='testpass123')
+    
+    def test_payment_csv_uses_list_filters(self):
+        response = self.client.get('/exports/payments/', {'status': 'overdue'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,trainee_id,username,amount,date,description,period,paid,overdue')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('exported,40.00', lines[1])
+    
+    def test_trainee_jsonl_includes_balance(self):
+        import json
+        response = self.client.get('/exports/trainees/', {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['username'], 'exported')
+        self.assertEqual(rows[0]['outstanding_balance'], '40.00')
+    
+    def test_csv_quotes_formula_cells(self):
+        """Text a spreadsheet would evaluate is prefixed; negative numbers are not"""
+        from .models import PointsTransaction
+        Payment.objects.create(trainee=self.trainee, amount=Decimal('5.00'), date=timezone.now().date(),
+                               description='=HYPERLINK("http://example.com")')
+        Trainee.objects.filter(pk=self.trainee.pk).update(total_points=10)
+        PointsTransaction.objects.create(trainee=self.trainee, points=-5, transaction_type='admin_award', description='@SUM(A1)')
+        
+        payments = b''.join(self.client.get('/exports/payments/').streaming_content).decode()
+        self.assertIn('"\'=HYPERLINK(""http://example.com"")"', payments)
+        points = b''.join(self.client.get('/exports/points/').streaming_content).decode().splitlines()
+        self.assertIn(",-5,admin_award,'@SUM(A1),", points[1])
+    
+    def test_bad_requests_are_rejected(self):
+        self.assertEqual(self.client.get('/exports/unknown/').status_code, 404)
+        self.assertEqual(self.client.get('/exports/matches/', {'event': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/exports/points/', {'format': 'xml'}).status_code, 400)
+    
+    def test_command_writes_export(self):
+        from django.core.management import call_command
+        from io import StringIO
+        out, err = StringIO(), StringIO()
+        call_command('export_data', 'payments', status='paid', stdout=out, stderr=err)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Settled', lines[1])
+        self.assertIn('Exported 1 payments.', err.getvalue())
+
+
+class DuesRunTestCase(TestCase):
+    """Test cases for bulk dues generation"""
+    
+    def setUp(self):
+        self.trainees = [
+            Trainee.objects.create(
+                user=User.objects.create(username=f'due{i}'),
+                date_of_birth=timezone.now().date() - timedelta(days=365*20),
+                contact_number='1234567890',
+                address='Test Address',
+                is_approved=i != 3,
+                is_active=i != 2,
+            )
+            for i in range(4)
+        ]
+    
+    def test_run_creates_dues_once(self):
+        """Eligible trainees get one payment and notification; reruns skip them"""
+        from .dues import run_dues
+        run = run_dues('2026-11', '45')
+        self.assertEqual((run.created, run.skipped), (2, 0))
+        payments = Payment.objects.filter(period='2026-11')
+        self.assertEqual(
+            sorted(payments.values_list('trainee_id', flat=True)),
+            [self.trainees[0].pk, self.trainees[1].pk]
+        )
+        self.assertEqual(payments.first().date, date(2026, 11, 1))
+        self.assertEqual(self.trainees[0].outstanding_balance, Decimal('45.00'))
+        notification = Notification.objects.get(user=self.trainees[0].user)
+        self.assertEqual(notification.message, 'A new payment of $45.00 for Monthly dues 2026-11 is due on 2026-11-01.')
+        
+        run = run_dues('2026-11', '45')
+        self.assertEqual((run.created, run.skipped), (0, 2))
+        self.assertEqual(Payment.objects.count(), 2)
+    
+    def test_trainees_billed_by_a_concurrent_run_are_skipped(self):
+        """A payment committed between the read and the insert is reported, not raised"""
+        from unittest import mock
+        from . import dues
+        Payment.objects.create(trainee=self.trainees[0], amount=10, date=date(2026, 11, 1), description='Dues', period='2026-11')
+        # The concurrent run committed after this run looked for unbilled trainees
+        stale = mock.patch.object(dues, 'unbilled_trainees', lambda eligible, period: list(
+            eligible.order_by('pk').values_list('pk', 'user_id')
+        ))
+        with stale:
+            run = dues.run_dues('2026-11', '45')
+        self.assertEqual((run.created, run.skipped), (1, 1))
+        self.assertEqual(Payment.objects.get(trainee=self.trainees[0]).amount, 10)
+        self.assertEqual(Payment.objects.get(trainee=self.trainees[1]).amount, 45)
+        self.assertEqual(
+            list(Notification.objects.values_list('user_id', flat=True)),
+            [self.trainees[1].user_id]
+        )
+    
+    def test_period_key_is_unique(self):
+        from django.db import IntegrityError
+        Payment.objects.create(trainee=self.trainees[0], amount=10, date=date(2026, 11, 1), description='Dues', period='2026-11')
+        Payment.objects.create(trainee=self.trainees[0], amount=10, date=date(2026, 11, 1), description='Extra')
+        with self.assertRaises(IntegrityError):
+            Payment.objects.create(trainee=self.trainees[0], amount=10, date=date(2026, 11, 1), description='Dues', period='2026-11')
+    
+    def test_admin_action_runs_for_selection(self):
+        admin_user = User.objects.create_superuser(username='root', password='testpass123')
+        self.client.force_login(admin_user)
+        selection = [self.trainees[0].pk, self.trainees[2].pk]
+        response = self.client.post('/admin/core/trainee/', {
+            'action': 'generate_dues', '_selected_action': selection,
+        })
+        self.assertContains(response, '1 of the 2 selected trainees')
+        self.client.post('/admin/core/trainee/', {
+            'action': 'generate_dues', '_selected_action': selection, 'apply': 'yes',
+            'period': '2026-12', 'amount': '30.00', 'due_date': '', 'description': '',
+        })
+        self.assertEqual(list(Payment.objects.values_list('trainee_id', 'period')), [(self.trainees[0].pk, '2026-12')])
+    
+    def test_command_reports_counts(self):
+        from django.core.management import call_command
+        from io import StringIO
+        out = StringIO()
+        call_command('run_dues', period='2026-11', amount='20', stdout=out)
+        self.assertIn('Created 2 dues payments for 2026-11. Skipped 0', out.getvalue())
+
+
+class TraineeImportTestCase(TestCase):
+    """Test cases for the bulk CSV trainee import"""
+    
+    HEADER = 'username,email,first_name,last_name,password,date_of_birth,belt,contact_number,address\n'
+    
+    def setUp(self):
+        self.white = Belt.objects.create(name='White', order=1)
+        self.yellow = Belt.objects.create(name='Yellow', order=2)
+        User.objects.create(username='taken', email='taken@example.com')
+    
+    def import_csv(self, rows, **kwargs):
+        from io import StringIO
+        from .trainee_import import import_trainees
+        return import_trainees(StringIO(self.HEADER + ''.join(rows)), workers=0, **kwargs)
+    
+    def test_valid_rows_import_and_bad_rows_are_reported(self):
+        result = self.import_csv([
+            'ana,ana@example.com,Ana,Silva,s3cret-pass,2001-04-05,yellow,555-0100,1 Dojo Way\n',
+            'ben,ben@example.com,Ben,Ito,,2002-01-02,,555-0101,2 Dojo Way\n',
+            'taken,new@example.com,Tak,En,,2002-01-02,,555-0102,3 Dojo Way\n',
+            'ana,other@example.com,Ana,Again,,2002-01-02,,555-0103,4 Dojo Way\n',
+            'cy,cy@example.com,Cy,Lo,,not-a-date,Purple,555-0104,5 Dojo Way\n',
+        ], batch_size=2)
+        self.assertEqual((result.rows, result.created), (5, 2))
+        self.assertEqual([error.line for error in result.errors], [4, 5, 6])
+        self.assertIn('already taken', result.errors[0].message)
+        self.assertIn('earlier in the file', result.errors[1].message)
+        self.assertIn('date_of_birth', result.errors[2].message)
+        self.assertIn('Unknown belt', result.errors[2].message)
+        
+        ana = Trainee.objects.select_related('user').get(user__username='ana')
+        self.assertEqual(ana.belt, self.yellow)
+        self.assertTrue(ana.is_approved and ana.is_active)
+        self.assertTrue(ana.user.check_password('s3cret-pass'))
+        self.assertTrue(ana.user.groups.filter(name='Trainee').exists())
+        ben = Trainee.objects.select_related('user').get(user__username='ben')
+        self.assertEqual(ben.belt, self.white)
+        self.assertFalse(ben.user.has_usable_password())
+        
+        from .search import search_trainees
+        self.assertEqual([t.pk for t in search_trainees(Trainee.objects.all(), 'silva')], [ana.pk])
+    
+    def test_dry_run_and_missing_columns(self):
+        from io import StringIO
+        from .trainee_import import import_trainees
+        result = self.import_csv(['dee,dee@example.com,Dee,Po,,2001-04-05,,555-0100,1 Dojo Way\n'], dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(User.objects.filter(username='dee').exists())
+        
+        result = import_trainees(StringIO('username,email\nx,x@example.com\n'), workers=0)
+        self.assertEqual(result.created, 0)
+        self.assertIn('Missing columns', result.errors[0].message)
+    
+    def test_passwords_hash_in_process_pool(self):
+        from unittest import mock
+        from django.contrib.auth.hashers import check_password
+        from . import hashing
+        with mock.patch.object(hashing, 'MIN_POOL_PASSWORDS', 1), hashing.hashing_pool(2) as pool:
+            hashes = hashing.hash_passwords(['first-pass', '', 'second-pass'], pool)
+        self.assertTrue(check_password('first-pass', hashes[0]))
+        self.assertTrue(hashes[1].startswith('!'))
+        self.assertTrue(check_password('second-pass', hashes[2]))
+    
+    def test_admin_upload_reports_errors(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.force_login(User.objects.create_superuser(username='root', password='testpass123'))
+        upload = SimpleUploadedFile('trainees.csv', (
+            self.HEADER + 'eve,eve@example.com,Eve,Ng,,2001-04-05,,555-0100,1 Dojo Way\n'
+            'taken,t2@example.com,T,K,,2001-04-05,,555-0100,1 Dojo Way\n'
+        ).encode())
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            response = self.client.post('/admin/core/trainee/import/', {'csv_file': upload})
+        self.assertContains(response, 'Imported 1 of 2 rows')
+        self.assertContains(response, 'This username is already taken.')
+        self.assertTrue(Trainee.objects.filter(user__username='eve').exists())
+    
+    def test_admin_upload_uses_a_small_pool_only_when_needed(self):
+        """Uploads hash in-process until a batch has enough passwords, then on ADMIN_WORKERS"""
+        from unittest import mock
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from . import hashing, trainee_import
+        self.client.force_login(User.objects.create_superuser(username='root', password='testpass123'))
+        
+        def upload(count, with_passwords):
+            password = 'pass-word' if with_passwords else ''
+            rows = ''.join(
+                f'u{with_passwords}{i},u{with_passwords}{i}@example.com,U,N,{password},2001-04-05,,555-0100,1 Dojo Way\n'
+                for i in range(count)
+            )
+            return SimpleUploadedFile('trainees.csv', (self.HEADER + rows).encode())
+        
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']), \
+                mock.patch.object(hashing, 'hashing_pool', return_value=None) as hashing_pool:
+            self.client.post('/admin/core/trainee/import/', {'csv_file': upload(hashing.MIN_POOL_PASSWORDS, False)})
+            hashing_pool.assert_not_called()
+            self.client.post('/admin/core/trainee/import/', {'csv_file': upload(hashing.MIN_POOL_PASSWORDS, True)})
+        hashing_pool.assert_called_once_with(trainee_import.ADMIN_WORKERS)
+        self.assertEqual(Trainee.objects.count(), 2 * hashing.MIN_POOL_PASSWORDS)
+
+
+class SyntheticDatasetTestCase(TestCase):
+    """Test cases for the seeded dataset generator"""
+    
+    def test_tiny_preset_is_consistent(self):
+        import datetime as dt
+        from .models import PointsTransaction, TraineeBalance
+        from .synthetic import PRESETS, generate_dataset
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            created = generate_dataset('tiny', seed=3, today=dt.date(2026, 10, 17))
+        preset = PRESETS['tiny']
+        self.assertEqual(created['matches'], preset['matches'])
+        self.assertEqual(created['points transactions'], preset['points'])
+        self.assertEqual(Trainee.objects.filter(user__username__startswith='synthetic').count(), preset['trainees'])
+        
+        # Denormalized totals agree with the rows they summarise
+        trainee = Trainee.objects.filter(user__username__startswith='synthetic').order_by('-total_points').first()
+        self.assertEqual(
+            trainee.total_points,
+            sum(PointsTransaction.objects.filter(trainee=trainee).values_list('points', flat=True))
+        )
+        balance = TraineeBalance.objects.order_by('-outstanding').first()
+        self.assertEqual(balance.outstanding, sum(
+            Payment.objects.filter(trainee_id=balance.trainee_id, paid=False).values_list('amount', flat=True)
+        ))
+        event = Event.objects.order_by('-registered_count').first()
+        self.assertEqual(event.registered_count, event.registrations.filter(status='approved').count())
+        
+        with self.assertRaises(ValueError):
+            generate_dataset('tiny', seed=3)
+    
+    def test_account_dates_follow_the_anchor(self):
+        """populate_accounts dates accounts and trainees from --today, not the clock"""
+        import datetime as dt
+        from io import StringIO
+        from django.core.management import call_command
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            call_command('populate_accounts', seed=3, today='2024-03-01', stdout=StringIO())
+        anchor = dt.date(2024, 3, 1)
+        accounts = User.objects.filter(username__in=['admin', 'judge1']).values_list('date_joined', flat=True)
+        self.assertEqual({joined.date() for joined in accounts}, {anchor})
+        for join_date, joined in Trainee.objects.values_list('join_date', 'user__date_joined'):
+            self.assertTrue(anchor - timedelta(days=365) <= join_date < anchor)
+            self.assertEqual(joined.date(), join_date)
+
+
+class ViewBenchmarkTestCase(TestCase):
+    """Test cases for the per-view benchmark suite"""
+    
+    def test_every_url_has_a_target(self):
+        from .benchmarks import BUDGETS, KNOWN_FAILURES, TARGETS, url_names
+        self.assertEqual(set(TARGETS), set(url_names()))
+        self.assertLessEqual(set(BUDGETS) | set(KNOWN_FAILURES), set(TARGETS))
+    
+    def test_views_run_against_tiny_dataset(self):
+        from .benchmarks import run_views, url_names
+        from .synthetic import generate_dataset
+        with self.settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            generate_dataset('tiny', seed=3)
+        trainees = Trainee.objects.count()
+        
+        results = run_views(repeat=1)
+        self.assertEqual(list(results), url_names())
+        self.assertFalse([name for name, result in results.items() if result['status'] >= 500])
+        self.assertGreater(results['trainee_list']['queries'], 0)
+        self.assertGreater(results['trainee_list']['bytes'], 0)
+        # Write views are rolled back
+        self.assertEqual(Trainee.objects.count(), trainees)
+    
+    def test_compare_flags_regressions(self):
+        from .benchmarks import compare, format_report
+        baseline = {
+            'a': {'status': 200, 'queries': 5, 'sql_ms': 1.0, 'ms': 20.0, 'bytes': 1000},
+            'b': {'status': 200, 'queries': 5, 'sql_ms': 1.0, 'ms': 20.0, 'bytes': 1000},
+        }
+        current = {
+            'a': {'status': 200, 'queries': 4, 'sql_ms': 1.2, 'ms': 24.0, 'bytes': 1000},
+            'b': {'status': 200, 'queries': 50, 'sql_ms': 1.0, 'ms': 60.0, 'bytes': 1000},
+            'c': {'status': 200, 'queries': 1, 'sql_ms': 0.1, 'ms': 2.0, 'bytes': 10},
+        }
+        comparisons = {comparison.name: comparison for comparison in compare(current, baseline, threshold=0.5)}
+        self.assertEqual(comparisons['a'].failures, [])
+        self.assertEqual(
+            comparisons['b'].failures,
+            ['queries 50 over budget 25', 'queries 5 -> 50', 'ms 20.00 -> 60.00']
+        )
+        self.assertIsNone(comparisons['c'].baseline)
+        
+        report = format_report(comparisons.values())
+        self.assertIn('FAIL: queries 50 over budget 25; queries 5 -> 50; ms 20.00 -> 60.00', report)
+        self.assertTrue(report.splitlines()[-1].startswith('b '))
+    
+    def test_budgets_hold_without_a_baseline(self):
+        """Absolute budgets apply to every view; known failures are reported until fixed"""
+        from unittest import mock
+        from . import benchmarks
+        heavy = {'status': 200, 'queries': 900, 'sql_ms': 1.0, 'ms': 20.0, 'bytes': 2_000_000}
+        light = {'status': 200, 'queries': 3, 'sql_ms': 1.0, 'ms': 20.0, 'bytes': 1000}
+        with mock.patch.dict(benchmarks.KNOWN_FAILURES, {'known': 'N+1 on matches'}, clear=True):
+            comparisons = {comparison.name: comparison for comparison in benchmarks.compare(
+                {'heavy': heavy, 'known': heavy, 'fixed': light}, {'known': heavy, 'fixed': heavy}
+            )}
+            self.assertEqual(
+                comparisons['heavy'].failures,
+                ['queries 900 over budget 25', 'bytes 2,000,000 over budget 500,000']
+            )
+            self.assertEqual(comparisons['known'].failures, [])
+            self.assertIn('known: N+1 on matches', benchmarks.format_report(comparisons.values()))
+            self.assertEqual(comparisons['fixed'].failures, [])
+            
+            comparisons = benchmarks.compare({'known': light}, {})
+            self.assertEqual(comparisons[0].failures, ['within budget; remove it from KNOWN_FAILURES'])
+    
+    def test_timings_are_scaled_for_machine_speed(self):
+        from .benchmarks import compare, speed_ratio
+        baseline = {'calibration_ms': 10.0, 'views': {
+            'a': {'status': 200, 'queries': 5, 'sql_ms': 10.0, 'ms': 100.0, 'bytes': 1000},
+        }}
+        report = {'calibration_ms': 30.0, 'views': {
+            'a': {'status': 200, 'queries': 5, 'sql_ms': 25.0, 'ms': 250.0, 'bytes': 1000},
+        }}
+        ratio = speed_ratio(report, baseline)
+        self.assertEqual(ratio, 3.0)
+        # Slower only because the machine is: within budget once scaled
+        self.assertEqual(
+            compare(report['views'], baseline['views'], min_ms=5)[0].failures,
+            ['ms 100.00 -> 250.00', 'sql_ms 10.00 -> 25.00']
+        )
+        self.assertEqual(compare(report['views'], baseline['views'], min_ms=5, ratio=ratio)[0].failures, [])
+        self.assertEqual(speed_ratio(report, {'views': {}}), 1.0)
+
+
+class RequestTimingTestCase(TestCase):
+    """Test cases for the request instrumentation middleware"""
+    
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='admin', password='testpass123')
+        self.admin_user.groups.add(Group.objects.create(name='Admin'))
+        self.client.force_login(self.admin_user)
+    
+    def test_unsampled_requests_are_untouched(self):
+        from unittest import mock
+        from django.template.base import Template
+        from . import instrumentation
+        original_render = Template.render
+        with self.settings(REQUEST_TIMING_SAMPLE_RATE=0), self.assertNoLogs('core.instrumentation'), \
+                mock.patch.object(instrumentation, 'start_template_timer') as start_template_timer:
+            response = self.client.get('/trainees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        start_template_timer.assert_not_called()
+        self.assertIs(Template.render, original_render)
+    
+    def test_template_timer_is_installed_only_during_sampled_requests(self):
+        """The Template.render hook is reference counted across overlapping requests"""
+        from django.template.base import Template
+        from . import instrumentation
+        original_render = Template.render
+        instrumentation.start_template_timer()
+        instrumentation.start_template_timer()
+        self.assertIs(Template.render, instrumentation._timed_render)
+        instrumentation.stop_template_timer()
+        self.assertIs(Template.render, instrumentation._timed_render)
+        instrumentation.stop_template_timer()
+        self.assertIs(Template.render, original_render)
+        
+        with self.settings(REQUEST_TIMING_SAMPLE_RATE=1), self.assertLogs('core.instrumentation', 'INFO'):
+            self.client.get('/trainees/')
+        self.assertIs(Template.render, original_render)
+    
+    async def test_middleware_runs_natively_under_asgi(self):
+        from django.http import HttpResponse
+        from asgiref.sync import iscoroutinefunction
+        from .instrumentation import RequestTimingMiddleware
+        
+        async def get_response(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(RequestTimingMiddleware(lambda request: HttpResponse())))
+        
+        await self.async_client.aforce_login(self.admin_user)
+        with self.settings(REQUEST_TIMING_SAMPLE_RATE=1), self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = await self.async_client.get('/trainees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        self.assertGreater(logs.records[0].timing['queries'], 0)
+        self.assertGreater(logs.records[0].timing['template_ms'], 0)
+    
+    def test_sampled_request_reports_timings(self):
+        with self.settings(REQUEST_TIMING_SAMPLE_RATE=1), self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = self.client.get('/trainees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^sql;dur=[\d.]+;desc="\d+ queries, \d+ duplicates", template;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+        timing = logs.records[0].timing
+        self.assertEqual(timing['path'], '/trainees/')
+        self.assertEqual(timing['status'], 200)
+        self.assertGreater(timing['queries'], 0)
+        self.assertGreater(timing['template_ms'], 0)
+        self.assertGreaterEqual(timing['total_ms'], timing['template_ms'])
+        self.assertIn('queries=', logs.output[0])
+    
+    def test_repeated_statements_are_counted_and_warned(self):
+        from django.db import connection
+        from .instrumentation import QueryTimer
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            for pk in range(3):
+                User.objects.filter(pk=pk).exists()
+        self.assertEqual((timer.count, timer.duplicates), (3, 2))
+        
+        with self.settings(REQUEST_TIMING_SAMPLE_RATE=1, REQUEST_TIMING_DUPLICATE_THRESHOLD=1), \
+                self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get('/trainees/')
+        self.assertIn('repeated query', logs.output[0])
@@ -0,0 +1,211 @@
+"""
+Bulk trainee import from CSV.
+
+Rows are read and validated as a stream and written BATCH_SIZE at a time.
+Each batch checks its usernames and emails against the database in two
+queries, hashes its passwords in a process pool (see core.hashing) and
+writes users, trainees and Trainee group memberships with bulk_create in
+one transaction. Invalid rows are reported with their line number and
+skipped; the rest of the file still imports.
+
+bulk_create bypasses signals, so batches index their trainees for search
+themselves and the cached rankings and dashboards are invalidated once at
+the end.
+"""
+import csv
+from collections import namedtuple
+
+from django.contrib.auth.models import Group, User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import dashboard, hashing, leaderboard, reports, search
+from .belts import get_ladder
+from .forms import TraineeImportRowForm
+from .models import Trainee
+
+
+BATCH_SIZE = 500
+# Hashing processes an admin upload may start; the import_trainees command
+# takes --workers and is the place for large files
+ADMIN_WORKERS = 2
+REQUIRED_COLUMNS = (
+    'username', 'email', 'first_name', 'last_name', 'date_of_birth', 'contact_number', 'address'
+)
+OPTIONAL_COLUMNS = ('password', 'belt', 'emergency_contact', 'emergency_phone')
+
+RowError = namedtuple('RowError', 'line message')
+
+
+class ImportResult:
+    """Rows read, accounts created (or that would be, on a dry run) and row errors."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append(RowError(line, message))
+
+
+def _form_errors(form):
+    return '; '.join(
+        f'{field}: {" ".join(messages)}' if field != '__all__' else ' '.join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+def _assign_pks(objects, model, key, values):
+    """Fill in primary keys on backends whose bulk_create doesn't return them."""
+    if objects and objects[0].pk is None:
+        pks = dict(model.objects.filter(**{f'{key}__in': values}).values_list(key, 'pk'))
+        for obj, value in zip(objects, values):
+            obj.pk = pks[value]
+
+
+class TraineeImporter:
+    """One pass over a CSV; holds the seen usernames/emails and the hashing pool."""
+
+    def __init__(self, batch_size=BATCH_SIZE, workers=None, dry_run=False, approve=True):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.approve = approve
+        self.result = ImportResult(dry_run)
+        ladder = get_ladder()
+        self.belts = {belt.name.lower(): belt for belt in ladder}
+        self.default_belt = ladder.first()
+        self.seen_usernames = set()
+        self.seen_emails = set()
+        self.pool = None
+
+    def run(self, lines):
+        """Import every row of the CSV ``lines`` (any iterable of text lines)."""
+        reader = csv.DictReader(lines)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            self.result.error(1, f'Missing columns: {", ".join(missing)}')
+            return self.result
+
+        try:
+            batch = []
+            for row in reader:
+                self.result.rows += 1
+                data = self.validate(reader.line_num, row)
+                if data is not None:
+                    batch.append((reader.line_num, data))
+                if len(batch) >= self.batch_size:
+                    self.write(batch)
+                    batch = []
+            if batch:
+                self.write(batch)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+        # Batch checks report after later rows' validation errors
+        self.result.errors.sort()
+        if self.result.created and not self.result.dry_run:
+            transaction.on_commit(leaderboard.invalidate_leaderboard)
+            transaction.on_commit(dashboard.invalidate_admin_stats)
+            transaction.on_commit(reports.invalidate_chart_cache)
+        return self.result
+
+    def validate(self, line, row):
+        """Cleaned data for a row, or None after recording its errors."""
+        form = TraineeImportRowForm(row, belts=self.belts)
+        if not form.is_valid():
+            self.result.error(line, _form_errors(form))
+            return None
+        data = form.cleaned_data
+        if data['username'] in self.seen_usernames:
+            self.result.error(line, 'username: Appears earlier in the file.')
+            return None
+        if data['email'] in self.seen_emails:
+            self.result.error(line, 'email: Appears earlier in the file.')
+            return None
+        self.seen_usernames.add(data['username'])
+        self.seen_emails.add(data['email'])
+        return data
+
+    def write(self, batch):
+        usernames = [data['username'] for _, data in batch]
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = set(
+            User.objects.filter(email__in=[data['email'] for _, data in batch]).values_list('email', flat=True)
+        )
+        rows = []
+        for line, data in batch:
+            if data['username'] in taken_usernames:
+                self.result.error(line, 'username: This username is already taken.')
+            elif data['email'] in taken_emails:
+                self.result.error(line, 'email: This email is already in use.')
+            else:
+                rows.append((line, data))
+        if not rows or self.result.dry_run:
+            self.result.created += len(rows)
+            return
+
+        passwords = [data['password'] for _, data in rows]
+        # Started on the first batch worth it, so small files never spawn workers
+        if self.pool is None and sum(map(bool, passwords)) >= hashing.MIN_POOL_PASSWORDS:
+            self.pool = hashing.hashing_pool(self.workers)
+        hashes = hashing.hash_passwords(passwords, self.pool)
+        try:
+            with transaction.atomic():
+                self.create(rows, hashes)
+        except IntegrityError as error:
+            # Lost a race with another writer; this batch only, the rest carries on
+            for line, _ in rows:
+                self.result.error(line, f'Not imported: {error}')
+            return
+        self.result.created += len(rows)
+
+    def create(self, rows, hashes):
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(
+                username=data['username'],
+                email=data['email'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                password=password,
+                date_joined=now,
+            )
+            for (_, data), password in zip(rows, hashes)
+        ], batch_size=self.batch_size)
+        _assign_pks(users, User, 'username', [user.username for user in users])
+
+        trainees = Trainee.objects.bulk_create([
+            Trainee(
+                user=user,
+                date_of_birth=data['date_of_birth'],
+                belt=data['belt'] or self.default_belt,
+                contact_number=data['contact_number'],
+                address=data['address'],
+                emergency_contact=data['emergency_contact'],
+                emergency_phone=data['emergency_phone'],
+                is_active=self.approve,
+                is_approved=self.approve,
+            )
+            for user, (_, data) in zip(users, rows)
+        ], batch_size=self.batch_size)
+        _assign_pks(trainees, Trainee, 'user_id', [user.pk for user in users])
+
+        trainee_group, _ = Group.objects.get_or_create(name='Trainee')
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [Membership(user_id=user.pk, group_id=trainee_group.pk) for user in users],
+            batch_size=self.batch_size
+        )
+        search.index_trainees([trainee.pk for trainee in trainees])
+
+
+def import_trainees(lines, batch_size=BATCH_SIZE, workers=None, dry_run=False, approve=True):
+    """
+    Import trainees from CSV text lines. ``workers`` sizes the hashing pool
+    (0 hashes in-process). Returns an ImportResult.
+    """
+    importer = TraineeImporter(batch_size=batch_size, workers=workers, dry_run=dry_run, approve=approve)
+    return importer.run(lines)
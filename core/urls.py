@@ -7,11 +7,13 @@ from .views import (
     judge_dashboard, 
     trainee_dashboard,
     upcoming_matches,
+    match_stream,
     recent_matches,
     trainee_profile,
     trainee_matches,
     trainee_payments,
     notifications,
+    notification_badge,
     mark_notification_read,
     mark_all_notifications_read,
     dashboard_statistics,
@@ -27,6 +29,7 @@ from .views import (
     event_delete,
     event_delete_confirm,
     event_detail,
+    event_announce,
     match_scoring,
     match_update_score,
     match_complete,
@@ -40,6 +43,7 @@ from .views import (
     payment_reports,
     reports_dashboard,
     api_chart_data,
+    export_data,
     pending_trainees,
     approve_trainee,
     trainee_events_list,
@@ -48,6 +52,8 @@ from .views import (
     event_unregister,
     leaderboard,
     award_points,
+    bulk_award_points,
+    bulk_award_trainee_search,
     points_history,
     my_points
 )
@@ -63,6 +69,7 @@ urlpatterns = [
     # Partials for Judge Dashboard
     path('matches/upcoming/', upcoming_matches, name='upcoming_matches'),
     path('matches/recent/', recent_matches, name='recent_matches'),
+    path('matches/stream/', match_stream, name='match_stream'),
 
     # Partials for Trainee Dashboard
     path('trainee/profile/', trainee_profile, name='trainee_profile'),
@@ -71,6 +78,7 @@ urlpatterns = [
 
     # Notifications
     path('notifications/', notifications, name='notifications'),
+    path('notifications/badge/', notification_badge, name='notification_badge'),
     path('notifications/<int:notification_id>/read/', mark_notification_read, name='mark_notification_read'),
     path('notifications/read-all/', mark_all_notifications_read, name='mark_all_notifications_read'),
     
@@ -94,6 +102,7 @@ urlpatterns = [
     path('events/<int:event_id>/delete/', event_delete, name='event_delete'),
     path('events/<int:event_id>/delete/confirm/', event_delete_confirm, name='event_delete_confirm'),
     path('events/<int:event_id>/', event_detail, name='event_detail'),
+    path('events/<int:event_id>/announce/', event_announce, name='event_announce'),
     
     # Match Scoring
     path('matches/<int:match_id>/score/', match_scoring, name='match_scoring'),
@@ -115,6 +124,7 @@ urlpatterns = [
     # Reports & Analytics
     path('reports/', reports_dashboard, name='reports_dashboard'),
     path('api/chart-data/', api_chart_data, name='api_chart_data'),
+    path('exports/<str:dataset>/', export_data, name='export_data'),
     
     # Trainee Event Registration
     path('trainee/events/', trainee_events_list, name='trainee_events_list'),
@@ -125,6 +135,8 @@ urlpatterns = [
     # Points and Leaderboard
     path('leaderboard/', leaderboard, name='leaderboard'),
     path('trainees/<int:trainee_id>/award-points/', award_points, name='award_points'),
+    path('points/bulk-award/', bulk_award_points, name='bulk_award_points'),
+    path('points/bulk-award/trainees/', bulk_award_trainee_search, name='bulk_award_trainee_search'),
     path('trainees/<int:trainee_id>/points-history/', points_history, name='points_history'),
     path('my-points/', my_points, name='my_points'),
 ]
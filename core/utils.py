@@ -1,13 +1,10 @@
-from .models import Notification
+from .notifications import build_notification
 
 def create_notification(user, title, message, notification_type, link=None):
     """
-    Utility function to create a notification.
+    Utility function to create a single notification.
+    Use core.notifications.notify_users for more than one recipient.
     """
-    return Notification.objects.create(
-        user=user,
-        title=title,
-        message=message,
-        notification_type=notification_type,
-        link=link
-    )
+    notification = build_notification(user, title, message, notification_type, link)
+    notification.save()
+    return notification
@@ -2,16 +2,35 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Group, User
 from django.contrib.auth import authenticate, login
-from .models import Match, Trainee, Payment, Event, Promotion, DashboardStat, Notification, EventRegistration, Belt
+from .models import Match, Trainee, Payment, Event, Promotion, Notification, NotificationStamp, EventRegistration
 from django.utils import timezone
-from django.db.models import Q, Sum, Count
-from django.http import JsonResponse, HttpResponse
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from django.db.models import F, Q, Sum, Count, Prefetch, Value
+from django.db.models.functions import Greatest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib import messages
 import json
-from django.db import models
+from django.db import transaction
 from .forms import TraineeForm, EventForm, PaymentForm, PromotionForm
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.cache import cache_control
 from .utils import create_notification
+from .promotions import evaluate_promotions
+from .belts import get_ladder
+from . import points as points_service
+from . import reports
+from . import dashboard
+from . import exports
+from . import match_events
+from . import pagination
+from . import scoring
+from . import search
+from . import notifications as notification_service
+from .leaderboard import (
+    get_leaderboard, RANKING_COMPETITION, RANKING_DENSE, DEFAULT_PAGE_SIZE as LEADERBOARD_PAGE_SIZE
+)
 
 def is_admin(user):
     return user.groups.filter(name='Admin').exists()
@@ -100,8 +119,7 @@ def register(request):
             user.groups.add(trainee_group)
             
             # Get white belt (first belt)
-            from .models import Belt
-            white_belt = Belt.objects.filter(order=1).first()
+            white_belt = get_ladder().get_by_order(1)
             
             # Create trainee profile (not approved by default)
             Trainee.objects.create(
@@ -142,7 +160,24 @@ def admin_dashboard(request):
 @login_required
 @user_passes_test(is_judge)
 def judge_dashboard(request):
-    return render(request, 'judge_dashboard.html')
+    # The match stream only runs under ASGI; WSGI pages just poll
+    return render(request, 'judge_dashboard.html', {'sse_enabled': isinstance(request, ASGIRequest)})
+
+@login_required
+@user_passes_test(is_judge)
+async def match_stream(request):
+    """
+    Server-Sent Events stream of match changes for the current judge.
+    Only served under ASGI; WSGI deployments get 204 and keep polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    response = StreamingHttpResponse(match_events.stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @login_required
 @user_passes_test(is_trainee)
@@ -236,8 +271,12 @@ def trainee_profile(request):
 @user_passes_test(is_trainee)
 def trainee_matches(request):
     trainee = Trainee.objects.get(user=request.user)
-    matches = Match.objects.filter(Q(trainee1=trainee) | Q(trainee2=trainee)).order_by('-match_time')
-    return render(request, 'partials/trainee_matches.html', {'matches': matches})
+    matches = Match.objects.filter(Q(trainee1=trainee) | Q(trainee2=trainee)).select_related(
+        'event', 'trainee1__user', 'trainee2__user'
+    )
+    page = pagination.paginate_request(request, matches, ['-match_time'])
+    template = 'partials/trainee_match_items.html' if pagination.is_next_page(request) else 'partials/trainee_matches.html'
+    return render(request, template, {'matches': page, 'page': page})
 
 @login_required
 @user_passes_test(is_trainee)
@@ -247,21 +286,43 @@ def trainee_payments(request):
     return render(request, 'partials/trainee_payments.html', {'payments': payments})
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=notification_service.stamp_etag, last_modified_func=notification_service.stamp_last_modified)
 def notifications(request):
     """
     Return list of notifications for the current user.
+    Answers 304 from the notification stamp when nothing has changed.
     """
     notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:10]
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
     
     context = {
         'notifications': notifications,
-        'unread_count': unread_count
+        'unread_count': notification_service.request_stamp(request).unread_count
     }
     
     return render(request, 'partials/notification_list.html', context)
 
 
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=notification_service.stamp_etag, last_modified_func=notification_service.stamp_last_modified)
+def notification_badge(request):
+    """
+    Return the unread badge for the current user.
+    """
+    stamp = notification_service.request_stamp(request)
+    return render(request, 'partials/notification_badge.html', {'unread_count': stamp.unread_count})
+
+
+def _stamped_badge(request):
+    """Badge response carrying the user's current notification validators."""
+    stamp = NotificationStamp.for_user(request.user)
+    response = render(request, 'partials/notification_badge.html', {'unread_count': stamp.unread_count})
+    response['ETag'] = stamp.etag
+    response['Last-Modified'] = http_date(stamp.updated_at.timestamp())
+    return response
+
+
 @login_required
 @require_http_methods(["POST"])
 def mark_notification_read(request, notification_id):
@@ -269,13 +330,12 @@ def mark_notification_read(request, notification_id):
     Mark a notification as read.
     """
     notification = get_object_or_404(Notification, pk=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    if not notification.is_read:
+        notification.is_read = True
+        notification.save()
     
     # Return updated unread count for the badge
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-    
-    return render(request, 'partials/notification_badge.html', {'unread_count': unread_count})
+    return _stamped_badge(request)
 
 
 @login_required
@@ -284,9 +344,9 @@ def mark_all_notifications_read(request):
     """
     Mark all notifications as read.
     """
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    notification_service.mark_all_read(request.user)
     
-    return render(request, 'partials/notification_badge.html', {'unread_count': 0})
+    return _stamped_badge(request)
 
 
 @login_required
@@ -296,42 +356,8 @@ def dashboard_statistics(request):
     View that aggregates and returns dashboard statistics.
     Supports both full page render and HTMX partial updates.
     """
-    # Calculate statistics
-    total_trainees = Trainee.objects.filter(is_active=True).count()
-    
-    # Upcoming events (events that haven't ended yet)
-    upcoming_events = Event.objects.filter(
-        end_date__gte=timezone.now(),
-        is_published=True
-    ).count()
-    
-    # Pending payments (unpaid payments)
-    pending_payments_data = Payment.objects.filter(paid=False).aggregate(
-        count=models.Count('id'),
-        total=Sum('amount')
-    )
-    pending_payments_count = pending_payments_data['count'] or 0
-    pending_payments_amount = pending_payments_data['total'] or 0
-    
-    # Recent promotions (last 30 days)
-    thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-    recent_promotions = Promotion.objects.filter(
-        date__gte=thirty_days_ago
-    ).count()
-    
-    stats = {
-        'total_trainees': total_trainees,
-        'upcoming_events': upcoming_events,
-        'pending_payments': pending_payments_count,
-        'pending_payments_amount': float(pending_payments_amount),
-        'recent_promotions': recent_promotions,
-    }
-    
-    # Cache the statistics
-    DashboardStat.objects.update_or_create(
-        stat_type='admin_dashboard',
-        defaults={'value': stats}
-    )
+    # Read-through DashboardStat cache; aggregates only run when stale
+    stats = dashboard.get_admin_stats()
     
     # If this is an HTMX request, return just the statistics partial
     if request.headers.get('HX-Request'):
@@ -352,33 +378,29 @@ def trainee_list(request):
     """
     search_query = request.GET.get('search', '').strip()
     
-    # Base queryset with related data
-    trainees = Trainee.objects.select_related('user', 'belt').filter(is_active=True)
+    # Base queryset with related data and per-row stats annotated in SQL
+    trainees = Trainee.objects.with_stats().select_related('user', 'belt').filter(is_active=True)
     
-    # Apply search filter
+    # Apply search filter; matches come back best first, capped at the search limit
+    page = None
     if search_query:
-        trainees = trainees.filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(belt__name__icontains=search_query) |
-            Q(contact_number__icontains=search_query)
-        )
-    
-    # Order by join date (newest first)
-    trainees = trainees.order_by('-join_date')
+        trainees = search.search_trainees(trainees.order_by('-join_date'), search_query)
+    else:
+        # Newest first, one keyset page at a time
+        trainees = page = pagination.paginate_request(request, trainees, ['-join_date'])
     
     # If HTMX request, return only the table body
     if request.headers.get('HX-Request'):
         return render(request, 'partials/trainee_table_body.html', {
             'trainees': trainees,
+            'page': page,
             'search_query': search_query
         })
     
     # Full page render
     return render(request, 'trainee_list.html', {
         'trainees': trainees,
+        'page': page,
         'search_query': search_query
     })
 
@@ -400,6 +422,9 @@ def trainee_create(request):
             trainee_group, created = Group.objects.get_or_create(name='Trainee')
             trainee.user.groups.add(trainee_group)
             
+            # Re-fetch with annotated stats for the row partial
+            trainee = Trainee.objects.with_stats().select_related('user', 'belt').get(pk=trainee.pk)
+            
             # Set success message header for HTMX
             response = render(request, 'partials/trainee_row.html', {'trainee': trainee})
             response['HX-Trigger'] = 'traineeCreated'
@@ -438,6 +463,9 @@ def trainee_update(request, trainee_id):
         if form.is_valid():
             trainee = form.save()
             
+            # Re-fetch with annotated stats for the row partial
+            trainee = Trainee.objects.with_stats().select_related('user', 'belt').get(pk=trainee.pk)
+            
             # Set success message header for HTMX
             response = render(request, 'partials/trainee_row.html', {'trainee': trainee})
             response['HX-Trigger'] = 'traineeUpdated'
@@ -741,17 +769,12 @@ def match_update_score(request, match_id):
     """
     Update match scores via HTMX.
     Supports increment/decrement operations.
-    """
-    match = get_object_or_404(
-        Match.objects.select_related('trainee1', 'trainee2'),
-        pk=match_id,
-        judge=request.user
-    )
-    
-    # Check if match is already completed
-    if match.winner is not None:
-        return HttpResponse("Match already completed", status=400)
     
+    Each click is one conditional UPDATE (F() step, floored at zero, only
+    while the match has no winner), so concurrent clicks never overwrite
+    each other, plus one ScoreEvent row for the history. The response
+    carries the scores as stored.
+    """
     # Get the action and trainee
     action = request.POST.get('action')  # 'increment' or 'decrement'
     trainee = request.POST.get('trainee')  # 'trainee1' or 'trainee2'
@@ -759,22 +782,31 @@ def match_update_score(request, match_id):
     if action not in ['increment', 'decrement'] or trainee not in ['trainee1', 'trainee2']:
         return HttpResponse("Invalid action or trainee", status=400)
     
-    # Update the score
-    if trainee == 'trainee1':
-        if action == 'increment':
-            match.score1 += 1
-        elif action == 'decrement' and match.score1 > 0:
-            match.score1 -= 1
-    else:  # trainee2
-        if action == 'increment':
-            match.score2 += 1
-        elif action == 'decrement' and match.score2 > 0:
-            match.score2 -= 1
+    field = 'score1' if trainee == 'trainee1' else 'score2'
+    step = 1 if action == 'increment' else -1
     
-    match.save()
+    match_qs = Match.objects.filter(pk=match_id, judge=request.user)
+    with transaction.atomic():
+        updated = match_qs.filter(winner__isnull=True).update(
+            **{field: Greatest(F(field) + step, Value(0))}
+        )
+        if updated:
+            scoring.record_point(match_id, field, step, judge=request.user)
+        state = match_qs.values('score1', 'score2', 'event_id', 'winner_id').first()
+    
+    if state is None:
+        raise Http404("No Match matches the given query.")
+    
+    # Check if match is already completed
+    if not updated:
+        return HttpResponse("Match already completed", status=400)
+    
+    match_events.publish_on_commit(
+        match_events.build_message(match_events.MATCH_SCORED, match_id, state['event_id'], [request.user.pk])
+    )
     
     # Return updated score display
-    return render(request, 'partials/match_scoring_interface.html', {'match': match})
+    return render(request, 'partials/match_score.html', {'score1': state['score1'], 'score2': state['score2']})
 
 
 @login_required
@@ -804,31 +836,36 @@ def match_complete(request, match_id):
     if int(winner_id) not in [match.trainee1.id, match.trainee2.id]:
         return HttpResponse("Invalid winner selection", status=400)
     
-    # Set the winner
-    match.winner_id = winner_id
-    match.save()
+    # Only the winner is written, and only while the match is undecided, so
+    # score clicks landing meanwhile are kept and a double submit loses
+    updated = Match.objects.filter(pk=match.pk, winner__isnull=True).update(winner_id=winner_id)
+    if not updated:
+        return HttpResponse("Match already completed", status=400)
+    match_events.publish_on_commit(
+        match_events.build_message(match_events.MATCH_COMPLETED, match.pk, match.event_id, [match.judge_id])
+    )
     
     # Create notifications for both trainees
     winner = match.trainee1 if int(winner_id) == match.trainee1.id else match.trainee2
     loser = match.trainee2 if winner == match.trainee1 else match.trainee1
     
-    # Notification for winner
-    Notification.objects.create(
-        user=winner.user,
-        title='Match Victory!',
-        message=f'Congratulations! You won your match against {loser.user.get_full_name()} at {match.event.name}.',
-        notification_type='match',
-        link=f'/trainee/matches/'
-    )
-    
-    # Notification for loser
-    Notification.objects.create(
-        user=loser.user,
-        title='Match Result',
-        message=f'Your match against {winner.user.get_full_name()} at {match.event.name} has been completed.',
-        notification_type='match',
-        link=f'/trainee/matches/'
-    )
+    # Notifications for winner and loser, written in one INSERT
+    notification_service.send_notifications([
+        notification_service.build_notification(
+            winner.user,
+            'Match Victory!',
+            f'Congratulations! You won your match against {loser.user.get_full_name()} at {match.event.name}.',
+            'match',
+            link='/trainee/matches/'
+        ),
+        notification_service.build_notification(
+            loser.user,
+            'Match Result',
+            f'Your match against {winner.user.get_full_name()} at {match.event.name} has been completed.',
+            'match',
+            link='/trainee/matches/'
+        ),
+    ])
     
     # Return success response with trigger to refresh match list
     response = HttpResponse('')
@@ -860,39 +897,8 @@ def promotion_list(request):
     """
     List all trainees and their promotion eligibility status.
     """
-    trainees = Trainee.objects.select_related('belt', 'user').filter(is_active=True)
-    
-    # Calculate eligibility for each trainee
-    for trainee in trainees:
-        # Get last promotion date or join date
-        last_promotion = trainee.promotions.order_by('-date').first()
-        last_date = last_promotion.date if last_promotion else trainee.join_date
-        
-        # Time since last date (in days)
-        days_since = (timezone.now().date() - last_date).days
-        
-        # Criteria (example): 6 months (180 days)
-        trainee.time_eligible = days_since >= 180
-        trainee.days_since_promotion = days_since
-        
-        # Performance: Win rate > 50% (if they have matches)
-        matches = Match.objects.filter(Q(trainee1=trainee) | Q(trainee2=trainee)).exclude(winner=None)
-        match_count = matches.count()
-        wins = matches.filter(winner=trainee).count()
-        win_rate = (wins / match_count * 100) if match_count > 0 else 0
-        
-        trainee.performance_eligible = match_count >= 5 and win_rate >= 40
-        trainee.match_count = match_count
-        trainee.calculated_win_rate = round(win_rate, 1)  # Changed from win_rate to avoid property conflict
-        
-        # Overall eligibility (can be adjusted)
-        trainee.is_eligible = trainee.time_eligible
-        
-        # Next belt
-        if trainee.belt:
-            trainee.promotion_next_belt = Belt.objects.filter(order__gt=trainee.belt.order).order_by('order').first()  # Changed from next_belt
-        else:
-            trainee.promotion_next_belt = Belt.objects.order_by('order').first()
+    # Eligibility is evaluated for the whole roster in a constant number of queries
+    trainees = evaluate_promotions(Trainee.objects.filter(is_active=True))
 
     context = {
         'trainees': trainees,
@@ -937,6 +943,7 @@ def promotion_create(request, trainee_id):
             )
             
             # HTMX response
+            trainee = evaluate_promotions(Trainee.objects.filter(pk=trainee.pk))[0]
             response = render(request, 'partials/promotion_row.html', {'trainee': trainee})
             response['HX-Trigger'] = 'promotionCompleted'
             messages.success(request, f'{trainee.user.get_full_name()} promoted to {new_belt.name}.')
@@ -969,8 +976,11 @@ def promotion_history(request):
     """
     View promotion history.
     """
-    promotions = Promotion.objects.select_related('trainee', 'belt_from', 'belt_to').order_by('-date')
-    return render(request, 'promotion_history.html', {'promotions': promotions})
+    promotions = Promotion.objects.select_related('trainee__user', 'belt_from', 'belt_to')
+    page = pagination.paginate_request(request, promotions, ['-date'])
+    if pagination.is_next_page(request):
+        return render(request, 'partials/promotion_history_items.html', {'promotions': page, 'page': page})
+    return render(request, 'promotion_history.html', {'promotions': page, 'page': page})
 
 
 # Payment Management Views
@@ -983,33 +993,43 @@ def payment_list(request):
     """
     status_filter = request.GET.get('status', 'all')
     
-    payments = Payment.objects.select_related('trainee', 'trainee__user').order_by('-date')
+    today = timezone.now().date()
+    payments = Payment.objects.select_related('trainee', 'trainee__user').with_overdue(today).with_status(
+        status_filter, today
+    )
     
-    if status_filter == 'pending':
-        payments = payments.filter(paid=False)
-    elif status_filter == 'paid':
-        payments = payments.filter(paid=True)
-    elif status_filter == 'overdue':
-        payments = payments.filter(paid=False, date__lt=timezone.now().date())
-        
-    # Calculate totals
-    total_collected = Payment.objects.filter(paid=True).aggregate(Sum('amount'))['amount__sum'] or 0
-    total_pending = Payment.objects.filter(paid=False).aggregate(Sum('amount'))['amount__sum'] or 0
+    page = pagination.paginate_request(request, payments, ['-date'])
+    
+    if pagination.is_next_page(request):
+        return render(request, 'partials/payment_rows.html', {'payments': page, 'page': page})
     
-    # Mark overdue
-    now = timezone.now().date()
-    for payment in payments:
-        payment.is_overdue = not payment.paid and payment.date < now
-        
     context = {
-        'payments': payments,
-        'total_collected': total_collected,
-        'total_pending': total_pending,
-        'status_filter': status_filter
+        'payments': page,
+        'page': page,
+        'status_filter': status_filter,
+        # Collected, pending and overdue totals in one query
+        **Payment.objects.totals(today)
     }
     return render(request, 'payment_list.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["GET"])
+def export_data(request, dataset):
+    """
+    Stream a full trainees, payments, matches or points dump as CSV or
+    JSON Lines (``?format=jsonl``). Filters follow the list views.
+    """
+    if dataset not in exports.EXPORTS:
+        raise Http404('Unknown export')
+    export_format = request.GET.get('format', 'csv')
+    lines = exports.stream(dataset, request.GET, export_format)
+    response = StreamingHttpResponse(lines, content_type=exports.FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(dataset, export_format)}"'
+    return response
+
+
 @login_required
 @user_passes_test(is_admin)
 @require_http_methods(["GET", "POST"])
@@ -1134,66 +1154,27 @@ def api_chart_data(request):
     """
     chart_type = request.GET.get('type')
     
-    data = {}
-    labels = []
+    if chart_type not in reports.CHARTS:
+        return JsonResponse({'error': 'Invalid chart type'}, status=400)
     
+    params = {}
     if chart_type == 'trainee_growth':
-        # Trainee growth over last 6 months
-        datasets_data = []
-        for i in range(5, -1, -1):
-            date = timezone.now().date() - timezone.timedelta(days=i*30)
-            month_name = date.strftime('%B')
-            # Count trainees who joined on or before this date
-            count = Trainee.objects.filter(join_date__lte=date).count()
-            labels.append(month_name)
-            datasets_data.append(count)
-            
-        return JsonResponse({
-            'labels': labels,
-            'datasets': [{
-                'label': 'Total Trainees',
-                'data': datasets_data,
-                'borderColor': 'rgb(79, 70, 229)',
-                'tension': 0.1,
-                'fill': False
-            }]
-        })
-        
-    elif chart_type == 'belt_distribution':
-        # Belt distribution
-        belts = Belt.objects.all().order_by('order')
-        counts = []
-        colors = []
-        
-        for belt in belts:
-            labels.append(belt.name)
-            counts.append(Trainee.objects.filter(belt=belt).count())
-            # Simple color generation
-            colors.append(f'hsl({belt.order * 45 % 360}, 70%, 50%)')
-            
-        return JsonResponse({
-            'labels': labels,
-            'datasets': [{
-                'label': 'Trainees per Belt',
-                'data': counts,
-                'backgroundColor': colors
-            }]
-        })
-        
-    elif chart_type == 'payment_status':
-        # Payment status
-        paid = Payment.objects.filter(paid=True).count()
-        pending = Payment.objects.filter(paid=False).count()
-        
-        return JsonResponse({
-            'labels': ['Paid', 'Pending'],
-            'datasets': [{
-                'data': [paid, pending],
-                'backgroundColor': ['rgb(34, 197, 94)', 'rgb(239, 68, 68)']
-            }]
-        })
-        
-    return JsonResponse({'error': 'Invalid chart type'}, status=400)
+        # Optional date range (YYYY-MM-DD) and bucket size; defaults to the last 6 months
+        try:
+            end_date = parse_date(request.GET.get('end', '')) or timezone.now().date()
+            start_date = parse_date(request.GET.get('start', '')) or end_date - timezone.timedelta(days=180)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date'}, status=400)
+        bucket = request.GET.get('bucket', 'month')
+        if bucket not in reports.BUCKET_TRUNC or start_date > end_date:
+            return JsonResponse({'error': 'Invalid date range or bucket'}, status=400)
+        params = {'start': start_date, 'end': end_date, 'bucket': bucket}
+    
+    try:
+        return JsonResponse(reports.get_chart_data(chart_type, **params))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
 
 @login_required
 @user_passes_test(is_admin)
@@ -1236,6 +1217,9 @@ def approve_trainee(request, trainee_id):
 
 # Trainee Event Registration Views
 
+EVENT_HISTORY_DAYS = 90
+EVENT_HISTORY_MAX_DAYS = 3650
+
 @login_required
 @user_passes_test(is_trainee)
 def trainee_events_list(request):
@@ -1243,33 +1227,41 @@ def trainee_events_list(request):
     Display list of available events for trainees to register.
     Shows only published events.
     """
-    from .models import EventRegistration
-    
     trainee = get_object_or_404(Trainee, user=request.user)
     
-    # Get all published events
-    events = Event.objects.filter(is_published=True).order_by('start_date')
-    
-    # Get trainee's registrations
-    registered_event_ids = EventRegistration.objects.filter(
-        trainee=trainee
-    ).values_list('event_id', flat=True)
-    
-    # Add registration status to each event
-    for event in events:
-        event.is_registered = event.id in registered_event_ids
-        if event.is_registered:
-            event.registration = EventRegistration.objects.get(event=event, trainee=trainee)
+    # Past events are limited to a history window (in days)
+    try:
+        history_days = min(max(int(request.GET.get('days', EVENT_HISTORY_DAYS)), 1), EVENT_HISTORY_MAX_DAYS)
+    except ValueError:
+        history_days = EVENT_HISTORY_DAYS
+    
+    # Published events with only this trainee's registration prefetched
+    my_registrations = Prefetch(
+        'registrations',
+        queryset=EventRegistration.objects.filter(trainee=trainee),
+        to_attr='my_registrations'
+    )
+    events = Event.objects.filter(is_published=True).prefetch_related(my_registrations).order_by('start_date')
     
-    # Separate upcoming and past events
+    # Separate upcoming and past events in SQL
     now = timezone.now()
-    upcoming_events = [e for e in events if e.start_date > now]
-    past_events = [e for e in events if e.start_date <= now]
+    upcoming_events = list(events.filter(start_date__gt=now))
+    past_events = list(events.filter(
+        start_date__lte=now,
+        start_date__gte=now - timezone.timedelta(days=history_days)
+    ))
+    
+    # Registration status comes from the prefetched list, not per-event queries
+    for event in upcoming_events + past_events:
+        event.registration = event.my_registrations[0] if event.my_registrations else None
+        event.is_registered = event.registration is not None
     
     context = {
         'upcoming_events': upcoming_events,
         'past_events': past_events,
-        'trainee': trainee
+        'trainee': trainee,
+        'history_days': history_days,
+        'history_day_options': [30, 90, 365],
     }
     
     # If HTMX request, return partial
@@ -1361,6 +1353,7 @@ def event_register(request, event_id):
     messages.success(request, f'Successfully registered for {event.name}!')
     
     # Return updated event card
+    event.refresh_from_db(fields=['registered_count'])
     event.is_registered = True
     event.registration = registration
     
@@ -1394,6 +1387,7 @@ def event_unregister(request, event_id):
         messages.success(request, f'Successfully unregistered from {event.name}.')
         
         # Return updated event card
+        event.refresh_from_db(fields=['registered_count'])
         event.is_registered = False
         event.registration = None
         
@@ -1415,20 +1409,40 @@ def leaderboard(request):
     Display trainee leaderboard based on total points.
     Accessible to all authenticated users.
     """
-    from .models import PointsTransaction
+    board = get_leaderboard()
+    method = RANKING_DENSE if request.GET.get('ranking') == RANKING_DENSE else RANKING_COMPETITION
+    viewer_id = Trainee.objects.filter(user=request.user).values_list('pk', flat=True).first()
+    around_me = request.GET.get('view') == 'around' and viewer_id in board
     
-    # Get all active trainees ordered by total points
-    trainees = Trainee.objects.filter(
-        is_active=True,
-        is_approved=True
-    ).select_related('user', 'belt').order_by('-total_points', 'user__first_name')
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
     
-    # Add rank to each trainee
-    for idx, trainee in enumerate(trainees, 1):
-        trainee.current_rank = idx
+    # Rank a window of the materialized board, then load only those rows
+    if around_me:
+        entries = board.around(viewer_id, radius=5, method=method)
+    else:
+        entries = board.page(page, LEADERBOARD_PAGE_SIZE, method=method)
+    
+    trainees_by_id = Trainee.objects.select_related('user', 'belt').in_bulk(
+        [entry.trainee_id for entry in entries]
+    )
+    trainees = []
+    for entry in entries:
+        trainee = trainees_by_id.get(entry.trainee_id)
+        if trainee:
+            trainee.current_rank = entry.rank
+            trainees.append(trainee)
     
     context = {
-        'trainees': trainees
+        'trainees': trainees,
+        'ranking': method,
+        'around_me': around_me,
+        'can_view_around_me': viewer_id in board,
+        'page': page,
+        'has_previous': not around_me and page > 1,
+        'has_next': not around_me and page * LEADERBOARD_PAGE_SIZE < len(board),
     }
     
     return render(request, 'leaderboard.html', context)
@@ -1494,6 +1508,114 @@ def award_points(request, trainee_id):
     })
 
 
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["GET", "POST"])
+def event_announce(request, event_id):
+    """
+    Send an announcement to every registrant of an event with a given status.
+    Admin only.
+    """
+    from .forms import EventAnnouncementForm
+    
+    event = get_object_or_404(Event, pk=event_id)
+    
+    if request.method == 'POST':
+        form = EventAnnouncementForm(request.POST)
+        if form.is_valid():
+            sent = notification_service.announce_to_event(
+                event,
+                title=form.cleaned_data['title'],
+                message=form.cleaned_data['message'],
+                link=f'/trainee/events/{event.id}/',
+                status=form.cleaned_data['status']
+            )
+            
+            messages.success(request, f'Announcement sent to {sent} trainee{"s" if sent != 1 else ""}.')
+            
+            response = HttpResponse('')
+            response['HX-Trigger'] = 'announcementSent'
+            return response
+        else:
+            # Return form with errors
+            response = render(request, 'partials/event_announcement_form.html', {'form': form, 'event': event}, status=400)
+            response['HX-Retarget'] = '#modal-content'
+            response['HX-Reswap'] = 'innerHTML'
+            return response
+    
+    form = EventAnnouncementForm()
+    return render(request, 'partials/event_announcement_form.html', {'form': form, 'event': event})
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["GET", "POST"])
+def bulk_award_points(request):
+    """
+    Award points to an event's approved registrants, a belt or a trainee list
+    in a single transaction.
+    Admin only.
+    """
+    from .forms import BulkPointsAwardForm
+    
+    if request.method == 'POST':
+        form = BulkPointsAwardForm(request.POST)
+        if form.is_valid():
+            points = form.cleaned_data['points']
+            event = form.cleaned_data['event']
+            
+            trainees = points_service.resolve_award_targets(
+                event=event,
+                belt=form.cleaned_data['belt'],
+                trainees=form.cleaned_data['trainees'] or None
+            )
+            awarded = points_service.bulk_award_points(
+                trainees,
+                points=points,
+                description=form.cleaned_data['description'],
+                transaction_type=form.cleaned_data['transaction_type'],
+                awarded_by=request.user,
+                event=event
+            )
+            
+            messages.success(request, f'Successfully {"awarded" if points > 0 else "deducted"} {abs(points)} points for {awarded} trainee{"s" if awarded != 1 else ""}.')
+            
+            response = HttpResponse('')
+            response['HX-Trigger'] = 'pointsAwarded'
+            return response
+        else:
+            # Return form with errors
+            response = render(request, 'partials/bulk_points_award_form.html', {'form': form}, status=400)
+            response['HX-Retarget'] = '#modal-content'
+            response['HX-Reswap'] = 'innerHTML'
+            return response
+    
+    # GET request - return form, optionally preselecting an event
+    form = BulkPointsAwardForm(initial={'event': request.GET.get('event')})
+    return render(request, 'partials/bulk_points_award_form.html', {'form': form})
+
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_award_trainee_search(request):
+    """
+    Trainee checkboxes for the bulk award form: the ones already ticked,
+    then the best matches for ``q`` among the rest.
+    Admin only.
+    """
+    active = Trainee.objects.filter(is_active=True).select_related('user')
+    selected_ids = [pk for pk in request.GET.getlist('trainees') if pk.isdigit()]
+    selected = active.filter(pk__in=selected_ids).order_by('user__first_name', 'pk')
+    query = request.GET.get('q', '').strip()
+    matches = search.search_trainees(active.exclude(pk__in=selected_ids), query) if query else []
+    
+    return render(request, 'partials/bulk_award_trainee_options.html', {
+        'selected': selected,
+        'matches': matches,
+        'query': query
+    })
+
+
 @login_required
 @user_passes_test(is_admin)
 def points_history(request, trainee_id):
@@ -1505,12 +1627,16 @@ def points_history(request, trainee_id):
     
     trainee = get_object_or_404(Trainee, pk=trainee_id)
     transactions = PointsTransaction.objects.filter(trainee=trainee).select_related('event', 'awarded_by')
+    page = pagination.paginate_request(request, transactions, ['-created_at'])
     
     context = {
         'trainee': trainee,
-        'transactions': transactions
+        'transactions': page,
+        'page': page
     }
     
+    if pagination.is_next_page(request):
+        return render(request, 'partials/points_history_rows.html', context)
     return render(request, 'partials/points_history.html', context)
 
 
@@ -1525,10 +1651,14 @@ def my_points(request):
     
     trainee = get_object_or_404(Trainee, user=request.user)
     transactions = PointsTransaction.objects.filter(trainee=trainee).select_related('event', 'awarded_by')
+    page = pagination.paginate_request(request, transactions, ['-created_at'])
     
     context = {
         'trainee': trainee,
-        'transactions': transactions
+        'transactions': page,
+        'page': page
     }
     
+    if pagination.is_next_page(request):
+        return render(request, 'partials/my_points_rows.html', context)
     return render(request, 'my_points.html', context)